@@ -1,23 +1,42 @@
 # backend/app/api.py
-import os, shutil, tempfile
+import os
+import json
+import time
+import logging
+import anyio
 from typing import Optional, List
-from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Header
+from fastapi import FastAPI, UploadFile, File, HTTPException, Depends, Header, Query, Request
+from fastapi.responses import StreamingResponse, JSONResponse, Response
+from starlette.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
 from sqlalchemy.orm import Session
-from pydantic import BaseModel
+from sqlalchemy import func
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from pydantic import BaseModel, Field
 from datetime import datetime
 import uuid
 
-from .openai_client import get_openai_client
-from .pdf_parser import extract_text_from_pdf, chunk_text
-from .embeddings import embed_texts
-from .vector_store import insert_document, insert_chunk, similarity_search, get_document_chunks, delete_document_chunks
-from .database import get_db, User, Document, ChatSession, ChatMessage, create_tables
+from .log import configure_logging
+from .metrics import StageTimingMiddleware, stage, record_stage, render
+from .llm import llm_client, close_llm_client, LLMUnavailableError
+from .embedding_cache import embed_query_cached
+from .context import pack_context, CONTEXT_CANDIDATES
+from .vector_store import similarity_search, get_document_chunks, soft_delete_document
+from .purge import start_purger, stop_purger, wake_purger
+from .ingestion import save_upload, create_job, complete_if_duplicate, get_job, job_to_dict, submit_job, start_workers, stop_workers
+from .database import engine, get_db, SessionLocal, Document, ChatSession, ChatMessage, create_tables
+from .migrations import current_version, LATEST_VERSION
+from .users import resolve_user_id
+from .pagination import keyset_page, MAX_PAGE_SIZE
+from .http_cache import response_cache, make_etag, documents_key, chats_key, messages_key
 
+configure_logging()
+logger = logging.getLogger(__name__)
 app = FastAPI()
 
 # Configure file upload limits
 MAX_FILE_SIZE = 50 * 1024 * 1024  # 50MB
+MAX_SEARCH_RESULTS = 50  # Upper bound of k for /api/search
 
 # Enable CORS
 allowed_origins = [
@@ -39,13 +58,23 @@ app.add_middleware(
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
 )
+app.add_middleware(StageTimingMiddleware)
+
+MIGRATE_ON_STARTUP = os.getenv("MIGRATE_ON_STARTUP", "false").lower() == "true"  # Deploys run `python -m app.migrations upgrade`
 
-# Create tables on startup
 @app.on_event("startup")
 async def startup_event():
-    create_tables()
+    if MIGRATE_ON_STARTUP:
+        create_tables()
+    start_workers()
+    start_purger()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    stop_workers()
+    stop_purger()
+    await close_llm_client()
 
-client = get_openai_client()
 CHAT_MODEL = os.getenv("CHAT_MODEL", "gpt-3.5-turbo")
 INTERNAL_API_SECRET = os.getenv("INTERNAL_API_SECRET", "your-internal-secret-change-in-production")
 
@@ -55,47 +84,80 @@ def verify_internal_auth(x_internal_secret: str = Header(None)):
         raise HTTPException(status_code=401, detail="Unauthorized")
     return True
 
-# Get user from headers (set by Next.js proxy)
-def get_user_from_headers(
+# Get the user's id from headers (set by Next.js proxy)
+def get_user_id_from_headers(
     x_user_email: str = Header(None),
     x_user_name: str = Header(None),
     db: Session = Depends(get_db)
-) -> User:
+) -> uuid.UUID:
     if not x_user_email:
         raise HTTPException(status_code=401, detail="User email required")
     
-    # Create or get user
-    user = db.query(User).filter(User.email == x_user_email).first()
-    if not user:
-        user = User(
-            email=x_user_email,
-            name=x_user_name or "Unknown User"
-        )
-        db.add(user)
-        db.commit()
-        db.refresh(user)
-    
-    return user
+    # Create or get user; cached, so most requests skip the database
+    return resolve_user_id(db, x_user_email, x_user_name)
+
+def page_headers(next_before: Optional[str]) -> dict:
+    return {"X-Next-Before": next_before} if next_before else {}
 
 class QueryBody(BaseModel):
     query: str
 
+class SearchBody(BaseModel):
+    query: str
+    k: int = Field(8, ge=1, le=MAX_SEARCH_RESULTS)
+
 class ChatCreate(BaseModel):
     document_id: str
     title: Optional[str] = None
 
+def get_user_chat(db: Session, chat_id: str, user_id: uuid.UUID) -> ChatSession:
+    """Get a chat owned by the user or raise 404; chats of deleted documents are gone already"""
+    chat = db.query(ChatSession).join(Document, Document.id == ChatSession.document_id).filter(
+        ChatSession.id == chat_id,
+        ChatSession.user_id == user_id,
+        Document.deleted_at.is_(None)
+    ).first()
+    
+    if not chat:
+        raise HTTPException(status_code=404, detail="Chat not found")
+    return chat
+
 @app.get("/api/healthz")
 def health():
     return {"ok": True}
 
-@app.post("/api/upload")
-async def upload_pdf(
+@app.get("/api/readyz")
+def ready():
+    """Whether the database answers and its schema is migrated to the version this code expects"""
+    try:
+        with engine.connect() as conn:
+            version = current_version(conn)
+    except Exception as e:
+        logger.warning("Readiness check failed: %s", e)
+        return JSONResponse(status_code=503, content={"ready": False, "detail": "Database unavailable"})
+    if version < LATEST_VERSION:
+        return JSONResponse(status_code=503, content={"ready": False, "schema_version": version, "required_version": LATEST_VERSION})
+    return {"ready": True, "schema_version": version}
+
+@app.get("/metrics", include_in_schema=False)
+def metrics():
+    """Prometheus request and stage latency histograms, and database pool metrics"""
+    body, content_type = render()
+    return Response(content=body, media_type=content_type)
+
+@app.exception_handler(PoolTimeoutError)
+async def pool_timeout_handler(request: Request, exc: PoolTimeoutError):
+    # Every pooled connection stayed busy for DB_POOL_TIMEOUT seconds
+    return JSONResponse(status_code=503, content={"detail": "Database is busy, please retry"})
+
+@app.post("/api/upload", status_code=202)
+def upload_pdf(
     file: UploadFile = File(...),
     _: bool = Depends(verify_internal_auth),
-    user: User = Depends(get_user_from_headers),
+    user_id: uuid.UUID = Depends(get_user_id_from_headers),
     db: Session = Depends(get_db)
 ):
-    """Upload a PDF document"""
+    """Upload a PDF document and queue it for ingestion"""
     if not file.filename.lower().endswith(".pdf"):
         raise HTTPException(status_code=400, detail="Please upload a PDF")
     
@@ -106,145 +168,149 @@ async def upload_pdf(
             detail=f"File too large. Maximum size is {MAX_FILE_SIZE // (1024*1024)}MB"
         )
     
-    # Save to temp file
-    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf") as tmp:
-        tmp_path = tmp.name
-        shutil.copyfileobj(file.file, tmp)
-    
+    # Save the file where the ingestion workers can read it, hashing it as it streams
+    file_path, content_hash = save_upload(file.file)
     try:
-        # Debug: Check if file was saved correctly
-        file_size = os.path.getsize(tmp_path)
-        print(f"Saved PDF file: {tmp_path}, size: {file_size} bytes")
-        
-        # Extract text with progress indication
-        text = extract_text_from_pdf(tmp_path)
-        print(f"Extracted text length: {len(text) if text else 0}")
-        
-        if not text or not text.strip():
-            raise HTTPException(status_code=400, detail="No extractable text found in PDF")
-        
-        # Optimize chunking for faster processing
-        chunks = chunk_text(text, chunk_size=1000, overlap=50)  # Larger chunks, less overlap
-        print(f"Created {len(chunks)} chunks")
-        
-        doc_id = insert_document(
-            db, 
-            str(user.id), 
-            file.filename, 
-            file.filename,
-            file.size
-        )
-        
-        # Generate embeddings in batches for better performance
-        print("Generating embeddings...")
-        embeddings = embed_texts(chunks)
-        print(f"Generated {len(embeddings)} embeddings")
-        
-        # Store chunks in batches
-        print("Storing chunks...")
-        for i, (chunk, emb) in enumerate(zip(chunks, embeddings)):
-            insert_chunk(
-                db,
-                doc_id,
-                chunk,
-                {"source": file.filename, "index": i},
-                emb,
-                i
-            )
-        
-        return {"document_id": doc_id}
-    finally:
-        try: 
-            os.remove(tmp_path)
-        except Exception: 
+        file_size = os.path.getsize(file_path)
+        logger.info("Saved PDF file %s, %d bytes", file_path, file_size)
+        job_id = create_job(db, str(user_id), file.filename, file_path, file_size, content_hash)
+    except Exception:
+        try:
+            os.remove(file_path)
+        except Exception:
             pass
+        raise
+    
+    # Content that is already ingested just gets a new document on the existing chunks
+    if complete_if_duplicate(db, job_id):
+        return {"job_id": job_id, "status": "completed"}
+    
+    # Extraction, embedding and storage happen in the worker pool
+    submit_job(job_id)
+    
+    return {"job_id": job_id, "status": "queued"}
+
+@app.get("/api/uploads/{job_id}")
+def get_upload_status(
+    job_id: str,
+    _: bool = Depends(verify_internal_auth),
+    user_id: uuid.UUID = Depends(get_user_id_from_headers),
+    db: Session = Depends(get_db)
+):
+    """Get the stage and progress of an upload's ingestion job"""
+    job = get_job(db, job_id, str(user_id))
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    
+    return job_to_dict(job)
 
 @app.get("/api/documents")
 def get_user_documents(
     _: bool = Depends(verify_internal_auth),
-    user: User = Depends(get_user_from_headers),
-    db: Session = Depends(get_db)
+    user_id: uuid.UUID = Depends(get_user_id_from_headers),
+    db: Session = Depends(get_db),
+    if_none_match: str = Header(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    before: Optional[str] = None
 ):
-    """Get all documents for the current user"""
-    documents = db.query(Document).filter(Document.user_id == user.id).all()
-    return [
-        {
-            "id": str(doc.id),
-            "filename": doc.original_filename,
-            "created_at": doc.upload_date.isoformat()
-        }
-        for doc in documents
-    ]
+    """Get the current user's documents, oldest first
+
+    With `limit`, returns the newest page; the X-Next-Before header holds the
+    `before` cursor for the next older page, if any.
+    """
+    # Documents are only added (with a newer upload_date) or removed, so count and latest date identify the set
+    count, last_upload = db.query(func.count(Document.id), func.max(Document.upload_date)).filter(
+        Document.user_id == user_id,
+        Document.deleted_at.is_(None)
+    ).one()
+    
+    def build():
+        documents, next_before = keyset_page(
+            db.query(Document).filter(Document.user_id == user_id, Document.deleted_at.is_(None)),
+            Document.upload_date, Document.id, limit, before
+        )
+        payload = [
+            {
+                "id": str(doc.id),
+                "filename": doc.original_filename,
+                "created_at": doc.upload_date.isoformat()
+            }
+            for doc in documents
+        ]
+        return payload, page_headers(next_before)
+    
+    page = (limit, before) if limit else ()
+    return response_cache.respond(
+        documents_key(user_id, *page),
+        make_etag("documents", user_id, count, last_upload, *page),
+        if_none_match,
+        build
+    )
 
 @app.get("/api/documents/{document_id}/chats")
 def get_document_chats(
     document_id: str,
     _: bool = Depends(verify_internal_auth),
-    user: User = Depends(get_user_from_headers),
-    db: Session = Depends(get_db)
+    user_id: uuid.UUID = Depends(get_user_id_from_headers),
+    db: Session = Depends(get_db),
+    if_none_match: str = Header(None)
 ):
     """Get all chats for a document"""
     # Verify document belongs to user
     document = db.query(Document).filter(
         Document.id == document_id,
-        Document.user_id == user.id
+        Document.user_id == user_id,
+        Document.deleted_at.is_(None)
     ).first()
     
     if not document:
         raise HTTPException(status_code=404, detail="Document not found")
     
-    chats = db.query(ChatSession).filter(
+    # Chats are created and deleted but never renamed, so count and latest creation identify the list
+    count, last_created = db.query(func.count(ChatSession.id), func.max(ChatSession.created_at)).filter(
         ChatSession.document_id == document_id,
-        ChatSession.user_id == user.id
-    ).all()
+        ChatSession.user_id == user_id
+    ).one()
+    
+    def build():
+        chats = db.query(ChatSession).filter(
+            ChatSession.document_id == document_id,
+            ChatSession.user_id == user_id
+        ).all()
+        return [
+            {
+                "id": str(chat.id),
+                "title": chat.title,
+                "created_at": chat.created_at.isoformat()
+            }
+            for chat in chats
+        ]
     
-    return [
-        {
-            "id": str(chat.id),
-            "title": chat.title,
-            "created_at": chat.created_at.isoformat()
-        }
-        for chat in chats
-    ]
+    return response_cache.respond(
+        chats_key(document.id, user_id),
+        make_etag("chats", document.id, user_id, count, last_created),
+        if_none_match,
+        build
+    )
 
 @app.delete("/api/documents/{document_id}")
 def delete_document(
     document_id: str,
     _: bool = Depends(verify_internal_auth),
-    user: User = Depends(get_user_from_headers),
+    user_id: uuid.UUID = Depends(get_user_id_from_headers),
     db: Session = Depends(get_db)
 ):
-    """Delete a document and all associated chats and chunks"""
-    # Verify document belongs to user
-    document = db.query(Document).filter(
-        Document.id == document_id,
-        Document.user_id == user.id
-    ).first()
-    
-    if not document:
+    """Delete a document and all associated chats and chunks
+
+    The document is hidden with a single update; its chats, messages and
+    chunks are removed by the background purge job.
+    """
+    if not soft_delete_document(db, document_id, user_id):
         raise HTTPException(status_code=404, detail="Document not found")
     
-    # Delete all chat messages for chats associated with this document
-    chat_sessions = db.query(ChatSession).filter(
-        ChatSession.document_id == document_id,
-        ChatSession.user_id == user.id
-    ).all()
-    
-    for chat in chat_sessions:
-        db.query(ChatMessage).filter(ChatMessage.session_id == chat.id).delete()
-    
-    # Delete all chat sessions for this document
-    db.query(ChatSession).filter(
-        ChatSession.document_id == document_id,
-        ChatSession.user_id == user.id
-    ).delete()
-    
-    # Delete all document chunks
-    delete_document_chunks(db, document_id)
-    
-    # Delete the document itself
-    db.delete(document)
-    db.commit()
+    response_cache.invalidate(documents_key(user_id), chats_key(document_id, user_id))
+    wake_purger()
     
     return {"message": "Document and all associated data deleted successfully"}
 
@@ -252,14 +318,15 @@ def delete_document(
 def create_chat(
     chat_data: ChatCreate,
     _: bool = Depends(verify_internal_auth),
-    user: User = Depends(get_user_from_headers),
+    user_id: uuid.UUID = Depends(get_user_id_from_headers),
     db: Session = Depends(get_db)
 ):
     """Create a new chat"""
     # Verify document belongs to user
     document = db.query(Document).filter(
         Document.id == chat_data.document_id,
-        Document.user_id == user.id
+        Document.user_id == user_id,
+        Document.deleted_at.is_(None)
     ).first()
     
     if not document:
@@ -269,13 +336,14 @@ def create_chat(
     title = chat_data.title or "New Chat"
     
     chat = ChatSession(
-        user_id=user.id,
+        user_id=user_id,
         document_id=chat_data.document_id,
         title=title
     )
     db.add(chat)
     db.commit()
     db.refresh(chat)
+    response_cache.invalidate(chats_key(chat.document_id, user_id))
     
     return {
         "id": str(chat.id),
@@ -288,17 +356,11 @@ def create_chat(
 def get_chat_details(
     chat_id: str,
     _: bool = Depends(verify_internal_auth),
-    user: User = Depends(get_user_from_headers),
+    user_id: uuid.UUID = Depends(get_user_id_from_headers),
     db: Session = Depends(get_db)
 ):
     """Get chat details including document_id"""
-    chat = db.query(ChatSession).filter(
-        ChatSession.id == chat_id,
-        ChatSession.user_id == user.id
-    ).first()
-    
-    if not chat:
-        raise HTTPException(status_code=404, detail="Chat not found")
+    chat = get_user_chat(db, chat_id, user_id)
     
     return {
         "id": str(chat.id),
@@ -311,157 +373,280 @@ def get_chat_details(
 def get_chat_messages(
     chat_id: str,
     _: bool = Depends(verify_internal_auth),
-    user: User = Depends(get_user_from_headers),
-    db: Session = Depends(get_db)
+    user_id: uuid.UUID = Depends(get_user_id_from_headers),
+    db: Session = Depends(get_db),
+    if_none_match: str = Header(None),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE),
+    before: Optional[str] = None
 ):
-    """Get all messages for a chat"""
-    chat = db.query(ChatSession).filter(
-        ChatSession.id == chat_id,
-        ChatSession.user_id == user.id
-    ).first()
-    
-    if not chat:
-        raise HTTPException(status_code=404, detail="Chat not found")
-    
-    messages = db.query(ChatMessage).filter(
-        ChatMessage.session_id == chat_id
-    ).order_by(ChatMessage.timestamp).all()
-    
-    return [
-        {
-            "id": str(msg.id),
-            "role": msg.role,
-            "content": msg.content,
-            "created_at": msg.timestamp.isoformat()
-        }
-        for msg in messages
-    ]
+    """Get a chat's messages in order
+
+    With `limit`, returns the latest page; the X-Next-Before header holds the
+    `before` cursor for the next older page, if any.
+    """
+    chat = get_user_chat(db, chat_id, user_id)
+    
+    def build():
+        messages, next_before = keyset_page(
+            db.query(ChatMessage).filter(ChatMessage.session_id == chat.id),
+            ChatMessage.timestamp, ChatMessage.id, limit, before
+        )
+        payload = [
+            {
+                "id": str(msg.id),
+                "role": msg.role,
+                "content": msg.content,
+                "created_at": msg.timestamp.isoformat()
+            }
+            for msg in messages
+        ]
+        return payload, page_headers(next_before)
+    
+    # Messages are only added by ask_question, which bumps the chat's updated_at
+    page = (limit, before) if limit else ()
+    return response_cache.respond(
+        messages_key(chat.id, *page),
+        make_etag("messages", chat.id, chat.updated_at, *page),
+        if_none_match,
+        build
+    )
 
 @app.delete("/api/chats/{chat_id}")
 def delete_chat(
     chat_id: str,
     _: bool = Depends(verify_internal_auth),
-    user: User = Depends(get_user_from_headers),
+    user_id: uuid.UUID = Depends(get_user_id_from_headers),
     db: Session = Depends(get_db)
 ):
     """Delete a chat and all its messages"""
-    # Verify chat belongs to user
-    chat = db.query(ChatSession).filter(
-        ChatSession.id == chat_id,
-        ChatSession.user_id == user.id
-    ).first()
-    
-    if not chat:
-        raise HTTPException(status_code=404, detail="Chat not found")
-    
-    # Delete all messages for this chat
-    db.query(ChatMessage).filter(ChatMessage.session_id == chat_id).delete()
+    chat = get_user_chat(db, chat_id, user_id)
     
-    # Delete the chat session
+    # Messages go with the chat through the ON DELETE CASCADE foreign key
+    keys = (messages_key(chat.id), chats_key(chat.document_id, user_id))
     db.delete(chat)
     db.commit()
+    response_cache.invalidate(*keys)
     
     return {"message": "Chat and all associated messages deleted successfully"}
 
-@app.post("/api/chats/{chat_id}/ask")
-def ask_question(
-    chat_id: str,
-    query_data: QueryBody,
+@app.post("/api/search")
+def search_documents(
+    search_data: SearchBody,
     _: bool = Depends(verify_internal_auth),
-    user: User = Depends(get_user_from_headers),
+    user_id: uuid.UUID = Depends(get_user_id_from_headers),
     db: Session = Depends(get_db)
 ):
-    """Ask a question in a chat"""
-    if not query_data.query.strip():
+    """Find the passages most relevant to a query across all of the user's documents"""
+    if not search_data.query.strip():
         raise HTTPException(status_code=400, detail="Empty query")
     
-    # Verify chat belongs to user
-    chat = db.query(ChatSession).filter(
-        ChatSession.id == chat_id,
-        ChatSession.user_id == user.id
-    ).first()
-    
-    if not chat:
-        raise HTTPException(status_code=404, detail="Chat not found")
+    with stage("embed"):
+        q_emb = embed_query_cached(search_data.query)
+    with stage("search"):
+        rows = similarity_search(db, q_emb, k=search_data.k, query_text=search_data.query, user_id=user_id)
     
+    return {
+        "results": [
+            {
+                "document_id": row["document_id"],
+                "filename": row["filename"],
+                "text": row["chunk_text"],
+                "score": row["similarity"],
+                "metadata": row["metadata"]
+            }
+            for row in rows
+        ]
+    }
+
+LLM_UNAVAILABLE_DETAIL = "The language model is unavailable right now, please try again"
+
+SYSTEM_PROMPT = (
+    "You are a helpful assistant that answers questions about PDF documents using only the provided excerpts. "
+    "If the context is insufficient, say so briefly. Cite sources like [1], [2] at the end of sentences. "
+    "Be concise but comprehensive in your answers."
+)
+
+def build_prompt(db: Session, chat: ChatSession, query: str):
+    """Retrieve and pack the excerpts for a question and return (prompt, excerpts)
+
+    Excerpt n of the list is the one cited as [n] in the prompt.
+    """
     # Get query embedding
-    q_emb = embed_texts([query_data.query])[0]
+    with stage("embed"):
+        q_emb = embed_query_cached(query)
     
     # Search for similar chunks in the document
-    rows = similarity_search(db, q_emb, str(chat.document_id), k=8)
+    with stage("search"):
+        rows = similarity_search(db, q_emb, str(chat.document_id), k=CONTEXT_CANDIDATES, query_text=query)
     
-    # Take top 5 results
-    top_rows = rows[:5]
+    # Merge, dedupe and fit them into the token budget, most relevant first
+    with stage("pack"):
+        packed = pack_context(rows)
     
     excerpts = "\n\n".join(
-        f"[{i+1}] {r['chunk_text']}" for i, r in enumerate(top_rows)
+        f"[{i+1}] {excerpt['text']}" for i, excerpt in enumerate(packed)
     ) or "(no context found)"
+    
+    user_prompt = f"Here are relevant excerpts from the document:\n\n{excerpts}\n\nQuestion: {query}"
+    
+    return f"System: {SYSTEM_PROMPT}\n\nUser: {user_prompt}", packed
+
+def prepare_question(db: Session, chat_id: str, user_id: uuid.UUID, query: str):
+    """Check chat ownership and build the prompt; returns (chat id, prompt, excerpts)
+
+    Ends the transaction afterwards so no pooled connection is held while
+    the model generates.
+    """
+    chat = get_user_chat(db, chat_id, user_id)
+    prompt, excerpts = build_prompt(db, chat, query)
+    chat_uuid = chat.id
+    db.rollback()
+    return chat_uuid, prompt, excerpts
+
+def source_dicts(excerpts):
+    """One source per excerpt, so sources[n-1] is what the answer cites as [n]
+
+    Score and metadata are those of the excerpt's best chunk; "chunks" lists
+    every chunk the excerpt covers, best first.
+    """
+    return [
+        {
+            "text": excerpt['text'],
+            "score": excerpt['rows'][0]['similarity'],
+            "metadata": excerpt['rows'][0]['metadata'],
+            "chunks": [
+                {"chunk_index": row['chunk_index'], "score": row['similarity'], "metadata": row['metadata']}
+                for row in excerpt['rows']
+            ]
+        }
+        for excerpt in excerpts
+    ]
 
-    system_prompt = (
-        "You are a helpful assistant that answers questions about PDF documents using only the provided excerpts. "
-        "If the context is insufficient, say so briefly. Cite sources like [1], [2] at the end of sentences. "
-        "Be concise but comprehensive in your answers."
+def save_exchange(db: Session, chat_id, query: str, answer: Optional[str]):
+    """Store the user's question and, if there is one, the assistant's answer"""
+    db.add(ChatMessage(session_id=chat_id, role="user", content=query))
+    if answer:
+        db.add(ChatMessage(session_id=chat_id, role="assistant", content=answer))
+    
+    # Update chat timestamp
+    db.query(ChatSession).filter(ChatSession.id == chat_id).update(
+        {"updated_at": datetime.utcnow()}, synchronize_session=False
     )
+    db.commit()
+    response_cache.invalidate(messages_key(chat_id))
+
+@app.post("/api/chats/{chat_id}/ask")
+async def ask_question(
+    chat_id: str,
+    query_data: QueryBody,
+    _: bool = Depends(verify_internal_auth),
+    user_id: uuid.UUID = Depends(get_user_id_from_headers),
+    db: Session = Depends(get_db)
+):
+    """Ask a question in a chat; 503 if the model gives no answer, in which case nothing is saved"""
+    if not query_data.query.strip():
+        raise HTTPException(status_code=400, detail="Empty query")
     
-    user_prompt = f"Here are relevant excerpts from the document:\n\n{excerpts}\n\nQuestion: {query_data.query}"
+    # Database work runs in the threadpool; the model call only awaits
+    chat_uuid, prompt, excerpts = await run_in_threadpool(prepare_question, db, chat_id, user_id, query_data.query)
     
     try:
-        # Truncate if extremely long (OpenAI has token limits)
-        if len(user_prompt.split()) > 8000:
-            truncated_excerpts = excerpts[:6000] + "..."
-            user_prompt = f"Here are relevant excerpts from the document:\n\n{truncated_excerpts}\n\nQuestion: {query_data.query}"
-        
-        # Generate response using OpenAI
-        result = client(
-            f"System: {system_prompt}\n\nUser: {user_prompt}",
-            max_tokens=500,  # OpenAI tokens
-            temperature=0.7
-        )
-        
-        # Extract the generated text
-        answer = result[0]['generated_text'].strip()
-        
-        # Clean up the answer
-        answer = answer.replace("\n", " ").strip()
-        
-        # If the answer is empty or too short, provide a fallback
-        if not answer or len(answer) < 10:
-            answer = "Based on the provided context, I can see relevant information about your question. Could you please be more specific about what you'd like to know?"
-            
-    except Exception as e:
-        print(f"Error in chat completion: {str(e)}")  # Debug logging
-        # Provide a more helpful fallback response
-        answer = f"Based on the provided excerpts, I can help answer your question: '{query_data.query}'. The context shows relevant information that should address your query."
-    
-    # Save user message
-    user_msg = ChatMessage(
-        session_id=chat_id,
-        role="user",
-        content=query_data.query
-    )
-    db.add(user_msg)
-    
-    # Save assistant message
-    assistant_msg = ChatMessage(
-        session_id=chat_id,
-        role="assistant",
-        content=answer
-    )
-    db.add(assistant_msg)
+        with stage("llm"):
+            result = await llm_client()(
+                prompt,
+                max_tokens=500,  # OpenAI tokens
+                temperature=0.7
+            )
+    except LLMUnavailableError:
+        raise HTTPException(status_code=503, detail=LLM_UNAVAILABLE_DETAIL)
     
-    # Update chat timestamp
-    chat.updated_at = datetime.utcnow()
+    answer = result[0]['generated_text'].replace("\n", " ").strip()
+    if not answer:
+        logger.warning("Chat completion returned no text")
+        raise HTTPException(status_code=503, detail=LLM_UNAVAILABLE_DETAIL)
     
-    db.commit()
+    with stage("save"):
+        await run_in_threadpool(save_exchange, db, chat_uuid, query_data.query, answer)
     
     return {
         "answer": answer, 
-        "sources": [
-            {
-                "text": row['chunk_text'],
-                "score": row['similarity'],
-                "metadata": row['metadata']
-            }
-            for row in top_rows
-        ]
-    }
\ No newline at end of file
+        "sources": source_dicts(excerpts)
+    }
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+@app.post("/api/chats/{chat_id}/ask/stream")
+async def ask_question_stream(
+    chat_id: str,
+    query_data: QueryBody,
+    request: Request,
+    _: bool = Depends(verify_internal_auth),
+    user_id: uuid.UUID = Depends(get_user_id_from_headers),
+    db: Session = Depends(get_db)
+):
+    """Ask a question and stream the answer as server-sent events
+
+    Events: `sources` (sent before generation starts), one `token` per text
+    delta, then `done` with the stored answer, or `error` with a `detail` if
+    the model fails or gives no answer. The exchange is saved when the stream
+    ends; if the client disconnects, the partial answer is kept, and after
+    an `error` nothing is saved.
+    """
+    if not query_data.query.strip():
+        raise HTTPException(status_code=400, detail="Empty query")
+    
+    query = query_data.query
+    chat_uuid, prompt, excerpts = await run_in_threadpool(prepare_question, db, chat_id, user_id, query)
+    
+    def save(answer):
+        # The request session is closed before the body streams, so use a new one
+        session = SessionLocal()
+        try:
+            save_exchange(session, chat_uuid, query, answer)
+        except Exception:
+            logger.exception("Failed to save streamed answer")
+        finally:
+            session.close()
+    
+    async def events():
+        parts = []
+        failed = False
+        started = time.perf_counter()
+        generation = llm_client().stream(prompt, max_tokens=500, temperature=0.7)
+        try:
+            yield sse_event("sources", source_dicts(excerpts))
+            
+            try:
+                async for token in generation:
+                    if not parts:
+                        record_stage("first_token", time.perf_counter() - started)
+                    token = token.replace("\n", " ")
+                    parts.append(token)
+                    yield sse_event("token", {"text": token})
+                    if await request.is_disconnected():
+                        break
+                else:
+                    failed = not "".join(parts).strip()
+            except LLMUnavailableError:
+                failed = True
+            
+            if failed:
+                yield sse_event("error", {"detail": LLM_UNAVAILABLE_DETAIL})
+            else:
+                yield sse_event("done", {"answer": "".join(parts).strip()})
+        finally:
+            # Runs on completion and when the client goes away mid-answer; a disconnect
+            # cancels this task, so the cleanup is shielded to let it finish
+            with anyio.CancelScope(shield=True):
+                await generation.aclose()
+                record_stage("llm", time.perf_counter() - started)
+                if not failed:
+                    with stage("save"):
+                        await run_in_threadpool(save, "".join(parts).strip())
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
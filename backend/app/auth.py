@@ -1,5 +1,6 @@
 # backend/app/auth.py
 import os
+import logging
 import httpx
 from fastapi import HTTPException, Depends, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
@@ -12,13 +13,15 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
 
+logger = logging.getLogger(__name__)
+
 security = HTTPBearer()
 
 def get_allowed_test_users() -> list[str]:
     """Get list of allowed test user emails from environment variable"""
     allowed_users = os.getenv("ALLOWED_TEST_USERS")
     if not allowed_users:
-        print("WARNING: ALLOWED_TEST_USERS environment variable not set. No users will be allowed.")
+        logger.warning("ALLOWED_TEST_USERS environment variable not set. No users will be allowed.")
         return []
     return [email.strip().lower() for email in allowed_users.split(",")]
 
@@ -46,7 +49,7 @@ class GoogleAuth:
                 response.raise_for_status()
                 return response.json()
             except httpx.HTTPError as e:
-                print(f"Google token verification failed: {e}")
+                logger.warning("Google token verification failed: %s", e)
                 raise HTTPException(
                     status_code=status.HTTP_401_UNAUTHORIZED,
                     detail="Invalid Google token"
@@ -90,7 +93,7 @@ async def get_current_user(
         
         # Check if user is an allowed test user
         if not is_test_user(user_email):
-            print(f"Access denied for unauthorized user: {user_email}")
+            logger.warning("Access denied for unauthorized user: %s", user_email)
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Access restricted to test users only"
@@ -114,8 +117,8 @@ async def get_current_user(
     except HTTPException:
         # Re-raise HTTP exceptions (like our 403 Forbidden)
         raise
-    except Exception as e:
-        print(f"Authentication error: {e}")  # Debug logging
+    except Exception:
+        logger.exception("Authentication error")
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid authentication credentials"
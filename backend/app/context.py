@@ -0,0 +1,139 @@
+# backend/app/context.py
+import os
+import re
+import logging
+from functools import lru_cache
+from typing import Any, Dict, List
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", "1200"))  # Tokens of document excerpts per prompt
+CONTEXT_CANDIDATES = int(os.getenv("CONTEXT_CANDIDATES", "8"))  # Chunks retrieved per question before packing
+CONTEXT_DUPLICATE_THRESHOLD = float(os.getenv("CONTEXT_DUPLICATE_THRESHOLD", "0.8"))  # Shingle overlap at which a chunk adds nothing new
+SHINGLE_SIZE = 3  # Words per shingle for near-duplicate detection
+MIN_OVERLAP_CHARS = 10  # Shorter matches between neighbouring chunks are coincidence
+MAX_OVERLAP_CHARS = 200  # The chunker repeats 50 characters between neighbours
+
+SENTENCE_END = re.compile(r"[.!?][\"')\]]*(?=\s|$)")
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    """tiktoken encoding for CHAT_MODEL, or None when it cannot be loaded"""
+    try:
+        import tiktoken
+        try:
+            return tiktoken.encoding_for_model(os.getenv("CHAT_MODEL", "gpt-3.5-turbo"))
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")  # Non-OpenAI models: close enough for budgeting
+    except Exception as e:
+        logger.warning("Tokenizer unavailable, estimating tokens from length: %s", e)
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoder = _encoder()
+    if encoder is None:
+        return (len(text) + 3) // 4  # About four characters per token in English
+    return len(encoder.encode(text, disallowed_special=()))
+
+
+def pack_context(rows: List[Dict[str, Any]], budget: int = CONTEXT_TOKEN_BUDGET) -> List[Dict[str, Any]]:
+    """Excerpts to send with a question: the most relevant chunks that fit in budget tokens
+
+    rows come from similarity_search, most similar first. Near-duplicate
+    chunks are dropped, chunks that follow each other in their document are
+    merged into one excerpt without repeating their overlap, and excerpts are
+    taken in order of their best chunk while they fit. An excerpt larger than
+    what is left is cut at its last sentence that fits. Returns dicts with
+    the excerpt "text", its "tokens" and the "rows" it covers.
+    """
+    packed = []
+    remaining = budget
+    for excerpt in _merge_adjacent(_drop_near_duplicates(rows)):
+        text = excerpt["text"]
+        tokens = count_tokens(text)
+        if tokens > remaining:
+            text = _trim_to_tokens(text, remaining)
+            if not text:
+                continue
+            tokens = count_tokens(text)
+        covered = [row for row, start in zip(excerpt["rows"], excerpt["starts"]) if start < len(text)]
+        packed.append({
+            "text": text,
+            "tokens": tokens,
+            "rows": sorted(covered, key=lambda row: row["similarity"], reverse=True)
+        })
+        remaining -= tokens
+    return packed
+
+
+def _shingles(text: str) -> set:
+    words = text.lower().split()
+    return {tuple(words[i:i + SHINGLE_SIZE]) for i in range(max(len(words) - SHINGLE_SIZE + 1, 1))}
+
+
+def _drop_near_duplicates(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Keep each row unless a more relevant kept row says nearly the same thing"""
+    kept, kept_shingles = [], []
+    for row in rows:
+        shingles = _shingles(row["chunk_text"])
+        duplicate = any(
+            len(shingles & other) / len(shingles | other) >= CONTEXT_DUPLICATE_THRESHOLD
+            for other in kept_shingles
+        )
+        if not duplicate:
+            kept.append(row)
+            kept_shingles.append(shingles)
+    return kept
+
+
+def _merge_adjacent(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Group rows with consecutive chunk_index in one chunk set, in order of each group's best row
+
+    Each excerpt records where every row's text starts in the merged text.
+    """
+    rank = {id(row): i for i, row in enumerate(rows)}
+    groups = []
+    for row in sorted(rows, key=lambda row: (str(row["chunk_set_id"]), row["chunk_index"])):
+        previous = groups[-1][-1] if groups else None
+        if (
+            previous is not None
+            and previous["chunk_set_id"] == row["chunk_set_id"]
+            and previous["chunk_index"] + 1 == row["chunk_index"]
+        ):
+            groups[-1].append(row)
+        else:
+            groups.append([row])
+    groups.sort(key=lambda group: min(rank[id(row)] for row in group))
+
+    excerpts = []
+    for group in groups:
+        text, starts = group[0]["chunk_text"], [0]
+        for row in group[1:]:
+            starts.append(len(text))
+            text = _join_overlapping(text, row["chunk_text"])
+        excerpts.append({"text": text, "rows": group, "starts": starts})
+    return excerpts
+
+
+def _join_overlapping(left: str, right: str) -> str:
+    """Concatenate neighbouring chunks, dropping the text the chunker repeated at the start of right"""
+    for size in range(min(len(left), len(right), MAX_OVERLAP_CHARS), MIN_OVERLAP_CHARS - 1, -1):
+        if left.endswith(right[:size]):
+            return left + right[size:]
+    return f"{left} {right}"
+
+
+def _trim_to_tokens(text: str, budget: int) -> str:
+    """Longest prefix of text ending at a sentence end that fits in budget tokens, or ''"""
+    ends = [match.end() for match in SENTENCE_END.finditer(text)]
+    low, high, best = 0, len(ends) - 1, ""
+    while low <= high:
+        middle = (low + high) // 2
+        candidate = text[:ends[middle]]
+        if count_tokens(candidate) <= budget:
+            best, low = candidate, middle + 1
+        else:
+            high = middle - 1
+    return best
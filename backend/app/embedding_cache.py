@@ -0,0 +1,167 @@
+# backend/app/embedding_cache.py
+import os
+import hashlib
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Callable, Dict, List
+import numpy as np
+from sqlalchemy.dialects.postgresql import insert
+
+from .database import SessionLocal, EmbeddingCacheEntry
+from .embeddings import embed_texts, EMBEDDING_DIM, EMBEDDING_MODEL_ID
+from .metrics import EMBEDDING_CACHE_LOOKUPS
+
+EMBEDDING_CACHE_SIZE = int(os.getenv("EMBEDDING_CACHE_SIZE", "20000"))  # In-process entries (~1.5KB each)
+EMBEDDING_CACHE_PERSIST = os.getenv("EMBEDDING_CACHE_PERSIST", "true").lower() == "true"
+EMBEDDING_CACHE_TTL_DAYS = float(os.getenv("EMBEDDING_CACHE_TTL_DAYS", "30"))  # Persisted entries older than this are purged; 0 keeps them
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_text(text: str) -> str:
+    """Normalization applied before both hashing and embedding, so a hit equals a fresh embedding"""
+    return unicodedata.normalize("NFC", text.strip())
+
+
+def text_hash(text: str) -> str:
+    """SHA256 of the normalized text: the embedding cache key, and the content hash of a chunk"""
+    return hashlib.sha256(normalize_text(text).encode()).hexdigest()
+
+
+class EmbeddingCache:
+    """Content-addressed embedding cache: an in-process LRU in front of a Postgres table
+
+    Entries are keyed by (model id, SHA256 of the normalized text). The
+    persistent tier is best effort; if it is unavailable, embeddings are
+    computed as usual. Its rows expire after EMBEDDING_CACHE_TTL_DAYS and
+    are deleted by the purge job.
+    """
+    def __init__(self, model_id: str, embed_fn: Callable[[List[str]], np.ndarray], max_entries: int = EMBEDDING_CACHE_SIZE, persist: bool = EMBEDDING_CACHE_PERSIST):
+        self.model_id = model_id
+        self.embed_fn = embed_fn
+        self.max_entries = max_entries
+        self.persist = persist
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def embed(self, texts: List[str], persist: bool = True) -> np.ndarray:
+        """Embed texts, computing only those not already cached
+
+        persist=False keeps to the in-process tier, for one-off texts where a
+        database round trip costs more than embedding them again.
+        """
+        persist = persist and self.persist
+        normalized = [normalize_text(text) for text in texts]
+        result = np.empty((len(texts), EMBEDDING_DIM), dtype=np.float32)
+
+        # Row positions per text hash, so duplicates in one batch are embedded once
+        missing: Dict[str, List[int]] = {}
+        with self._lock:
+            for i, text in enumerate(normalized):
+                key = hashlib.sha256(text.encode()).hexdigest()
+                vector = self._entries.get(key)
+                if vector is not None:
+                    self._entries.move_to_end(key)
+                    result[i] = vector
+                    self.memory_hits += 1
+                else:
+                    missing.setdefault(key, []).append(i)
+        memory_hits = len(texts) - sum(len(rows) for rows in missing.values())
+        EMBEDDING_CACHE_LOOKUPS.labels("memory", "hit").inc(memory_hits)
+        EMBEDDING_CACHE_LOOKUPS.labels("memory", "miss").inc(len(texts) - memory_hits)
+
+        if missing and persist:
+            looked_up = sum(len(rows) for rows in missing.values())
+            persistent_hits = 0
+            for key, vector in self._load(list(missing)).items():
+                rows = missing.pop(key)
+                result[rows] = vector
+                self._remember(key, result[rows[0]])
+                persistent_hits += len(rows)
+            with self._lock:
+                self.persistent_hits += persistent_hits
+            EMBEDDING_CACHE_LOOKUPS.labels("postgres", "hit").inc(persistent_hits)
+            EMBEDDING_CACHE_LOOKUPS.labels("postgres", "miss").inc(looked_up - persistent_hits)
+
+        if missing:
+            keys = list(missing)
+            vectors = self.embed_fn([normalized[missing[key][0]] for key in keys])
+            for key, vector in zip(keys, vectors):
+                result[missing[key]] = vector
+                self._remember(key, vector)
+            with self._lock:
+                self.misses += len(keys)
+                self.memory_hits += sum(len(rows) - 1 for rows in missing.values())
+            if persist:
+                self._store(keys, vectors)
+
+        return result
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "memory_hits": self.memory_hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses
+            }
+
+    def _remember(self, key: str, vector: np.ndarray):
+        with self._lock:
+            self._entries[key] = np.array(vector, dtype=np.float32)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _load(self, keys: List[str]) -> Dict[str, np.ndarray]:
+        db = SessionLocal()
+        try:
+            rows = db.query(EmbeddingCacheEntry.text_hash, EmbeddingCacheEntry.embedding).filter(
+                EmbeddingCacheEntry.model_id == self.model_id,
+                EmbeddingCacheEntry.text_hash.in_(keys)
+            ).all()
+            return {text_hash: embedding for text_hash, embedding in rows}
+        except Exception as e:
+            logger.warning("Embedding cache lookup failed: %s", e)
+            return {}
+        finally:
+            db.close()
+
+    def _store(self, keys: List[str], vectors: np.ndarray):
+        db = SessionLocal()
+        try:
+            db.execute(
+                insert(EmbeddingCacheEntry).on_conflict_do_nothing(),
+                [
+                    {"model_id": self.model_id, "text_hash": key, "embedding": vector}
+                    for key, vector in zip(keys, vectors)
+                ]
+            )
+            db.commit()
+        except Exception as e:
+            db.rollback()
+            logger.warning("Embedding cache write failed: %s", e)
+        finally:
+            db.close()
+
+
+embedding_cache = EmbeddingCache(EMBEDDING_MODEL_ID, embed_texts)
+
+
+def embed_texts_cached(texts: List[str]) -> np.ndarray:
+    """embed_texts through the shared embedding cache"""
+    return embedding_cache.embed(texts)
+
+
+def embed_query_cached(query: str) -> np.ndarray:
+    """Embedding of a search query; queries rarely repeat across processes, so only the in-process tier is used"""
+    return embedding_cache.embed([query], persist=False)[0]
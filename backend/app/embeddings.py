@@ -1,49 +1,43 @@
 # backend/app/embeddings.py
 import hashlib
 from typing import List
+import numpy as np
 
-def embed_texts(texts: List[str]) -> List[list]:
-    """Generate 384-dimensional embeddings for text search"""
-    # Create 384-dimensional vectors to match the database schema
+EMBEDDING_DIM = 384
+EMBEDDING_MODEL_ID = "hash-md5-sha256-charfreq-v1"  # Identifies embed_texts output for caches; bump when it changes
+MD5_DIMS = 16  # One dimension per digest byte
+SHA256_DIMS = 32
+CHAR_DIMS = 128  # Frequencies of code points ord('a') .. ord('a') + 127
+CHAR_OFFSET = MD5_DIMS + SHA256_DIMS
+
+
+def embed_texts(texts: List[str]) -> np.ndarray:
+    """Generate 384-dimensional embeddings for text search as a contiguous (n, 384) float32 matrix"""
     # This is a simple hash-based approach that creates consistent 384-dim vectors
-    embeddings = []
-    for text in texts:
-        # Create a more sophisticated hash-based vector
-        text_lower = text.lower()
-        
-        # Use multiple hash functions to create a 384-dimensional vector
-        vector = []
-        
-        # Method 1: MD5 hash expanded to 128 dimensions
-        md5_hash = hashlib.md5(text_lower.encode()).hexdigest()
-        for i in range(0, len(md5_hash), 2):
-            hex_pair = md5_hash[i:i+2]
-            vector.append(int(hex_pair, 16) / 255.0)  # Normalize to 0-1
-        
-        # Method 2: SHA256 hash expanded to 128 dimensions  
-        sha256_hash = hashlib.sha256(text_lower.encode()).hexdigest()
-        for i in range(0, len(sha256_hash), 2):
-            hex_pair = sha256_hash[i:i+2]
-            vector.append(int(hex_pair, 16) / 255.0)  # Normalize to 0-1
-        
-        # Method 3: Character frequency-based features (128 dimensions)
-        char_counts = {}
-        for char in text_lower:
-            char_counts[char] = char_counts.get(char, 0) + 1
-        
-        # Create features based on character frequencies
-        for i in range(128):
-            char_code = (i + ord('a')) % 256
-            char = chr(char_code)
-            freq = char_counts.get(char, 0)
-            # Normalize frequency
-            vector.append(min(freq / max(len(text), 1), 1.0))
-        
-        # Ensure we have exactly 384 dimensions
-        while len(vector) < 384:
-            vector.append(0.0)
-        vector = vector[:384]
-        
-        embeddings.append(vector)
-    
-    return embeddings
+    n = len(texts)
+    embeddings = np.zeros((n, EMBEDDING_DIM), dtype=np.float64)
+    if n == 0:
+        return embeddings.astype(np.float32)
+
+    lowered = [text.lower() for text in texts]
+    encoded = [text.encode() for text in lowered]
+
+    # Method 1 and 2: MD5 and SHA256 digest bytes, normalized to 0-1
+    md5_bytes = b"".join(hashlib.md5(data).digest() for data in encoded)
+    sha256_bytes = b"".join(hashlib.sha256(data).digest() for data in encoded)
+    embeddings[:, :MD5_DIMS] = np.frombuffer(md5_bytes, dtype=np.uint8).reshape(n, MD5_DIMS) / 255.0
+    embeddings[:, MD5_DIMS:CHAR_OFFSET] = np.frombuffer(sha256_bytes, dtype=np.uint8).reshape(n, SHA256_DIMS) / 255.0
+
+    # Method 3: Character frequency-based features, counted for the whole batch at once
+    codes = np.frombuffer("".join(lowered).encode("utf-32-le"), dtype=np.uint32)
+    owners = np.repeat(np.arange(n), [len(text) for text in lowered])
+    in_range = (codes >= ord('a')) & (codes < ord('a') + CHAR_DIMS)
+    counts = np.bincount(
+        owners[in_range] * CHAR_DIMS + (codes[in_range] - ord('a')),
+        minlength=n * CHAR_DIMS
+    ).reshape(n, CHAR_DIMS)
+    lengths = np.array([max(len(text), 1) for text in texts], dtype=np.float64)
+    embeddings[:, CHAR_OFFSET:CHAR_OFFSET + CHAR_DIMS] = np.minimum(counts / lengths[:, None], 1.0)
+
+    # Remaining dimensions stay zero; cast once so values match float32(per-text computation)
+    return np.ascontiguousarray(embeddings, dtype=np.float32)
@@ -0,0 +1,122 @@
+# backend/app/http_cache.py
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+from fastapi import Response
+from fastapi.responses import JSONResponse
+
+RESPONSE_CACHE_SIZE = int(os.getenv("RESPONSE_CACHE_SIZE", "1000"))  # Serialized payloads kept in process, 0 disables
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag for a payload identified by its version parts"""
+    digest = hashlib.sha256("|".join(str(part) for part in parts).encode()).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison: `*`, or any listed tag equal to etag ignoring weakness"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    # Proxies may weaken the tag (W/"...") on the way back
+    candidates = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return etag in candidates
+
+
+class ResponseCache:
+    """Serialized JSON payloads of read endpoints, keyed by resource and tagged with their version
+
+    The version is derived from the database on every request, so an entry
+    written before a change made elsewhere (another worker, an ingestion job)
+    is simply never served. Write endpoints invalidate their keys as well to
+    free the memory early. Responses carry no Last-Modified: deleting a
+    document or chat leaves the newest timestamp of a list unchanged, so
+    only the ETag, which also covers the count, can validate it.
+    """
+    def __init__(self, max_entries: int = RESPONSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[Tuple, Tuple[str, bytes, Dict[str, str]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+
+    def respond(
+        self,
+        key: Tuple,
+        etag: str,
+        if_none_match: Optional[str],
+        build: Callable[[], Any]
+    ) -> Response:
+        """304 if the client's tag is current, else the cached or freshly built payload
+
+        build returns the payload, or (payload, extra response headers).
+        """
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(if_none_match, etag):
+            with self._lock:
+                self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        cached = self._get(key, etag)
+        if cached is None:
+            payload, extra_headers = build(), {}
+            if isinstance(payload, tuple):
+                payload, extra_headers = payload
+            cached = (JSONResponse(payload).body, extra_headers)
+            self._put(key, etag, *cached)
+        body, extra_headers = cached
+        return Response(content=body, media_type="application/json", headers={**headers, **extra_headers})
+
+    def invalidate(self, *keys: Tuple):
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified
+            }
+
+    def _get(self, key: Tuple, etag: str) -> Optional[Tuple[bytes, Dict[str, str]]]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == etag:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[1], entry[2]
+            self.misses += 1
+            return None
+
+    def _put(self, key: Tuple, etag: str, body: bytes, extra_headers: Dict[str, str]):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (etag, body, extra_headers)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+response_cache = ResponseCache()
+
+
+def documents_key(user_id, *page) -> Tuple:
+    return ("documents", str(user_id), *page)
+
+
+def chats_key(document_id, user_id) -> Tuple:
+    return ("chats", str(document_id), str(user_id))
+
+
+def messages_key(chat_id, *page) -> Tuple:
+    """Key of a chat's messages; page is (limit, before) for paginated reads"""
+    return ("messages", str(chat_id), *page)
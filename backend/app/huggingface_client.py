@@ -1,7 +1,17 @@
 # backend/app/huggingface_client.py
 import os
-import requests
-from typing import List, Dict, Any
+import asyncio
+import logging
+import httpx
+from typing import Dict, AsyncIterator, Tuple
+
+from .llm import LLMUnavailableError
+from .openai_client import LLM_MAX_CONCURRENCY
+
+HUGGINGFACE_TIMEOUT = float(os.getenv("HUGGINGFACE_TIMEOUT", "60"))  # Seconds, including a cold model load
+HUGGINGFACE_MAX_CONNECTIONS = int(os.getenv("HUGGINGFACE_MAX_CONNECTIONS", "20"))
+
+logger = logging.getLogger(__name__)
 
 def get_huggingface_client(**maybe_config):
     """Get Hugging Face client for text generation using Inference API"""
@@ -12,20 +22,57 @@ def get_huggingface_client(**maybe_config):
     if not api_key:
         raise RuntimeError("HUGGINGFACE_API_KEY not set")
     
-    print(f"🔄 Using Hugging Face Inference API for model: {model_name}")
+    logger.info("Using Hugging Face Inference API for model: %s", model_name)
     return HuggingFaceInferenceClient(api_key, base_url, model_name)
 
 class HuggingFaceInferenceClient:
-    """Client for Hugging Face Inference Endpoints"""
-    def __init__(self, api_key, base_url, model_name):
+    """Client for Hugging Face Inference Endpoints, with the same interface as AsyncOpenAIClient
+
+    Requests go through one keep-alive connection pool with a timeout, at
+    most LLM_MAX_CONCURRENCY at a time. Identical prompts (same generation
+    parameters) that are in flight together share a single upstream call,
+    and a failure raises LLMUnavailableError in every caller waiting on it.
+    """
+    def __init__(self, api_key, base_url, model_name, timeout: float = HUGGINGFACE_TIMEOUT, max_concurrency: int = LLM_MAX_CONCURRENCY, transport: httpx.AsyncBaseTransport = None):
         self.api_key = api_key
         self.base_url = base_url.rstrip('/')
         self.model_name = model_name
         self.headers = {"Authorization": f"Bearer {api_key}"}
+        self.http = httpx.AsyncClient(
+            headers=self.headers,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=HUGGINGFACE_MAX_CONNECTIONS, max_keepalive_connections=HUGGINGFACE_MAX_CONNECTIONS),
+            transport=transport  # Tests pass a fake; None is the usual pooled HTTP transport
+        )
+        self.semaphore = asyncio.Semaphore(max_concurrency)
         self.api_working = None  # Will be set on first call
+        self._in_flight: Dict[Tuple, asyncio.Future] = {}
+        self.coalesced = 0
+    
+    async def __call__(self, prompt, max_tokens=300, temperature=0.7, **kwargs):
+        """Call the Hugging Face Inference API; raises LLMUnavailableError if it fails"""
+        max_new_tokens = kwargs.get("max_new_tokens", max_tokens)
+        key = (prompt, max_new_tokens, temperature)
+        call = self._in_flight.get(key)
+        if call is None:
+            call = asyncio.ensure_future(self._generate(prompt, max_new_tokens, temperature))
+            self._in_flight[key] = call
+            call.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.coalesced += 1
+        # One caller going away must not cancel the call the others are waiting on
+        generated_text = await asyncio.shield(call)
+        return [{"generated_text": generated_text}]
+    
+    async def stream(self, prompt, max_tokens=300, temperature=0.7, **kwargs) -> AsyncIterator[str]:
+        """Same interface as AsyncOpenAIClient.stream; the Inference API answer arrives in one piece"""
+        result = await self(prompt, max_tokens=max_tokens, temperature=temperature, **kwargs)
+        yield result[0]["generated_text"]
     
-    def __call__(self, prompt, max_new_tokens=150, temperature=0.7, **kwargs):
-        """Call the Hugging Face Inference API with fallback"""
+    async def aclose(self):
+        await self.http.aclose()
+    
+    async def _generate(self, prompt, max_new_tokens, temperature) -> str:
         url = f"{self.base_url}/models/{self.model_name}"
         
         payload = {
@@ -42,52 +89,24 @@ class HuggingFaceInferenceClient:
         }
         
         try:
-            response = requests.post(url, json=payload, headers=self.headers)
-            
-            if response.status_code == 200:
-                self.api_working = True
-                result = response.json()
-                
-                # Handle the response format from Hugging Face Inference API
-                if isinstance(result, list) and len(result) > 0:
-                    generated_text = result[0].get("generated_text", "")
-                else:
-                    generated_text = str(result)
-                
-                return [{"generated_text": prompt + generated_text}]
-            else:
-                print(f"⚠️ Hugging Face API error: {response.status_code} - {response.text}")
-                self.api_working = False
-                return self._fallback_response(prompt)
-                
-        except Exception as e:
-            print(f"⚠️ Hugging Face API exception: {e}")
+            async with self.semaphore:
+                response = await self.http.post(url, json=payload)
+        except httpx.HTTPError as e:
+            logger.warning("Hugging Face API exception: %r", e)
             self.api_working = False
-            return self._fallback_response(prompt)
-    
-    def _fallback_response(self, prompt):
-        """Fallback response when API is not available"""
-        return [{"generated_text": prompt + " I understand your question, but I'm currently unable to access the AI model. Please check your Hugging Face API configuration."}]
-
-class SimpleTextGenerator:
-    """Simple fallback text generator"""
-    def __call__(self, prompt, **kwargs):
-        # Extract the question from the prompt
-        if "Question:" in prompt:
-            question = prompt.split("Question:")[-1].split("Answer:")[0].strip()
-        else:
-            question = "your question"
+            raise LLMUnavailableError(repr(e)) from e
         
-        # Generate a more helpful response based on the context
-        if "Excerpts:" in prompt:
-            excerpts = prompt.split("Excerpts:")[1].split("Question:")[0].strip()
-            if len(excerpts) > 100:
-                response = f"Based on the provided excerpts, I can see relevant information about '{question}'. The context contains detailed information that should help answer your question. Let me know if you need me to elaborate on any specific aspect."
-            else:
-                response = f"I can see some context about '{question}', but it may be limited. Could you provide more specific details about what you'd like to know?"
-        else:
-            response = f"I understand you're asking about '{question}'. However, I don't see any specific context or excerpts to reference. Could you provide more details or upload a document to get a more specific answer?"
+        if response.status_code != 200:
+            logger.warning("Hugging Face API error: %s - %s", response.status_code, response.text)
+            self.api_working = False
+            raise LLMUnavailableError(f"Hugging Face API returned {response.status_code}")
+        
+        self.api_working = True
+        result = response.json()
         
-        return [{"generated_text": prompt + response}]
+        # Handle the response format from Hugging Face Inference API
+        if isinstance(result, list) and len(result) > 0:
+            return result[0].get("generated_text", "")
+        return str(result)
 
 # Embedding functionality removed - using simple text search instead
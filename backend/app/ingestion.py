@@ -0,0 +1,407 @@
+# backend/app/ingestion.py
+import os
+import time
+import hashlib
+import logging
+import tempfile
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from sqlalchemy.orm import Session
+from sqlalchemy.exc import SQLAlchemyError
+
+from .log import configure_logging
+from .metrics import StageTimer, observe_stages
+from .database import SessionLocal, IngestionJob, ChunkSet
+from .pdf_parser import iter_pdf_pages, iter_chunks, CHUNK_SIZE, CHUNK_OVERLAP
+from .embedding_cache import embed_texts_cached
+from .vector_store import insert_document, insert_chunks, acquire_chunk_set, create_chunk_set
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(tempfile.gettempdir(), "pdf-chat-uploads"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "2"))
+INGEST_MAX_ATTEMPTS = int(os.getenv("INGEST_MAX_ATTEMPTS", "3"))
+INGEST_STALE_SECONDS = int(os.getenv("INGEST_STALE_SECONDS", "600"))  # Running jobs with no progress for this long are requeued
+INGEST_BATCH_SIZE = int(os.getenv("INGEST_BATCH_SIZE", "128"))  # Chunks embedded and inserted together
+COPY_BLOCK_SIZE = 1024 * 1024
+PROGRESS_INTERVAL = 1.0  # Seconds between progress writes to the job row
+
+_executor: Optional[ProcessPoolExecutor] = None
+logger = logging.getLogger(__name__)
+
+
+class IngestionError(Exception):
+    """Ingestion failure that should be reported to the user as-is"""
+
+
+def save_upload(fileobj) -> Tuple[str, str]:
+    """Copy an uploaded file into UPLOAD_DIR, hashing it on the way; returns (path, SHA256 hex)"""
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    digest = hashlib.sha256()
+    with tempfile.NamedTemporaryFile(delete=False, suffix=".pdf", dir=UPLOAD_DIR) as tmp:
+        while True:
+            block = fileobj.read(COPY_BLOCK_SIZE)
+            if not block:
+                break
+            digest.update(block)
+            tmp.write(block)
+        return tmp.name, digest.hexdigest()
+
+
+def create_job(db: Session, user_id: str, original_filename: str, file_path: str, file_size: int = None, content_hash: str = None) -> str:
+    """Insert a queued ingestion job and return its ID"""
+    job = IngestionJob(
+        user_id=user_id,
+        original_filename=original_filename,
+        file_path=file_path,
+        file_size=file_size,
+        content_hash=content_hash
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    return str(job.id)
+
+
+def complete_if_duplicate(db: Session, job_id: str) -> bool:
+    """Finish a queued job at once when its content is already ingested; returns True if it was"""
+    job = db.query(IngestionJob).filter(
+        IngestionJob.id == job_id,
+        IngestionJob.status == "queued"
+    ).with_for_update(skip_locked=True).first()
+    if job is None or not job.content_hash:
+        db.rollback()
+        return False
+
+    chunk_set_id = acquire_chunk_set(db, job.content_hash)
+    if chunk_set_id is None:
+        db.rollback()
+        return False
+
+    _finish_job(db, job, chunk_set_id, deduplicated=True)
+    _remove_file(job.file_path)
+    return True
+
+
+def get_job(db: Session, job_id: str, user_id: str) -> Optional[IngestionJob]:
+    """Get a job owned by the given user"""
+    return db.query(IngestionJob).filter(
+        IngestionJob.id == job_id,
+        IngestionJob.user_id == user_id
+    ).first()
+
+
+def job_to_dict(job: IngestionJob) -> Dict[str, Any]:
+    """Serialize a job for the upload status endpoint"""
+    return {
+        "job_id": str(job.id),
+        "status": job.status,
+        "stage": job.stage,
+        "filename": job.original_filename,
+        "document_id": str(job.document_id) if job.document_id else None,
+        "progress": {
+            "pages_total": job.pages_total or 0,
+            "pages_extracted": job.pages_extracted or 0,
+            "chunks_total": job.chunks_total or 0,
+            "chunks_embedded": job.chunks_embedded or 0,
+            "chunks_stored": job.chunks_stored or 0
+        },
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None
+    }
+
+
+def start_workers():
+    """Start the ingestion process pool and resubmit jobs left over from a previous run"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=INGEST_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=configure_logging
+        )
+
+    db = SessionLocal()
+    try:
+        job_ids = recover_jobs(db)
+    except SQLAlchemyError as e:
+        # Not migrated yet; /api/readyz reports it, and jobs are recovered on the next start
+        logger.warning("Could not recover ingestion jobs: %s", e)
+        job_ids = []
+    finally:
+        db.close()
+
+    if job_ids:
+        logger.info("Resuming %d queued ingestion jobs", len(job_ids))
+    for job_id in job_ids:
+        submit_job(job_id)
+
+
+def stop_workers():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+
+def submit_job(job_id: str):
+    """Hand a queued job to the process pool"""
+    global _executor
+    if _executor is None:
+        raise RuntimeError("Ingestion workers are not running")
+    try:
+        _executor.submit(run_job, job_id).add_done_callback(_observe_job_stages)
+    except BrokenProcessPool:
+        # A worker died (e.g. a PDF crashed pdfplumber); replace the pool and retry once
+        logger.warning("Ingestion pool is broken, restarting it")
+        _executor = None
+        start_workers()
+
+
+def _observe_job_stages(future: Future):
+    # Workers are separate processes, so their stage timings come back as the job's result
+    if not future.cancelled() and future.exception() is None and future.result():
+        observe_stages("ingest", future.result())
+
+
+def requeue_stale_jobs(db: Session) -> List[str]:
+    """Requeue running jobs that stopped making progress and return their IDs
+
+    A running job's progress writes keep its updated_at fresh, so one that
+    has not moved for INGEST_STALE_SECONDS lost its worker (a crash, a
+    restart). Jobs out of attempts are failed instead.
+    """
+    stale_before = datetime.utcnow() - timedelta(seconds=INGEST_STALE_SECONDS)
+    stale_jobs = db.query(IngestionJob).filter(
+        IngestionJob.status == "running",
+        IngestionJob.updated_at < stale_before
+    ).with_for_update(skip_locked=True).all()
+
+    requeued = []
+    for job in stale_jobs:
+        if (job.attempts or 0) >= INGEST_MAX_ATTEMPTS:
+            job.status = "failed"
+            job.error = "Ingestion did not complete after repeated attempts"
+            job.finished_at = datetime.utcnow()
+            _remove_file(job.file_path)
+        else:
+            job.status = "queued"
+            job.stage = "queued"
+            requeued.append(str(job.id))
+    db.commit()
+    return requeued
+
+
+def recover_jobs(db: Session) -> List[str]:
+    """Requeue stale running jobs and return all queued job IDs"""
+    requeue_stale_jobs(db)
+    queued = db.query(IngestionJob.id).filter(
+        IngestionJob.status == "queued"
+    ).order_by(IngestionJob.created_at).all()
+    return [str(job_id) for (job_id,) in queued]
+
+
+def resubmit_stale_jobs() -> int:
+    """Requeue jobs that stalled since startup and hand them to this process's workers
+
+    Called periodically by the purger, so a job whose worker died is picked
+    up again without waiting for the next restart.
+    """
+    if _executor is None:
+        return 0
+    db = SessionLocal()
+    try:
+        job_ids = requeue_stale_jobs(db)
+    finally:
+        db.close()
+    for job_id in job_ids:
+        submit_job(job_id)
+    return len(job_ids)
+
+
+class _JobProgress:
+    """Throttled writer for a job's stage and progress counters
+
+    Uses its own session so progress commits never touch the ingestion transaction.
+    """
+    def __init__(self, job_id: str):
+        self.db = SessionLocal()
+        self.job_id = job_id
+        self.pending = {}
+        self.last_flush = 0.0
+
+    def update(self, force=False, **fields):
+        self.pending.update(fields)
+        if force or time.monotonic() - self.last_flush >= PROGRESS_INTERVAL:
+            self.flush()
+
+    def flush(self):
+        if not self.pending:
+            return
+        fields = dict(self.pending, updated_at=datetime.utcnow())
+        self.db.query(IngestionJob).filter(IngestionJob.id == self.job_id).update(fields, synchronize_session=False)
+        self.db.commit()
+        self.pending = {}
+        self.last_flush = time.monotonic()
+
+    def close(self):
+        self.db.close()
+
+
+def run_job(job_id: str) -> Optional[Dict[str, float]]:
+    """Worker entry point: ingest one queued upload; returns seconds spent per stage"""
+    db = SessionLocal()
+    try:
+        job = _claim_job(db, job_id)
+        if job is None:
+            return None  # Claimed by another worker or no longer queued
+
+        progress = _JobProgress(job_id)
+        timer = StageTimer()
+        try:
+            _ingest(db, job, progress, timer)
+        except Exception as e:
+            # The document and its chunks are committed together, so nothing is left behind
+            db.rollback()
+            logger.error("Ingestion job %s failed: %s", job_id, e)
+            message = str(e) if isinstance(e, IngestionError) else "Failed to process PDF"
+            progress.pending.clear()
+            progress.update(force=True, status="failed", error=message, finished_at=datetime.utcnow())
+        finally:
+            progress.close()
+        _remove_file(job.file_path)
+        return timer.stages
+    finally:
+        db.close()
+
+
+def _claim_job(db: Session, job_id: str) -> Optional[IngestionJob]:
+    job = db.query(IngestionJob).filter(
+        IngestionJob.id == job_id,
+        IngestionJob.status == "queued"
+    ).with_for_update(skip_locked=True).first()
+    if job is None:
+        db.rollback()
+        return None
+
+    job.status = "running"
+    job.stage = "processing"
+    job.attempts = (job.attempts or 0) + 1
+    job.started_at = datetime.utcnow()
+    job.error = None
+    db.commit()
+    db.refresh(job)
+    return job
+
+
+def _ingest(db: Session, job: IngestionJob, progress: _JobProgress, timer: StageTimer):
+    """Stream pages -> chunks -> embeddings -> DB in fixed-size batches
+
+    Only the current batch and a partial chunk are held in memory, however
+    long the PDF is. The stages interleave, so each one's time is summed
+    over the batches.
+    """
+    if not os.path.exists(job.file_path):
+        raise IngestionError("Uploaded file is no longer available, please upload it again")
+
+    pages = timer.timed_iter("extract", iter_pdf_pages(
+        job.file_path,
+        on_page=lambda done, total: progress.update(pages_extracted=done, pages_total=total)
+    ))
+    chunks = timer.timed_iter("chunk", iter_chunks(pages, chunk_size=CHUNK_SIZE, overlap=CHUNK_OVERLAP))
+
+    # Chunk set, chunks, document row and the job's completion are one transaction
+    if job.content_hash:
+        # The same content may have been ingested while this job was queued
+        chunk_set_id = acquire_chunk_set(db, job.content_hash)
+        if chunk_set_id:
+            with timer.stage("commit"):
+                _finish_job(db, job, chunk_set_id, deduplicated=True)
+            return
+
+    chunk_set_id = create_chunk_set(db, job.content_hash)
+    if chunk_set_id is None:
+        # A concurrent upload of this content committed while we waited on it
+        chunk_set_id = acquire_chunk_set(db, job.content_hash)
+        if chunk_set_id is None:
+            raise IngestionError("The same file was being deleted at the same time, please upload it again")
+        with timer.stage("commit"):
+            _finish_job(db, job, chunk_set_id, deduplicated=True)
+        return
+
+    stored = 0
+    for batch in _batched(chunks, INGEST_BATCH_SIZE):
+        with timer.stage("embed"):
+            embeddings = embed_texts_cached(batch)
+        with timer.stage("insert"):
+            insert_chunks(
+                db,
+                chunk_set_id,
+                batch,
+                embeddings,
+                # Chunk sets are shared across users, so metadata carries no filename
+                [{"index": stored + i} for i in range(len(batch))],
+                start_index=stored,
+                commit=False
+            )
+        stored += len(batch)
+        progress.update(chunks_total=stored, chunks_embedded=stored, chunks_stored=stored)
+
+    if stored == 0:
+        raise IngestionError("No extractable text found in PDF")
+    logger.info("Stored %d chunks", stored)
+
+    db.query(ChunkSet).filter(ChunkSet.id == chunk_set_id).update({"chunk_count": stored}, synchronize_session=False)
+
+    # Fold any throttled counters into the completing update
+    final = dict(progress.pending, chunks_embedded=stored)
+    progress.pending.clear()
+    with timer.stage("commit"):
+        _finish_job(db, job, chunk_set_id, counters=final)
+
+
+def _finish_job(db: Session, job: IngestionJob, chunk_set_id: str, deduplicated: bool = False, counters: Dict[str, Any] = None) -> str:
+    """Create the user's document on a chunk set, mark the job completed and commit"""
+    doc_id = insert_document(
+        db,
+        str(job.user_id),
+        job.original_filename,
+        job.original_filename,
+        job.file_size,
+        chunk_set_id=chunk_set_id,
+        commit=False
+    )
+    chunk_count = db.query(ChunkSet.chunk_count).filter(ChunkSet.id == chunk_set_id).scalar() or 0
+    db.query(IngestionJob).filter(IngestionJob.id == job.id).update({
+        **(counters or {}),
+        "document_id": doc_id,
+        "deduplicated": deduplicated,
+        "status": "completed",
+        "stage": "done",
+        "chunks_total": chunk_count,
+        "chunks_stored": chunk_count,
+        "finished_at": datetime.utcnow(),
+        "updated_at": datetime.utcnow()
+    }, synchronize_session=False)
+    db.commit()
+    return doc_id
+
+
+def _batched(items: Iterable[str], size: int) -> Iterator[List[str]]:
+    batch = []
+    for item in items:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _remove_file(path: str):
+    try:
+        os.remove(path)
+    except Exception:
+        pass
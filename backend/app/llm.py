@@ -0,0 +1,43 @@
+# backend/app/llm.py
+import os
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "openai")  # openai or huggingface
+
+_client = None
+
+
+class LLMUnavailableError(RuntimeError):
+    """The model gave no answer: the upstream call failed for good, after any retries"""
+
+def get_llm_client(**maybe_config):
+    """Get the configured async text generation client
+
+    Both clients are awaited as client(prompt, max_tokens=..., temperature=...),
+    returning [{"generated_text": ...}], and stream deltas with client.stream(...).
+    Both raise LLMUnavailableError instead of answering when the model fails.
+    """
+    if LLM_PROVIDER == "huggingface":
+        from .huggingface_client import get_huggingface_client
+        return get_huggingface_client(**maybe_config)
+    if LLM_PROVIDER == "openai":
+        from .openai_client import get_async_openai_client
+        return get_async_openai_client(**maybe_config)
+    raise RuntimeError(f"Unknown LLM_PROVIDER: {LLM_PROVIDER}")
+
+
+def llm_client():
+    """The process-wide client, created on first use so importing the app stays cheap
+
+    Only called from the event loop, so creation needs no lock.
+    """
+    global _client
+    if _client is None:
+        _client = get_llm_client()
+    return _client
+
+
+async def close_llm_client():
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
@@ -0,0 +1,22 @@
+# backend/app/log.py
+import os
+import logging
+
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").upper()  # DEBUG adds per-page extraction lines
+LOG_FORMAT = "%(asctime)s %(levelname)s %(processName)s %(name)s: %(message)s"
+
+
+def configure_logging():
+    """Send app.* loggers to stderr at LOG_LEVEL; also the initializer of worker processes
+
+    The module run with `python -m` logs as __main__, so it is included.
+    """
+    for name in ("app", "__main__"):
+        logger = logging.getLogger(name)
+        if logger.handlers:
+            continue
+        handler = logging.StreamHandler()
+        handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        logger.addHandler(handler)
+        logger.setLevel(LOG_LEVEL)
+        logger.propagate = False
@@ -0,0 +1,178 @@
+# backend/app/metrics.py
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple
+from prometheus_client import Counter, Gauge, Histogram, generate_latest, CONTENT_TYPE_LATEST
+from starlette.datastructures import MutableHeaders
+
+# Seconds; ingestion stages of long PDFs run for minutes
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+STAGE_SECONDS = Histogram(
+    "pdfchat_stage_duration_seconds",
+    "Time spent in one stage of a request or ingestion job, excluding nested stages",
+    ["operation", "stage"],
+    buckets=BUCKETS
+)
+REQUEST_SECONDS = Histogram(
+    "pdfchat_request_duration_seconds",
+    "HTTP request duration until the response body is complete",
+    ["method", "route", "status"],
+    buckets=BUCKETS
+)
+
+# The engine's connection pool; database.py records checkouts and points the gauges at the pool
+DB_POOL_WAIT_SECONDS = Histogram(
+    "pdfchat_db_pool_wait_seconds",
+    "Time a checkout waited for a pooled database connection, including checkouts that timed out",
+    buckets=BUCKETS
+)
+DB_POOL_TIMEOUTS = Counter(
+    "pdfchat_db_pool_timeouts",
+    "Checkouts that gave up after DB_POOL_TIMEOUT seconds without a free connection"
+)
+DB_POOL_CONNECTIONS = Gauge(
+    "pdfchat_db_pool_connections",
+    "Pooled database connections by state (checked_out, idle, overflow)",
+    ["state"]
+)
+DB_POOL_SATURATION = Gauge(
+    "pdfchat_db_pool_saturation",
+    "Checked-out connections as a share of DB_POOL_SIZE + DB_MAX_OVERFLOW"
+)
+
+# In-process caches; embedding_cache.py and vector_cache.py count lookups as they happen
+EMBEDDING_CACHE_LOOKUPS = Counter(
+    "pdfchat_embedding_cache_lookups",
+    "Texts looked up in the embedding cache by tier (memory, postgres) and result (hit, miss)",
+    ["tier", "result"]
+)
+VECTOR_CACHE_SEARCHES = Counter(
+    "pdfchat_vector_cache_searches",
+    "Searches offered to the chunk matrix cache by result (hit, load, fallback)",
+    ["result"]
+)
+VECTOR_CACHE_ENTRIES = Gauge(
+    "pdfchat_vector_cache_entries",
+    "Chunk sets held by the chunk matrix cache"
+)
+VECTOR_CACHE_BYTES = Gauge(
+    "pdfchat_vector_cache_bytes",
+    "Estimated memory held by the chunk matrix cache"
+)
+
+
+class StageTimer:
+    """Accumulated seconds per named stage of one request or job
+
+    Stages may nest; a stage's time excludes the stages that ran inside it,
+    so the stages of a request add up to at most its total.
+    """
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self._nested: List[float] = []
+
+    @contextmanager
+    def stage(self, name: str):
+        start = time.perf_counter()
+        self._nested.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.add(name, elapsed - self._nested.pop())
+            if self._nested:
+                self._nested[-1] += elapsed
+
+    def add(self, name: str, seconds: float):
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+
+    def timed_iter(self, name: str, items: Iterable[Any]) -> Iterator[Any]:
+        """Yield from items, counting the time spent producing each one as the stage"""
+        iterator = iter(items)
+        while True:
+            with self.stage(name):
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+            yield item
+
+    def server_timing(self, total: Optional[float] = None) -> str:
+        entries = [f"{name};dur={seconds * 1000:.1f}" for name, seconds in self.stages.items()]
+        if total is not None:
+            entries.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(entries)
+
+
+_current_timer: ContextVar[Optional[StageTimer]] = ContextVar("stage_timer", default=None)
+
+
+@contextmanager
+def stage(name: str):
+    """Time a stage of the current request; does nothing outside a request"""
+    timer = _current_timer.get()
+    if timer is None:
+        yield
+        return
+    with timer.stage(name):
+        yield
+
+
+def record_stage(name: str, seconds: float):
+    """Add a duration measured elsewhere (e.g. time to first token) to the current request"""
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.add(name, seconds)
+
+
+def observe_stages(operation: str, stages: Dict[str, float]):
+    for name, seconds in stages.items():
+        STAGE_SECONDS.labels(operation, name).observe(seconds)
+
+
+def render() -> Tuple[bytes, str]:
+    """Prometheus text exposition of every metric in this process"""
+    return generate_latest(), CONTENT_TYPE_LATEST
+
+
+class StageTimingMiddleware:
+    """Time every HTTP request, report its stages in a Server-Timing header and export both as histograms
+
+    The header carries the stages finished before the response starts; stages
+    of a streamed body (generation, saving) are only exported to /metrics.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timer = StageTimer()
+        token = _current_timer.set(timer)
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_timing(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                MutableHeaders(scope=message).append("Server-Timing", timer.server_timing(time.perf_counter() - start))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_timer.reset(token)
+            route = _route_path(scope)
+            REQUEST_SECONDS.labels(scope["method"], route, str(status)).observe(time.perf_counter() - start)
+            observe_stages(f"{scope['method']} {route}", timer.stages)
+
+
+def _route_path(scope) -> str:
+    # Path templates, not raw paths, so ids don't create a series per document
+    route = scope.get("route")
+    return getattr(route, "path", None) or "unmatched"
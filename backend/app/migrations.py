@@ -0,0 +1,371 @@
+# backend/app/migrations.py
+"""Versioned schema migrations, applied as a deploy step instead of on every boot
+
+Applied versions are recorded in schema_migrations; `upgrade` runs the
+missing ones in order, each in its own transaction, under an advisory lock
+so replicas deploying together migrate once. Every migration is plain SQL
+frozen when it was written, never derived from the models, so a fresh
+database replays the same history as an old one. Migration 1 creates the
+schema as it stood when versioning began and brings databases from before
+versioning up to that point; schema changes since go in a new migration
+(and into the models in database.py).
+
+Usage (from backend/):
+    python -m app.migrations status
+    python -m app.migrations upgrade
+"""
+import os
+import logging
+import argparse
+from typing import Callable, List, NamedTuple
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+from .log import configure_logging
+from .database import engine, TEXT_SEARCH_CONFIG
+
+MIGRATION_LOCK_ID = 4_170_215  # pg_advisory_lock key shared by every deploy
+CHUNK_PARTITIONS = int(os.getenv("CHUNK_PARTITIONS", "16"))  # Hash partitions of document_chunks; fixed once created
+
+logger = logging.getLogger(__name__)
+
+# The schema when versioning began; document_chunks is not partitioned yet (migration 2).
+# Existing tables are kept as they are, and LEGACY_UPGRADES brings them up to this shape.
+BASELINE_SCHEMA = [
+    "CREATE EXTENSION IF NOT EXISTS vector",
+    """
+    CREATE TABLE IF NOT EXISTS users (
+        id UUID NOT NULL,
+        google_id VARCHAR,
+        email VARCHAR,
+        name VARCHAR,
+        picture VARCHAR,
+        created_at TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (id)
+    )
+    """,
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_email ON users (email)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS ix_users_google_id ON users (google_id)",
+    """
+    CREATE TABLE IF NOT EXISTS chunk_sets (
+        id UUID NOT NULL,
+        content_hash VARCHAR(64),
+        ref_count INTEGER NOT NULL,
+        chunk_count INTEGER,
+        chunker_version VARCHAR,
+        chunker_params TEXT,
+        revision INTEGER NOT NULL,
+        created_at TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (id),
+        UNIQUE (content_hash)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS embedding_cache (
+        model_id VARCHAR NOT NULL,
+        text_hash VARCHAR(64) NOT NULL,
+        embedding VECTOR(384) NOT NULL,
+        created_at TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (model_id, text_hash)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS documents (
+        id UUID NOT NULL,
+        user_id UUID,
+        filename VARCHAR NOT NULL,
+        original_filename VARCHAR NOT NULL,
+        file_size INTEGER,
+        upload_date TIMESTAMP WITHOUT TIME ZONE,
+        chunk_set_id UUID,
+        deleted_at TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (id),
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        FOREIGN KEY (chunk_set_id) REFERENCES chunk_sets (id)
+    )
+    """,
+    f"""
+    CREATE TABLE IF NOT EXISTS document_chunks (
+        id UUID NOT NULL,
+        chunk_set_id UUID,
+        chunk_text TEXT NOT NULL,
+        chunk_index INTEGER NOT NULL,
+        content_hash VARCHAR(64),
+        chunk_metadata TEXT,
+        embedding VECTOR(384),
+        chunk_tsv TSVECTOR GENERATED ALWAYS AS (to_tsvector('{TEXT_SEARCH_CONFIG}', chunk_text)) STORED,
+        PRIMARY KEY (id),
+        FOREIGN KEY (chunk_set_id) REFERENCES chunk_sets (id)
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS chat_sessions (
+        id UUID NOT NULL,
+        user_id UUID,
+        document_id UUID,
+        title VARCHAR,
+        created_at TIMESTAMP WITHOUT TIME ZONE,
+        updated_at TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (id),
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        FOREIGN KEY (document_id) REFERENCES documents (id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS chat_messages (
+        id UUID NOT NULL,
+        session_id UUID,
+        role VARCHAR NOT NULL,
+        content TEXT NOT NULL,
+        timestamp TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (id),
+        FOREIGN KEY (session_id) REFERENCES chat_sessions (id) ON DELETE CASCADE
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS ingestion_jobs (
+        id UUID NOT NULL,
+        user_id UUID,
+        document_id UUID,
+        original_filename VARCHAR NOT NULL,
+        file_path VARCHAR NOT NULL,
+        file_size INTEGER,
+        content_hash VARCHAR(64),
+        deduplicated BOOLEAN,
+        status VARCHAR NOT NULL,
+        stage VARCHAR NOT NULL,
+        pages_total INTEGER,
+        pages_extracted INTEGER,
+        chunks_total INTEGER,
+        chunks_embedded INTEGER,
+        chunks_stored INTEGER,
+        attempts INTEGER,
+        error TEXT,
+        created_at TIMESTAMP WITHOUT TIME ZONE,
+        updated_at TIMESTAMP WITHOUT TIME ZONE,
+        started_at TIMESTAMP WITHOUT TIME ZONE,
+        finished_at TIMESTAMP WITHOUT TIME ZONE,
+        PRIMARY KEY (id),
+        FOREIGN KEY (user_id) REFERENCES users (id),
+        FOREIGN KEY (document_id) REFERENCES documents (id) ON DELETE SET NULL
+    )
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_ingestion_jobs_status ON ingestion_jobs (status)",
+    # The other indexes of the baseline follow the upgrades that add their columns
+]
+
+# Upgrades of tables created by versions before migrations
+LEGACY_UPGRADES = [
+    "ALTER TABLE ingestion_jobs ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    "ALTER TABLE ingestion_jobs ADD COLUMN IF NOT EXISTS deduplicated BOOLEAN DEFAULT false",
+    # Move chunks from per-document ownership to shared chunk sets; legacy documents get a set with their own ID
+    "ALTER TABLE documents ADD COLUMN IF NOT EXISTS chunk_set_id UUID REFERENCES chunk_sets(id)",
+    "ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS chunk_set_id UUID REFERENCES chunk_sets(id)",
+    """
+    DO $$
+    BEGIN
+        IF EXISTS (SELECT 1 FROM information_schema.columns
+                   WHERE table_name = 'document_chunks' AND column_name = 'document_id') THEN
+            INSERT INTO chunk_sets (id, content_hash, ref_count, chunk_count, revision, created_at)
+            SELECT d.id, NULL, 1, (SELECT count(*) FROM document_chunks c WHERE c.document_id = d.id), 0, now()
+            FROM documents d
+            WHERE d.chunk_set_id IS NULL
+            ON CONFLICT (id) DO NOTHING;
+            UPDATE documents SET chunk_set_id = id WHERE chunk_set_id IS NULL;
+            UPDATE document_chunks SET chunk_set_id = document_id WHERE chunk_set_id IS NULL;
+            ALTER TABLE document_chunks DROP COLUMN document_id;
+        END IF;
+    END $$
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_document_chunks_chunk_set_id ON document_chunks (chunk_set_id)",
+    # Indexes behind listing and keyset pagination
+    "CREATE INDEX IF NOT EXISTS ix_documents_user_id_upload_date ON documents (user_id, upload_date, id)",
+    "CREATE INDEX IF NOT EXISTS ix_chat_sessions_document_id_user_id ON chat_sessions (document_id, user_id)",
+    "CREATE INDEX IF NOT EXISTS ix_chat_messages_session_id_timestamp ON chat_messages (session_id, timestamp, id)",
+    # Soft deletes, and database-side cascades from documents to chats to messages
+    "ALTER TABLE documents ADD COLUMN IF NOT EXISTS deleted_at TIMESTAMP",
+    "CREATE INDEX IF NOT EXISTS ix_documents_deleted_at ON documents (deleted_at) WHERE deleted_at IS NOT NULL",
+    "CREATE INDEX IF NOT EXISTS ix_chunk_sets_released ON chunk_sets (id) WHERE ref_count <= 0",
+    """
+    DO $$
+    BEGIN
+        IF EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'chat_sessions_document_id_fkey' AND confdeltype <> 'c') THEN
+            ALTER TABLE chat_sessions DROP CONSTRAINT chat_sessions_document_id_fkey,
+                ADD CONSTRAINT chat_sessions_document_id_fkey FOREIGN KEY (document_id) REFERENCES documents(id) ON DELETE CASCADE;
+        END IF;
+        IF EXISTS (SELECT 1 FROM pg_constraint WHERE conname = 'chat_messages_session_id_fkey' AND confdeltype <> 'c') THEN
+            ALTER TABLE chat_messages DROP CONSTRAINT chat_messages_session_id_fkey,
+                ADD CONSTRAINT chat_messages_session_id_fkey FOREIGN KEY (session_id) REFERENCES chat_sessions(id) ON DELETE CASCADE;
+        END IF;
+    END $$
+    """,
+    # Lexical search; adding a stored generated column rewrites the table once
+    f"""
+    ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS chunk_tsv tsvector
+        GENERATED ALWAYS AS (to_tsvector('{TEXT_SEARCH_CONFIG}', chunk_text)) STORED
+    """,
+    "CREATE INDEX IF NOT EXISTS ix_document_chunks_chunk_tsv ON document_chunks USING gin (chunk_tsv)",
+    # Chunk content hashes and the chunker that produced each set, for incremental re-chunking
+    "ALTER TABLE document_chunks ADD COLUMN IF NOT EXISTS content_hash VARCHAR(64)",
+    "ALTER TABLE chunk_sets ADD COLUMN IF NOT EXISTS chunker_version VARCHAR",
+    "ALTER TABLE chunk_sets ADD COLUMN IF NOT EXISTS chunker_params TEXT",
+    "ALTER TABLE chunk_sets ADD COLUMN IF NOT EXISTS revision INTEGER NOT NULL DEFAULT 0",
+]
+
+
+class Migration(NamedTuple):
+    version: int
+    description: str
+    apply: Callable[[Connection], None]
+
+
+def _baseline(conn: Connection):
+    for statement in BASELINE_SCHEMA + LEGACY_UPGRADES:
+        conn.execute(text(statement))
+
+
+def _partition_document_chunks(conn: Connection):
+    """Hash-partition document_chunks by chunk set, copying the chunks of an unpartitioned table
+
+    The copy holds the table's lock until it's done, so large databases
+    should run this in a maintenance window. The vector index is rebuilt per
+    partition afterwards.
+    """
+    relkind = conn.execute(text("SELECT relkind FROM pg_class WHERE oid = to_regclass('document_chunks')")).scalar()
+    copy_rows = relkind == "r"
+    if copy_rows:
+        # Index names are schema-wide, so the old table's indexes move out of the way first
+        conn.execute(text("ALTER TABLE document_chunks RENAME TO document_chunks_unpartitioned"))
+        index_names = conn.execute(text(
+            "SELECT indexname FROM pg_indexes WHERE tablename = 'document_chunks_unpartitioned'"
+        )).scalars().all()
+        for name in index_names:
+            conn.execute(text(f'ALTER INDEX "{name}" RENAME TO "{name[:48]}_unpartitioned"'))
+    if relkind != "p":
+        conn.execute(text(f"""
+            CREATE TABLE document_chunks (
+                id UUID NOT NULL,
+                chunk_set_id UUID NOT NULL,
+                chunk_text TEXT NOT NULL,
+                chunk_index INTEGER NOT NULL,
+                content_hash VARCHAR(64),
+                chunk_metadata TEXT,
+                embedding VECTOR(384),
+                chunk_tsv TSVECTOR GENERATED ALWAYS AS (to_tsvector('{TEXT_SEARCH_CONFIG}', chunk_text)) STORED,
+                PRIMARY KEY (id, chunk_set_id),
+                FOREIGN KEY (chunk_set_id) REFERENCES chunk_sets (id)
+            ) PARTITION BY HASH (chunk_set_id)
+        """))
+        conn.execute(text("CREATE INDEX ix_document_chunks_chunk_set_id ON document_chunks (chunk_set_id)"))
+        conn.execute(text("CREATE INDEX ix_document_chunks_chunk_tsv ON document_chunks USING gin (chunk_tsv)"))
+
+    partition_count = conn.execute(text(
+        "SELECT count(*) FROM pg_inherits WHERE inhparent = 'document_chunks'::regclass"
+    )).scalar()
+    if partition_count == 0:
+        for remainder in range(CHUNK_PARTITIONS):
+            conn.execute(text(
+                f"CREATE TABLE document_chunks_p{remainder:02d} PARTITION OF document_chunks "
+                f"FOR VALUES WITH (MODULUS {CHUNK_PARTITIONS}, REMAINDER {remainder})"
+            ))
+
+    if copy_rows:
+        # Chunks without a chunk set were unreachable and can't be routed to a partition
+        conn.execute(text("""
+            INSERT INTO document_chunks (id, chunk_set_id, chunk_text, chunk_index, content_hash, chunk_metadata, embedding)
+            SELECT id, chunk_set_id, chunk_text, chunk_index, content_hash, chunk_metadata, embedding
+            FROM document_chunks_unpartitioned
+            WHERE chunk_set_id IS NOT NULL
+        """))
+        conn.execute(text("DROP TABLE document_chunks_unpartitioned"))
+        conn.execute(text("ANALYZE document_chunks"))
+
+
+def _embedding_cache_expiry_index(conn: Connection):
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_embedding_cache_created_at ON embedding_cache (created_at)"))
+
+
+MIGRATIONS: List[Migration] = [
+    Migration(1, "Schema as of versioning, plus upgrades of databases from before it", _baseline),
+    Migration(2, "Hash-partition document_chunks by chunk set", _partition_document_chunks),
+    Migration(3, "Index embedding_cache by age for expiry", _embedding_cache_expiry_index),
+]
+LATEST_VERSION = MIGRATIONS[-1].version
+
+
+def current_version(conn: Connection) -> int:
+    """Highest applied version, 0 for a database that was never migrated"""
+    if conn.execute(text("SELECT to_regclass('schema_migrations')")).scalar() is None:
+        return 0
+    return conn.execute(text("SELECT coalesce(max(version), 0) FROM schema_migrations")).scalar()
+
+
+def upgrade() -> List[int]:
+    """Apply pending migrations and return the versions applied"""
+    applied = []
+    with engine.connect() as conn:
+        if current_version(conn) >= LATEST_VERSION:
+            return applied  # The common case on boot: no lock, no DDL
+        conn.rollback()
+        conn.execute(text("SELECT pg_advisory_lock(:id)"), {"id": MIGRATION_LOCK_ID})
+        try:
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS schema_migrations (
+                    version INTEGER PRIMARY KEY,
+                    description TEXT NOT NULL,
+                    applied_at TIMESTAMP NOT NULL DEFAULT now()
+                )
+            """))
+            conn.commit()
+            # Read after taking the lock, so a deploy that waited sees what the other one applied
+            version = current_version(conn)
+            conn.commit()
+            for migration in MIGRATIONS:
+                if migration.version <= version:
+                    continue
+                try:
+                    migration.apply(conn)
+                    conn.execute(
+                        text("INSERT INTO schema_migrations (version, description) VALUES (:version, :description)"),
+                        {"version": migration.version, "description": migration.description}
+                    )
+                    conn.commit()
+                except Exception:
+                    conn.rollback()
+                    raise
+                logger.info("Applied migration %d: %s", migration.version, migration.description)
+                applied.append(migration.version)
+        finally:
+            conn.execute(text("SELECT pg_advisory_unlock(:id)"), {"id": MIGRATION_LOCK_ID})
+            conn.commit()
+
+    if applied:
+        # Reconnect so every pooled connection registers the vector adapter
+        engine.dispose()
+
+        # ANN index on embeddings, built concurrently so a large table stays writable
+        from .vector_index import ensure_vector_index, VECTOR_INDEX_AUTO_CREATE
+        if VECTOR_INDEX_AUTO_CREATE:
+            ensure_vector_index()
+    return applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Apply or inspect schema migrations")
+    parser.add_argument("command", choices=["status", "upgrade"])
+    args = parser.parse_args()
+    configure_logging()
+
+    if args.command == "upgrade":
+        applied = upgrade()
+        if not applied:
+            print("Schema is up to date")
+    with engine.connect() as conn:
+        version = current_version(conn)
+    print(f"Schema version {version}, latest {LATEST_VERSION}")
+    for migration in MIGRATIONS:
+        print(f"  {'applied' if migration.version <= version else 'pending':<8} {migration.version:>3}  {migration.description}")
+
+
+if __name__ == "__main__":
+    main()
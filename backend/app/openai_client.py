@@ -1,73 +1,149 @@
 # backend/app/openai_client.py
 import os
-from openai import OpenAI
-from typing import List, Dict, Any
+import random
+import asyncio
+import logging
+import openai
+from openai import AsyncOpenAI
+from typing import Dict, Any, AsyncIterator, Optional
 
-def get_openai_client(**maybe_config):
-    """Get OpenAI client for text generation"""
+from .llm import LLMUnavailableError
+
+LLM_TIMEOUT = float(os.getenv("LLM_TIMEOUT", "30"))  # Seconds per upstream call
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "3"))  # Retries after 429/5xx/connection errors
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))  # In-flight calls per process
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL") or None  # Any OpenAI-compatible server
+
+logger = logging.getLogger(__name__)
+
+def get_async_openai_client(**maybe_config):
+    """Get the asyncio OpenAI client; one instance per process so its connection pool is shared"""
     api_key = os.getenv("OPENAI_API_KEY")
     model_name = os.getenv("CHAT_MODEL", "gpt-3.5-turbo")
     
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY not set")
     
-    print(f"🔄 Using OpenAI API for model: {model_name}")
-    return OpenAIClient(api_key, model_name)
+    logger.info("Using async OpenAI API for model: %s", model_name)
+    return AsyncOpenAIClient(api_key, model_name, base_url=OPENAI_BASE_URL)
+
+class AsyncOpenAIClient:
+    """asyncio client for OpenAI-compatible APIs
 
-class OpenAIClient:
-    """Client for OpenAI API"""
-    def __init__(self, api_key, model_name):
+    Calls share one HTTP connection pool, time out after LLM_TIMEOUT, are
+    retried with jittered exponential backoff on 429, 5xx and connection
+    errors, and at most LLM_MAX_CONCURRENCY run at once per process. A call
+    that still fails raises LLMUnavailableError.
+    """
+    def __init__(
+        self,
+        api_key,
+        model_name,
+        base_url: Optional[str] = None,
+        timeout: float = LLM_TIMEOUT,
+        max_retries: int = LLM_MAX_RETRIES,
+        max_concurrency: int = LLM_MAX_CONCURRENCY
+    ):
         self.api_key = api_key
         self.model_name = model_name
-        self.client = OpenAI(api_key=api_key)
+        # Retries are ours, so they happen inside the concurrency limit and can be counted
+        self.client = AsyncOpenAI(api_key=api_key, base_url=base_url, timeout=timeout, max_retries=0)
+        self.max_retries = max_retries
+        self.semaphore = asyncio.Semaphore(max_concurrency)
         self.api_working = None  # Will be set on first call
+        self.in_flight = 0
+        self.retries = 0
     
-    def __call__(self, prompt, max_tokens=300, temperature=0.7, **kwargs):
-        """Call the OpenAI API with fallback"""
+    async def __call__(self, prompt, max_tokens=300, temperature=0.7, **kwargs):
+        """Call the API with retries; raises LLMUnavailableError once they run out"""
         try:
-            response = self.client.chat.completions.create(
-                model=self.model_name,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ],
-                max_tokens=max_tokens,
-                temperature=temperature,
-                top_p=1.0,
-                frequency_penalty=0.0,
-                presence_penalty=0.0
-            )
+            async with self.semaphore:
+                response = await self._with_retries(lambda: self.client.chat.completions.create(
+                    **self._request(prompt, max_tokens, temperature)
+                ))
+        except openai.OpenAIError as e:
+            logger.warning("OpenAI API exception: %s", e)
+            self.api_working = False
+            raise LLMUnavailableError(str(e)) from e
+        self.api_working = True
+        generated_text = (response.choices[0].message.content or "").strip()
+        return [{"generated_text": generated_text}]
+    
+    async def stream(self, prompt, max_tokens=300, temperature=0.7, **kwargs) -> AsyncIterator[str]:
+        """Yield the completion as text deltas; only opening the stream is retried
+
+        Raises LLMUnavailableError if the stream cannot be opened or breaks off.
+        """
+        async with self.semaphore:
+            try:
+                stream = await self._with_retries(lambda: self.client.chat.completions.create(
+                    **self._request(prompt, max_tokens, temperature), stream=True
+                ))
+            except openai.OpenAIError as e:
+                logger.warning("OpenAI API exception: %s", e)
+                self.api_working = False
+                raise LLMUnavailableError(str(e)) from e
             
             self.api_working = True
-            generated_text = response.choices[0].message.content.strip()
-            
-            return [{"generated_text": generated_text}]
-            
-        except Exception as e:
-            print(f"⚠️ OpenAI API exception: {e}")
-            self.api_working = False
-            return self._fallback_response(prompt)
+            try:
+                async for chunk in stream:
+                    if chunk.choices and chunk.choices[0].delta.content:
+                        yield chunk.choices[0].delta.content
+            except openai.OpenAIError as e:
+                logger.warning("OpenAI stream interrupted: %s", e)
+                raise LLMUnavailableError(str(e)) from e
+            finally:
+                # Also reached when the caller stops early, which drops the HTTP stream
+                await stream.close()
     
-    def _fallback_response(self, prompt):
-        """Fallback response when API is not available"""
-        return [{"generated_text": "I understand your question, but I'm currently unable to access the AI model. Please check your OpenAI API configuration."}]
+    async def aclose(self):
+        await self.client.close()
+    
+    def _request(self, prompt, max_tokens, temperature) -> Dict[str, Any]:
+        return {
+            "model": self.model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "max_tokens": max_tokens,
+            "temperature": temperature,
+            "top_p": 1.0,
+            "frequency_penalty": 0.0,
+            "presence_penalty": 0.0
+        }
+    
+    async def _with_retries(self, make_call):
+        attempt = 0
+        while True:
+            self.in_flight += 1
+            try:
+                return await make_call()
+            except Exception as e:
+                if attempt >= self.max_retries or not _is_retryable(e):
+                    raise
+                delay = _retry_delay(e, attempt)
+            finally:
+                self.in_flight -= 1
+            attempt += 1
+            self.retries += 1
+            await asyncio.sleep(delay)
+
+def _is_retryable(error: Exception) -> bool:
+    if isinstance(error, openai.APITimeoutError):
+        return False  # The per-call timeout is the caller's latency budget
+    if isinstance(error, openai.APIConnectionError):
+        return True
+    if isinstance(error, openai.APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
 
-class SimpleTextGenerator:
-    """Simple fallback text generator"""
-    def __call__(self, prompt, **kwargs):
-        # Extract the question from the prompt
-        if "Question:" in prompt:
-            question = prompt.split("Question:")[-1].split("Answer:")[0].strip()
-        else:
-            question = "your question"
-        
-        # Generate a more helpful response based on the context
-        if "Excerpts:" in prompt:
-            excerpts = prompt.split("Excerpts:")[1].split("Question:")[0].strip()
-            if len(excerpts) > 100:
-                response = f"Based on the provided excerpts, I can see relevant information about '{question}'. The context contains detailed information that should help answer your question. Let me know if you need me to elaborate on any specific aspect."
-            else:
-                response = f"I can see some context about '{question}', but it may be limited. Could you provide more specific details about what you'd like to know?"
-        else:
-            response = f"I understand you're asking about '{question}'. However, I don't see any specific context or excerpts to reference. Could you provide more details or upload a document to get a more specific answer?"
-        
-        return [{"generated_text": response}]
+def _retry_delay(error: Exception, attempt: int) -> float:
+    """Full-jitter exponential backoff, stretched to honor Retry-After"""
+    delay = random.uniform(0, min(LLM_RETRY_MAX_DELAY, LLM_RETRY_BASE_DELAY * (2 ** attempt)))
+    response = getattr(error, "response", None)
+    retry_after = response.headers.get("retry-after") if response is not None else None
+    try:
+        delay = max(delay, min(float(retry_after), LLM_RETRY_MAX_DELAY))
+    except (TypeError, ValueError):
+        pass
+    return delay
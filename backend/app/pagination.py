@@ -0,0 +1,47 @@
+# backend/app/pagination.py
+import base64
+import uuid
+from datetime import datetime
+from typing import List, Optional, Tuple
+from fastapi import HTTPException
+from sqlalchemy import tuple_
+from sqlalchemy.orm import Query
+
+MAX_PAGE_SIZE = 500
+
+
+def encode_cursor(created_at: datetime, row_id) -> str:
+    """Opaque cursor pointing at one row of a (timestamp, id) ordered list"""
+    raw = f"{created_at.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, uuid.UUID]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        created_at, row_id = raw.split("|")
+        return datetime.fromisoformat(created_at), uuid.UUID(row_id)
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def keyset_page(query: Query, timestamp_column, id_column, limit: Optional[int], before: Optional[str]) -> Tuple[List, Optional[str]]:
+    """Rows in ascending (timestamp, id) order, plus the cursor for the page before them
+
+    Without a limit every row is returned. With one, pages walk backwards
+    from the newest row: the first page holds the latest `limit` rows and
+    `before` (a cursor from the previous page) continues with older ones.
+    Served by an index ending in (timestamp, id) after the equality filters.
+    """
+    if limit is None:
+        return query.order_by(timestamp_column, id_column).all(), None
+
+    if before:
+        created_at, row_id = decode_cursor(before)
+        query = query.filter(tuple_(timestamp_column, id_column) < tuple_(created_at, row_id))
+    # One extra row tells whether an older page exists
+    rows = query.order_by(timestamp_column.desc(), id_column.desc()).limit(limit + 1).all()
+    has_more = len(rows) > limit
+    rows = list(reversed(rows[:limit]))
+    next_before = encode_cursor(getattr(rows[0], timestamp_column.key), getattr(rows[0], id_column.key)) if has_more else None
+    return rows, next_before
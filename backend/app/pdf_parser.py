@@ -1,45 +1,185 @@
 # backend/app/pdf_parser.py
-from typing import List
+import os
+import math
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
 import pdfplumber
 
+from .log import configure_logging
 
-def extract_text_from_pdf(path: str) -> str:
-    all_text = []
+PDF_EXTRACT_WORKERS = int(os.getenv("PDF_EXTRACT_WORKERS", str(min(4, os.cpu_count() or 1))))
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "24"))  # Smaller PDFs aren't worth the process startup
+RANGES_PER_WORKER = 4  # Several page ranges per worker so uneven pages still balance out
+MAX_PAGES_PER_RANGE = 64  # Caps how much extracted text a finished range holds in memory
+CHUNK_SIZE = int(os.getenv("CHUNK_SIZE", "1000"))  # Larger chunks, less overlap
+CHUNK_OVERLAP = int(os.getenv("CHUNK_OVERLAP", "50"))
+CHUNKER_VERSION = "chars-v1"  # Bump whenever iter_chunks cuts the same text differently
+
+logger = logging.getLogger(__name__)
+
+
+def extract_text_from_pdf(path: str, on_page: Optional[Callable[[int, int], None]] = None, workers: int = None) -> str:
+    """Extract text from every page; on_page(pages_done, page_count) reports progress"""
     try:
-        with pdfplumber.open(path) as pdf:
-            print(f"PDF has {len(pdf.pages)} pages")
-            # Process pages in parallel for faster extraction
-            for i, page in enumerate(pdf.pages):
-                text = page.extract_text()
-                print(f"Page {i+1} text length: {len(text) if text else 0}")
-                if text and text.strip():  # Only add non-empty text
-                    all_text.append(text.strip())
-        result = "\n\n".join(all_text)
-        print(f"Total extracted text length: {len(result)}")
+        result = "\n\n".join(iter_pdf_pages(path, on_page, workers))
+        logger.debug("Total extracted text length: %d", len(result))
         return result
     except Exception as e:
-        print(f"Error extracting text from PDF: {e}")
+        logger.error("Error extracting text from PDF: %s", e)
         return ""
 
 
+def iter_pdf_pages(path: str, on_page: Optional[Callable[[int, int], None]] = None, workers: int = None) -> Iterator[str]:
+    """Yield the stripped text of each non-empty page in page order
+
+    PDFs with at least PDF_PARALLEL_MIN_PAGES pages are split into page ranges
+    that separate processes extract; smaller ones are read serially. Each page's
+    layout cache is released once its text is taken.
+    """
+    if workers is None:
+        workers = PDF_EXTRACT_WORKERS
+    with pdfplumber.open(path) as pdf:
+        page_count = len(pdf.pages)
+        logger.info("PDF has %d pages", page_count)
+        if workers <= 1 or page_count < PDF_PARALLEL_MIN_PAGES:
+            debug = logger.isEnabledFor(logging.DEBUG)  # Checked once, not per page
+            for i, page in enumerate(pdf.pages):
+                text = page.extract_text()
+                page.close()
+                if debug:
+                    logger.debug("Page %d text length: %d", i + 1, len(text) if text else 0)
+                if on_page:
+                    on_page(i + 1, page_count)
+                if text and text.strip():  # Only yield non-empty text
+                    yield text.strip()
+            return
+
+    yield from _iter_parallel_pages(path, page_count, workers, on_page)
+
+
+def _iter_parallel_pages(path: str, page_count: int, workers: int, on_page: Optional[Callable[[int, int], None]]) -> Iterator[str]:
+    """Extract page ranges in worker processes, keeping a bounded window of ranges in flight"""
+    workers = min(workers, page_count)
+    step = min(MAX_PAGES_PER_RANGE, max(1, math.ceil(page_count / (workers * RANGES_PER_WORKER))))
+    ranges = deque((start, min(start + step, page_count)) for start in range(0, page_count, step))
+    logger.info("Extracting %d pages with %d workers in %d ranges", page_count, workers, len(ranges))
+
+    pages_done = 0
+    in_flight = deque()
+    pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=configure_logging)
+    try:
+        while ranges or in_flight:
+            while ranges and len(in_flight) < workers * 2:
+                start, end = ranges.popleft()
+                in_flight.append(pool.submit(_extract_page_range, path, start, end))
+
+            # Ranges are consumed in submission order, so pages come out in page order
+            texts = in_flight.popleft().result()
+            pages_done += len(texts)
+            if on_page:
+                on_page(pages_done, page_count)
+            for text in texts:
+                if text and text.strip():
+                    yield text.strip()
+    finally:
+        pool.shutdown(wait=True, cancel_futures=True)
+
+
+def _extract_page_range(path: str, start: int, end: int) -> List[str]:
+    """Worker entry point: open the PDF independently and extract pages [start, end)"""
+    texts = []
+    debug = logger.isEnabledFor(logging.DEBUG)
+    with pdfplumber.open(path) as pdf:
+        for i in range(start, end):
+            page = pdf.pages[i]
+            text = page.extract_text()
+            page.close()
+            if debug:
+                logger.debug("Page %d text length: %d", i + 1, len(text) if text else 0)
+            texts.append(text)
+    return texts
+
+
+def chunker_params(chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> Dict[str, int]:
+    """Parameters recorded with every chunk set, next to CHUNKER_VERSION"""
+    return {"chunk_size": chunk_size, "overlap": overlap}
+
+
 def chunk_text(text: str, chunk_size=1000, overlap=50) -> List[str]:
     # Use character-based chunking for better performance
-    chunks = []
+    return list(iter_chunks([text], chunk_size, overlap))
+
+
+def iter_chunks(pieces: Iterable[str], chunk_size=1000, overlap=50) -> Iterator[str]:
+    """Chunk a stream of text pieces joined by blank lines, holding at most one piece plus a partial chunk
+
+    Yields the same chunks as chunk_text() on the joined text, with overlap
+    carried across piece (page) boundaries.
+    """
+    buffer = ""
+    started = False
+    for piece in pieces:
+        if not piece:
+            continue
+        buffer = buffer + "\n\n" + piece if started else piece
+        started = True
+
+        # Only cut where more text is known to follow, so chunks don't depend on page breaks
+        start = 0
+        while len(buffer) - start > chunk_size:
+            chunk, end = _cut_chunk(buffer, start, chunk_size)
+            if chunk:
+                yield chunk
+            start = end - overlap
+        buffer = buffer[start:]
+
     start = 0
-    text_length = len(text)
-    
+    text_length = len(buffer)
     while start < text_length:
-        end = min(start + chunk_size, text_length)
-        chunk = text[start:end]
-        
-        # Try to break at word boundary
-        if end < text_length:
-            last_space = chunk.rfind(' ')
-            if last_space > chunk_size * 0.8:  # If we found a space in the last 20%
-                chunk = chunk[:last_space]
-                end = start + last_space
-        
-        chunks.append(chunk.strip())
+        chunk, end = _cut_chunk(buffer, start, chunk_size)
+        if chunk:  # Skip empty chunks
+            yield chunk
         start = end - overlap if end < text_length else text_length
+
+
+def _cut_chunk(text: str, start: int, chunk_size: int) -> Tuple[str, int]:
+    end = min(start + chunk_size, len(text))
+    chunk = text[start:end]
     
-    return [chunk for chunk in chunks if chunk.strip()]  # Remove empty chunks
\ No newline at end of file
+    # Try to break at word boundary
+    if end < len(text):
+        last_space = chunk.rfind(' ')
+        if last_space > chunk_size * 0.8:  # If we found a space in the last 20%
+            chunk = chunk[:last_space]
+            end = start + last_space
+    
+    return chunk.strip(), end
+
+
+def reassemble_text(chunks: List[str], chunk_size: int, overlap: int) -> Optional[str]:
+    """Rebuild a text that iter_chunks(chunk_size, overlap) cuts into exactly these chunks, or None
+
+    Neighbouring chunks share the overlap the chunker carried over (less
+    any whitespace stripped at the cut), which is dropped from each chunk
+    before appending it. Text that merely repeats can be mistaken for the
+    overlap, and whitespace-only overlaps leave nothing to match, so the
+    result is cut again with the same parameters and only returned if that
+    gives back the stored chunks; otherwise the source PDF is needed.
+    """
+    text = ""
+    for chunk in chunks:
+        if not text:
+            text = chunk
+            continue
+        for size in range(min(overlap, len(text), len(chunk)), 0, -1):
+            if text.endswith(chunk[:size]):
+                text += chunk[size:]
+                break
+        else:
+            text += " " + chunk
+    if list(iter_chunks([text], chunk_size, overlap)) != list(chunks):
+        return None
+    return text
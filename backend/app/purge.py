@@ -0,0 +1,158 @@
+# backend/app/purge.py
+import os
+import time
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .database import SessionLocal
+from .embedding_cache import EMBEDDING_CACHE_TTL_DAYS
+from .vector_store import release_chunk_set
+from .ingestion import resubmit_stale_jobs
+
+PURGE_INTERVAL = float(os.getenv("PURGE_INTERVAL", "30"))  # Seconds between passes when nothing wakes the purger
+PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "1000"))  # Chunks deleted per transaction
+PURGE_BATCH_PAUSE = float(os.getenv("PURGE_BATCH_PAUSE", "0.05"))  # Seconds between chunk batches, to leave room for foreground queries
+PURGE_DOCUMENTS_PER_PASS = 100
+
+logger = logging.getLogger(__name__)
+
+# SKIP LOCKED lets several API processes purge side by side without waiting on each other
+CLAIM_DELETED_DOCUMENTS_SQL = text("""
+    SELECT id, chunk_set_id FROM documents
+    WHERE deleted_at IS NOT NULL
+    ORDER BY deleted_at
+    LIMIT :limit
+    FOR UPDATE SKIP LOCKED
+""")
+
+DELETE_CHUNK_BATCH_SQL = text("""
+    DELETE FROM document_chunks
+    WHERE chunk_set_id = :chunk_set_id AND id IN (
+        SELECT id FROM document_chunks WHERE chunk_set_id = :chunk_set_id LIMIT :batch_size
+    )
+""")
+
+EXPIRE_EMBEDDING_BATCH_SQL = text("""
+    DELETE FROM embedding_cache
+    WHERE (model_id, text_hash) IN (
+        SELECT model_id, text_hash FROM embedding_cache WHERE created_at < :cutoff LIMIT :batch_size
+    )
+""")
+
+_thread: Optional[threading.Thread] = None
+_wake = threading.Event()
+_stop = threading.Event()
+
+
+def purge_deleted_documents(db: Session, limit: int = PURGE_DOCUMENTS_PER_PASS) -> int:
+    """Remove soft-deleted documents; their chats and messages go by ON DELETE CASCADE"""
+    rows = db.execute(CLAIM_DELETED_DOCUMENTS_SQL, {"limit": limit}).all()
+    for row in rows:
+        if row.chunk_set_id is not None:
+            release_chunk_set(db, row.chunk_set_id, commit=False)
+        db.execute(text("DELETE FROM documents WHERE id = :id"), {"id": row.id})
+    db.commit()
+    return len(rows)
+
+
+def purge_released_chunk_sets(db: Session, batch_size: int = PURGE_BATCH_SIZE, pause: float = PURGE_BATCH_PAUSE) -> int:
+    """Delete the chunks of chunk sets no document references, a bounded batch per transaction"""
+    chunk_set_ids = db.execute(text("SELECT id FROM chunk_sets WHERE ref_count <= 0")).scalars().all()
+    db.commit()
+    deleted = 0
+    for chunk_set_id in chunk_set_ids:
+        while True:
+            count = db.execute(DELETE_CHUNK_BATCH_SQL, {"chunk_set_id": chunk_set_id, "batch_size": batch_size}).rowcount
+            db.commit()
+            deleted += count
+            if count < batch_size or _stop.is_set():
+                break
+            time.sleep(pause)
+        if count == batch_size:
+            break  # Stopping; the rest waits for the next run
+        # Released sets are never acquired again, so nothing can have re-referenced this one meanwhile
+        db.execute(text("DELETE FROM chunk_sets WHERE id = :id AND ref_count <= 0"), {"id": chunk_set_id})
+        db.commit()
+    return deleted
+
+
+def purge_expired_embeddings(db: Session, ttl_days: float = EMBEDDING_CACHE_TTL_DAYS, batch_size: int = PURGE_BATCH_SIZE, pause: float = PURGE_BATCH_PAUSE) -> int:
+    """Delete persisted embedding cache entries older than ttl_days, a bounded batch per transaction"""
+    if ttl_days <= 0:
+        return 0
+    cutoff = datetime.utcnow() - timedelta(days=ttl_days)
+    deleted = 0
+    while not _stop.is_set():
+        count = db.execute(EXPIRE_EMBEDDING_BATCH_SQL, {"cutoff": cutoff, "batch_size": batch_size}).rowcount
+        db.commit()
+        deleted += count
+        if count < batch_size:
+            break
+        time.sleep(pause)
+    return deleted
+
+
+def run_purge() -> int:
+    """One full pass over deleted documents and released chunk sets; returns the chunks removed
+
+    Expired embedding cache entries are removed in the same pass.
+    """
+    db = SessionLocal()
+    try:
+        while purge_deleted_documents(db) == PURGE_DOCUMENTS_PER_PASS and not _stop.is_set():
+            pass
+        deleted = purge_released_chunk_sets(db)
+        expired = purge_expired_embeddings(db)
+        if expired:
+            logger.info("Purged %d expired embedding cache entries", expired)
+        return deleted
+    finally:
+        db.close()
+
+
+def _purge_loop():
+    while not _stop.is_set():
+        try:
+            deleted = run_purge()
+            if deleted:
+                logger.info("Purged %d chunks of deleted documents", deleted)
+        except Exception:
+            logger.exception("Purge pass failed")
+        try:
+            requeued = resubmit_stale_jobs()
+            if requeued:
+                logger.warning("Requeued %d stalled ingestion jobs", requeued)
+        except Exception:
+            logger.exception("Stalled ingestion job sweep failed")
+        _wake.wait(PURGE_INTERVAL)
+        _wake.clear()
+
+
+def start_purger():
+    """Start the background thread that removes deleted documents and their chunks
+
+    Each pass also requeues ingestion jobs whose worker died (see resubmit_stale_jobs).
+    """
+    global _thread
+    if _thread is None:
+        _stop.clear()
+        _thread = threading.Thread(target=_purge_loop, name="purger", daemon=True)
+        _thread.start()
+
+
+def stop_purger():
+    global _thread
+    if _thread is not None:
+        _stop.set()
+        _wake.set()
+        _thread.join(timeout=5)
+        _thread = None
+
+
+def wake_purger():
+    """Run a purge pass now instead of at the next interval"""
+    _wake.set()
@@ -0,0 +1,261 @@
+# backend/app/rechunk.py
+"""Re-chunk stored chunk sets with the current chunker, re-embedding only new chunks
+
+The text of a set is extracted again from its source PDF when one is
+given, and otherwise reassembled from its chunks, which is only done for
+sets whose chunker and parameters are recorded and when re-cutting the
+reassembled text gives back the stored chunks. It is cut again with
+CHUNK_SIZE / CHUNK_OVERLAP and diffed against the stored chunks by content
+hash: matching rows keep their embeddings and are only renumbered, the
+rest are deleted, and only chunks that did not exist before are embedded
+and inserted. Sets that can be neither re-extracted nor reassembled are
+skipped and left as they are.
+
+Usage (from backend/):
+    python -m app.rechunk status
+    python -m app.rechunk run [--pdf-dir <directory of the uploaded PDFs>]
+    python -m app.rechunk run --chunk-set <id> --pdf <file> --chunk-size 800 --overlap 80
+"""
+import os
+import hashlib
+import json
+import logging
+import argparse
+from collections import defaultdict
+from typing import Any, Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .log import configure_logging
+from .database import SessionLocal
+from .embedding_cache import embed_texts_cached, text_hash
+from .pdf_parser import iter_chunks, iter_pdf_pages, reassemble_text, chunker_params, CHUNKER_VERSION, CHUNK_SIZE, CHUNK_OVERLAP
+from .vector_store import insert_chunks
+from .vector_cache import chunk_matrix_cache
+
+RECHUNK_BATCH_SIZE = 128  # New chunks embedded and inserted together
+REASSEMBLABLE_CHUNKERS = {"chars-v1"}  # Chunkers whose cuts reassemble_text can undo
+
+logger = logging.getLogger(__name__)
+
+# Sets cut by another chunker or other parameters; released sets are left to the purge job
+STALE_CHUNK_SETS_SQL = text("""
+    SELECT id, content_hash FROM chunk_sets
+    WHERE ref_count > 0
+      AND (chunker_version IS DISTINCT FROM :chunker_version OR chunker_params IS DISTINCT FROM :chunker_params)
+    ORDER BY created_at
+""")
+
+RENUMBER_CHUNKS_SQL = text("""
+    UPDATE document_chunks AS c
+    SET chunk_index = v.chunk_index, content_hash = v.content_hash, chunk_metadata = v.chunk_metadata
+    FROM unnest(CAST(:ids AS uuid[]), CAST(:indexes AS integer[]), CAST(:hashes AS varchar[]), CAST(:metadatas AS text[]))
+        AS v(id, chunk_index, content_hash, chunk_metadata)
+    WHERE c.chunk_set_id = :chunk_set_id AND c.id = v.id
+""")
+
+
+def rechunk_chunk_set(db: Session, chunk_set_id: str, chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP, pdf_path: Optional[str] = None) -> Optional[Dict[str, int]]:
+    """Re-chunk one set in a single transaction; returns counts, or None if the set is gone
+
+    pdf_path is the set's source PDF, re-extracted instead of reassembling
+    the stored chunks. Raises ValueError if it is not the file the set was
+    made from, or if without it the set's text cannot be rebuilt exactly.
+    Searches see either the old or the new chunks. The set's revision is
+    bumped so every process reloads its cached matrix.
+    """
+    chunk_set = db.execute(
+        text("SELECT id, content_hash, chunker_version, chunker_params FROM chunk_sets WHERE id = :id AND ref_count > 0 FOR UPDATE"),
+        {"id": chunk_set_id}
+    ).first()
+    if chunk_set is None:
+        db.rollback()
+        return None
+
+    old_rows = db.execute(
+        text("SELECT id, chunk_index, content_hash, chunk_text FROM document_chunks WHERE chunk_set_id = :id ORDER BY chunk_index"),
+        {"id": chunk_set_id}
+    ).all()
+    try:
+        pages = _source_pages(chunk_set, old_rows, pdf_path)
+    except ValueError:
+        db.rollback()
+        raise
+
+    # Old rows by content hash; repeated chunks (boilerplate pages) are matched one for one
+    available = defaultdict(list)
+    for row in old_rows:
+        available[row.content_hash or text_hash(row.chunk_text)].append(row)
+
+    # Kept rows that moved (or predate content hashes) are rewritten; the rest are left alone
+    kept: Dict[str, List[Any]] = {"ids": [], "indexes": [], "hashes": [], "metadatas": []}
+    kept_count = 0
+    new_chunks, new_indexes = [], []
+    for index, chunk in enumerate(iter_chunks(pages, chunk_size, overlap)):
+        content_hash = text_hash(chunk)
+        if available[content_hash]:
+            row = available[content_hash].pop()
+            if row.chunk_index != index or row.content_hash is None:
+                kept["ids"].append(str(row.id))
+                kept["indexes"].append(index)
+                kept["hashes"].append(content_hash)
+                kept["metadatas"].append(json.dumps({"index": index}))
+            kept_count += 1
+        else:
+            new_chunks.append(chunk)
+            new_indexes.append(index)
+
+    stale_ids = [str(row.id) for rows in available.values() for row in rows]
+    if stale_ids:
+        db.execute(
+            text("DELETE FROM document_chunks WHERE chunk_set_id = :chunk_set_id AND id = ANY(CAST(:ids AS uuid[]))"),
+            {"chunk_set_id": chunk_set_id, "ids": stale_ids}
+        )
+    if kept["ids"]:
+        db.execute(RENUMBER_CHUNKS_SQL, dict(kept, chunk_set_id=chunk_set_id))
+    for start in range(0, len(new_chunks), RECHUNK_BATCH_SIZE):
+        batch = new_chunks[start:start + RECHUNK_BATCH_SIZE]
+        indexes = new_indexes[start:start + RECHUNK_BATCH_SIZE]
+        insert_chunks(
+            db,
+            chunk_set_id,
+            batch,
+            embed_texts_cached(batch),
+            [{"index": index} for index in indexes],
+            chunk_indexes=indexes,
+            commit=False
+        )
+
+    db.execute(
+        text("""
+            UPDATE chunk_sets
+            SET chunk_count = :chunk_count, chunker_version = :chunker_version,
+                chunker_params = :chunker_params, revision = revision + 1
+            WHERE id = :id
+        """),
+        {
+            "id": chunk_set_id,
+            "chunk_count": kept_count + len(new_chunks),
+            "chunker_version": CHUNKER_VERSION,
+            "chunker_params": json.dumps(chunker_params(chunk_size, overlap), sort_keys=True)
+        }
+    )
+    db.commit()
+    chunk_matrix_cache.invalidate(chunk_set_id)
+    return {"kept": kept_count, "renumbered": len(kept["ids"]), "embedded": len(new_chunks), "deleted": len(stale_ids)}
+
+
+def _source_pages(chunk_set, old_rows, pdf_path: Optional[str]) -> List[str]:
+    """The text a set is re-cut from: the pages of its PDF, or its reassembled chunks"""
+    if pdf_path:
+        if chunk_set.content_hash and file_hash(pdf_path) != chunk_set.content_hash:
+            raise ValueError(f"{pdf_path} is not the PDF chunk set {chunk_set.id} was made from")
+        return list(iter_pdf_pages(pdf_path))
+
+    params = json.loads(chunk_set.chunker_params) if chunk_set.chunker_params else {}
+    if chunk_set.chunker_version not in REASSEMBLABLE_CHUNKERS or not {"chunk_size", "overlap"} <= params.keys():
+        raise ValueError(f"Chunk set {chunk_set.id} has no recorded chunker parameters; re-chunking it needs its PDF")
+    source = reassemble_text([row.chunk_text for row in old_rows], params["chunk_size"], params["overlap"])
+    if source is None:
+        raise ValueError(f"The chunks of chunk set {chunk_set.id} do not reassemble exactly; re-chunking it needs its PDF")
+    return [source]
+
+
+def file_hash(path: str) -> str:
+    """SHA256 of a file, as recorded in chunk_sets.content_hash at upload"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def pdfs_by_hash(directory: str) -> Dict[str, str]:
+    """Paths of the PDFs in a directory by content hash"""
+    return {
+        file_hash(os.path.join(directory, name)): os.path.join(directory, name)
+        for name in sorted(os.listdir(directory))
+        if name.lower().endswith(".pdf")
+    }
+
+
+def rechunk_stale_chunk_sets(chunk_size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP, pdf_dir: Optional[str] = None) -> Dict[str, int]:
+    """Re-chunk every set not cut with the given parameters, one transaction per set
+
+    Sets whose PDF is in pdf_dir (matched by content hash) are re-extracted
+    from it; sets that can be neither re-extracted nor reassembled are
+    skipped and counted.
+    """
+    pdfs = pdfs_by_hash(pdf_dir) if pdf_dir else {}
+    db = SessionLocal()
+    try:
+        chunk_sets = db.execute(STALE_CHUNK_SETS_SQL, {
+            "chunker_version": CHUNKER_VERSION,
+            "chunker_params": json.dumps(chunker_params(chunk_size, overlap), sort_keys=True)
+        }).all()
+        db.rollback()
+
+        totals = {"chunk_sets": 0, "kept": 0, "renumbered": 0, "embedded": 0, "deleted": 0, "skipped": 0}
+        for chunk_set_id, content_hash in chunk_sets:
+            try:
+                counts = rechunk_chunk_set(db, str(chunk_set_id), chunk_size, overlap, pdfs.get(content_hash))
+            except ValueError as e:
+                logger.warning("Skipped %s: %s", chunk_set_id, e)
+                totals["skipped"] += 1
+                continue
+            if counts is None:
+                continue
+            totals["chunk_sets"] += 1
+            for key, value in counts.items():
+                totals[key] += value
+            logger.info("Re-chunked %s: %d kept, %d embedded, %d deleted", chunk_set_id, counts["kept"], counts["embedded"], counts["deleted"])
+        return totals
+    finally:
+        db.close()
+
+
+def chunker_status() -> List[Dict[str, Any]]:
+    """Live chunk sets and chunks per chunker version and parameters"""
+    db = SessionLocal()
+    try:
+        rows = db.execute(text("""
+            SELECT chunker_version, chunker_params, count(*) AS chunk_sets, coalesce(sum(chunk_count), 0) AS chunks
+            FROM chunk_sets
+            WHERE ref_count > 0
+            GROUP BY chunker_version, chunker_params
+            ORDER BY chunk_sets DESC
+        """)).all()
+        return [dict(row._mapping) for row in rows]
+    finally:
+        db.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-chunk stored chunk sets with the current chunker")
+    parser.add_argument("command", choices=["status", "run"])
+    parser.add_argument("--chunk-set", help="Re-chunk only this chunk set")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--overlap", type=int, default=CHUNK_OVERLAP)
+    parser.add_argument("--pdf", help="Source PDF of --chunk-set, re-extracted instead of reassembling its chunks")
+    parser.add_argument("--pdf-dir", help="Directory of uploaded PDFs, matched to chunk sets by content hash")
+    args = parser.parse_args()
+    configure_logging()
+
+    if args.command == "run":
+        if args.chunk_set:
+            db = SessionLocal()
+            try:
+                print(rechunk_chunk_set(db, args.chunk_set, args.chunk_size, args.overlap, args.pdf) or "No such live chunk set")
+            except ValueError as e:
+                print(e)
+            finally:
+                db.close()
+        else:
+            print(rechunk_stale_chunk_sets(args.chunk_size, args.overlap, args.pdf_dir))
+    print(f"Current chunker: {CHUNKER_VERSION} {json.dumps(chunker_params(args.chunk_size, args.overlap), sort_keys=True)}")
+    for row in chunker_status():
+        print(row)
+
+
+if __name__ == "__main__":
+    main()
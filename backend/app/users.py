@@ -0,0 +1,71 @@
+# backend/app/users.py
+import os
+import time
+import uuid
+import threading
+from collections import OrderedDict
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+USER_CACHE_TTL = float(os.getenv("USER_CACHE_TTL", "300"))  # Seconds an email -> user id mapping is trusted
+USER_CACHE_SIZE = int(os.getenv("USER_CACHE_SIZE", "10000"))
+
+# DO UPDATE (not DO NOTHING) so RETURNING yields the existing row too, and concurrent
+# first requests from a new user wait on each other instead of racing
+UPSERT_USER_SQL = text("""
+    INSERT INTO users (id, email, name, created_at)
+    VALUES (:id, :email, :name, now())
+    ON CONFLICT (email) DO UPDATE SET email = EXCLUDED.email
+    RETURNING id
+""")
+
+
+class UserIdCache:
+    """TTL'd in-process map from email to user id, LRU-bounded"""
+    def __init__(self, ttl: float = USER_CACHE_TTL, max_entries: int = USER_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, email: str) -> Optional[uuid.UUID]:
+        with self._lock:
+            entry = self._entries.get(email)
+            if entry is None:
+                return None
+            user_id, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[email]
+                return None
+            self._entries.move_to_end(email)
+            return user_id
+
+    def put(self, email: str, user_id: uuid.UUID):
+        with self._lock:
+            self._entries[email] = (user_id, time.monotonic() + self.ttl)
+            self._entries.move_to_end(email)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_id_cache = UserIdCache()
+
+
+def resolve_user_id(db: Session, email: str, name: Optional[str] = None) -> uuid.UUID:
+    """Get the id of the user with this email, creating the user on first sight"""
+    user_id = user_id_cache.get(email)
+    if user_id is not None:
+        return user_id
+
+    user_id = db.execute(
+        UPSERT_USER_SQL,
+        {"id": uuid.uuid4(), "email": email, "name": name or "Unknown User"}
+    ).scalar_one()
+    db.commit()
+    user_id_cache.put(email, user_id)
+    return user_id
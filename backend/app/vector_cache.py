@@ -0,0 +1,203 @@
+# backend/app/vector_cache.py
+import os
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from .embeddings import EMBEDDING_DIM
+from .metrics import VECTOR_CACHE_SEARCHES, VECTOR_CACHE_ENTRIES, VECTOR_CACHE_BYTES
+
+VECTOR_CACHE_MAX_BYTES = int(os.getenv("VECTOR_CACHE_MAX_BYTES", "0"))  # Off by default; only RETRIEVAL_MODE=vector uses it
+VECTOR_CACHE_MAX_CHUNKS = int(os.getenv("VECTOR_CACHE_MAX_CHUNKS", "20000"))  # Larger chunk sets are searched in Postgres
+ENTRY_OVERHEAD_BYTES = 200  # Rough per-chunk cost of the Python objects next to the matrix
+
+CHUNK_SET_SQL = text("""
+    SELECT d.chunk_set_id, s.chunk_count, s.revision
+    FROM documents d
+    JOIN chunk_sets s ON s.id = d.chunk_set_id
+    WHERE d.id = CAST(:document_id AS uuid) AND d.deleted_at IS NULL
+""")
+
+CHUNK_SET_ROWS_SQL = text("""
+    SELECT id, chunk_index, chunk_text, chunk_metadata, embedding
+    FROM document_chunks
+    WHERE chunk_set_id = :chunk_set_id
+    ORDER BY chunk_index
+""")
+
+
+class ChunkMatrix:
+    """Every chunk of one chunk set, with embeddings as an L2-normalized float32 matrix"""
+    def __init__(self, chunk_set_id: str, revision: int, ids: List[str], indexes: List[int], texts: List[str], metadatas: List[Optional[str]], embeddings: np.ndarray):
+        self.chunk_set_id = chunk_set_id
+        self.revision = revision
+        self.ids = ids
+        self.indexes = indexes
+        self.texts = texts
+        self.metadatas = metadatas  # JSON strings, parsed only for returned rows
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        # pgvector gives zero vectors no direction either; they score 0 like an orthogonal vector
+        self.matrix = np.ascontiguousarray(embeddings / np.where(norms == 0, 1, norms), dtype=np.float32)
+        self.nbytes = (
+            self.matrix.nbytes
+            + sum(len(t) for t in texts)
+            + sum(len(m) for m in metadatas if m)
+            + ENTRY_OVERHEAD_BYTES * len(ids)
+        )
+
+    def top_k(self, query: np.ndarray, k: int) -> List[tuple]:
+        """(row, cosine distance) pairs of the k nearest chunks, nearest first"""
+        norm = np.linalg.norm(query)
+        if norm == 0 or len(self.ids) == 0:
+            return []
+        scores = self.matrix @ (query / norm)
+        if k < len(scores):
+            rows = np.argpartition(-scores, k - 1)[:k]
+        else:
+            rows = np.arange(len(scores))
+        rows = rows[np.argsort(-scores[rows], kind="stable")]
+        return [(int(row), float(1 - scores[row])) for row in rows]
+
+
+class ChunkMatrixCache:
+    """In-process exact search over recently used chunk sets, LRU-bounded by total bytes
+
+    Chunk sets only change when re-chunked, which bumps their revision; the
+    document -> chunk set lookup goes to Postgres on every search, so deletes
+    and re-chunks made by other processes are seen. Only vector-only
+    searches use it; hybrid ones (the default RETRIEVAL_MODE) run in Postgres,
+    which is why it is disabled unless VECTOR_CACHE_MAX_BYTES is set.
+    """
+    def __init__(self, max_bytes: int = VECTOR_CACHE_MAX_BYTES, max_chunks: int = VECTOR_CACHE_MAX_CHUNKS):
+        self.max_bytes = max_bytes
+        self.max_chunks = max_chunks
+        self._entries: "OrderedDict[str, ChunkMatrix]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.loads = 0
+        self.fallbacks = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_bytes > 0
+
+    def search(self, db: Session, document_id: str, query_embedding, k: int, chunk_set=None) -> Optional[List[Dict[str, Any]]]:
+        """Top-k chunks of a document by cosine distance, or None if Postgres should answer instead
+
+        chunk_set is the document's CHUNK_SET_SQL row when the caller has
+        already fetched it; it is looked up otherwise.
+        """
+        row = chunk_set or db.execute(CHUNK_SET_SQL, {"document_id": str(document_id)}).first()
+        if row is None:
+            return []  # Deleted, or a document without chunks
+        chunk_set_id = str(row.chunk_set_id)
+
+        entry = self._get(chunk_set_id, row.revision)
+        if entry is None:
+            if (row.chunk_count or 0) <= self.max_chunks:
+                entry = self._load(db, chunk_set_id, row.revision)
+            if entry is None:
+                with self._lock:
+                    self.fallbacks += 1
+                VECTOR_CACHE_SEARCHES.labels("fallback").inc()
+                return None
+
+        query = np.asarray(query_embedding, dtype=np.float32)
+        return [
+            {
+                "id": entry.ids[i],
+                "document_id": document_id,
+                "chunk_set_id": chunk_set_id,
+                "chunk_index": entry.indexes[i],
+                "chunk_text": entry.texts[i],
+                "metadata": _parse_metadata(entry.metadatas[i]),
+                "distance": distance,
+                "similarity": 1 - distance
+            }
+            for i, distance in entry.top_k(query, k)
+        ]
+
+    def invalidate(self, chunk_set_id: str):
+        """Forget a chunk set, e.g. once its last document is deleted"""
+        with self._lock:
+            entry = self._entries.pop(str(chunk_set_id), None)
+            if entry is not None:
+                self._bytes -= entry.nbytes
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "loads": self.loads,
+                "fallbacks": self.fallbacks
+            }
+
+    def _get(self, chunk_set_id: str, revision: int) -> Optional[ChunkMatrix]:
+        with self._lock:
+            entry = self._entries.get(chunk_set_id)
+            if entry is None or entry.revision != revision:
+                return None  # Not loaded yet, or re-chunked since
+            self._entries.move_to_end(chunk_set_id)
+            self.hits += 1
+        VECTOR_CACHE_SEARCHES.labels("hit").inc()
+        return entry
+
+    def _load(self, db: Session, chunk_set_id: str, revision: int) -> Optional[ChunkMatrix]:
+        rows = db.execute(CHUNK_SET_ROWS_SQL, {"chunk_set_id": chunk_set_id}).all()
+        if len(rows) > self.max_chunks:
+            return None
+        embeddings = np.empty((len(rows), EMBEDDING_DIM), dtype=np.float32)
+        for i, row in enumerate(rows):
+            embeddings[i] = _to_array(row.embedding)
+        entry = ChunkMatrix(
+            chunk_set_id,
+            revision,
+            [str(row.id) for row in rows],
+            [row.chunk_index for row in rows],
+            [row.chunk_text for row in rows],
+            [row.chunk_metadata for row in rows],
+            embeddings
+        )
+        if entry.nbytes > self.max_bytes:
+            return None
+
+        with self._lock:
+            previous = self._entries.pop(chunk_set_id, None)
+            if previous is not None:
+                self._bytes -= previous.nbytes  # Loaded concurrently by another request
+            self._entries[chunk_set_id] = entry
+            self._bytes += entry.nbytes
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= evicted.nbytes
+            self.loads += 1
+        VECTOR_CACHE_SEARCHES.labels("load").inc()
+        return entry
+
+
+def _to_array(value) -> np.ndarray:
+    # Raw text() results are ndarrays with the pgvector adapter registered, '[...]' strings without it
+    if isinstance(value, str):
+        return np.array(value[1:-1].split(","), dtype=np.float32)
+    return np.asarray(value, dtype=np.float32)
+
+
+def _parse_metadata(value: Optional[str]) -> Dict[str, Any]:
+    return json.loads(value) if value else {}
+
+
+chunk_matrix_cache = ChunkMatrixCache()
+VECTOR_CACHE_ENTRIES.set_function(lambda: chunk_matrix_cache.stats()["entries"])
+VECTOR_CACHE_BYTES.set_function(lambda: chunk_matrix_cache.stats()["bytes"])
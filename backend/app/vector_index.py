@@ -0,0 +1,199 @@
+# backend/app/vector_index.py
+"""Manage the ANN index on document_chunks.embedding, one per partition
+
+Usage (from backend/):
+    python -m app.vector_index status
+    python -m app.vector_index create
+    python -m app.vector_index rebuild --type hnsw --m 24 --ef-construction 128
+"""
+import os
+import time
+import argparse
+from contextlib import contextmanager
+from typing import Any, Dict, List, Optional
+from sqlalchemy import text
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import OperationalError
+
+from .database import engine
+
+VECTOR_INDEX_TYPE = os.getenv("VECTOR_INDEX_TYPE", "hnsw")  # hnsw, ivfflat or none
+VECTOR_INDEX_AUTO_CREATE = os.getenv("VECTOR_INDEX_AUTO_CREATE", "true").lower() == "true"
+HNSW_M = int(os.getenv("HNSW_M", "16"))
+HNSW_EF_CONSTRUCTION = int(os.getenv("HNSW_EF_CONSTRUCTION", "64"))
+IVFFLAT_LISTS = int(os.getenv("IVFFLAT_LISTS", "100"))
+# How long the index swap after a rebuild waits for its lock before backing off and retrying
+VECTOR_INDEX_SWAP_LOCK_TIMEOUT_MS = int(os.getenv("VECTOR_INDEX_SWAP_LOCK_TIMEOUT_MS", "2000"))
+VECTOR_INDEX_SWAP_ATTEMPTS = int(os.getenv("VECTOR_INDEX_SWAP_ATTEMPTS", "10"))
+
+VECTOR_INDEX_NAME = "ix_document_chunks_embedding"
+TABLE_NAME = "document_chunks"
+
+
+def index_method(index_type: str = VECTOR_INDEX_TYPE, m: int = HNSW_M, ef_construction: int = HNSW_EF_CONSTRUCTION, lists: int = IVFFLAT_LISTS) -> str:
+    """USING ... WITH ... clause of a cosine-distance index of the given type"""
+    if index_type == "hnsw":
+        options = f"m = {int(m)}, ef_construction = {int(ef_construction)}"
+    elif index_type == "ivfflat":
+        options = f"lists = {int(lists)}"
+    else:
+        raise ValueError(f"Unknown vector index type: {index_type}")
+    return f"USING {index_type} (embedding vector_cosine_ops) WITH ({options})"
+
+
+def index_ddl(name: str, index_type: str = VECTOR_INDEX_TYPE, table: str = TABLE_NAME, **params) -> str:
+    """CREATE INDEX CONCURRENTLY statement for one table (or one partition)"""
+    return f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON {table} {index_method(index_type, **params)}"
+
+
+@contextmanager
+def _autocommit(bind: Engine):
+    # CONCURRENTLY cannot run inside a transaction block
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        # Index builds outlast DB_STATEMENT_TIMEOUT_MS by design
+        conn.execute(text("SET statement_timeout = 0"))
+        try:
+            yield conn
+        finally:
+            conn.execute(text("RESET statement_timeout"))
+
+
+def _partitions(conn) -> List[str]:
+    return conn.execute(text("""
+        SELECT inhrelid::regclass::text FROM pg_inherits
+        WHERE inhparent = CAST(:table AS regclass)
+        ORDER BY 1
+    """), {"table": TABLE_NAME}).scalars().all()
+
+
+def _partition_index_name(name: str, partition: str) -> str:
+    # ix_document_chunks_embedding -> ix_document_chunks_p03_embedding
+    return name.replace(TABLE_NAME, partition, 1)
+
+
+def _build_index(conn, name: str, index_type: str, **params):
+    """Build the index without blocking writes
+
+    Partitioned indexes can't be built concurrently, so each partition's
+    index is built concurrently and attached to an index created on the
+    parent alone; the parent index becomes valid once all are attached.
+    """
+    partitions = _partitions(conn)
+    if not partitions:
+        conn.execute(text(index_ddl(name, index_type, **params)))
+        return
+    conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON ONLY {TABLE_NAME} {index_method(index_type, **params)}"))
+    for partition in partitions:
+        partition_index = _partition_index_name(name, partition)
+        conn.execute(text(index_ddl(partition_index, index_type, table=partition, **params)))
+        attached = conn.execute(text("""
+            SELECT 1 FROM pg_inherits
+            WHERE inhrelid = to_regclass(:child) AND inhparent = to_regclass(:parent)
+        """), {"child": partition_index, "parent": name}).first()
+        if attached is None:
+            conn.execute(text(f"ALTER INDEX {name} ATTACH PARTITION {partition_index}"))
+
+
+def ensure_vector_index(bind: Engine = engine, index_type: str = VECTOR_INDEX_TYPE, **params):
+    """Create the vector index (on every partition) if it doesn't exist yet, without blocking writes"""
+    if index_type == "none":
+        return
+    with _autocommit(bind) as conn:
+        _build_index(conn, VECTOR_INDEX_NAME, index_type, **params)
+
+
+def rebuild_vector_index(bind: Engine = engine, index_type: str = VECTOR_INDEX_TYPE, **params):
+    """Build a replacement index concurrently and swap it in; searches keep using the old one meanwhile
+
+    On a partitioned table the swap can't be concurrent: Postgres has no
+    concurrent drop for a partitioned index, and an attached partition
+    index can't be dropped (or detached) on its own. See _swap_partitioned_index.
+    """
+    new_name = f"{VECTOR_INDEX_NAME}_new"
+    with _autocommit(bind) as conn:
+        partitions = _partitions(conn)
+        # A failed earlier rebuild leaves an invalid index behind
+        conn.execute(text(f"DROP INDEX {'' if partitions else 'CONCURRENTLY '}IF EXISTS {new_name}"))
+        for partition in partitions:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {_partition_index_name(new_name, partition)}"))
+        _build_index(conn, new_name, index_type, **params)
+        if not partitions:
+            conn.execute(text(f"DROP INDEX CONCURRENTLY IF EXISTS {VECTOR_INDEX_NAME}"))
+            conn.execute(text(f"ALTER INDEX {new_name} RENAME TO {VECTOR_INDEX_NAME}"))
+            return
+    _swap_partitioned_index(bind, new_name, partitions)
+
+
+def _swap_partitioned_index(bind: Engine, new_name: str, partitions: List[str]):
+    """Drop the old partitioned index and rename the new one into place in one transaction
+
+    The drop takes ACCESS EXCLUSIVE on document_chunks and every partition,
+    blocking reads and writes until commit. The transaction itself is
+    catalog-only and short, but waiting for that lock behind a long query
+    would queue every other query behind it, so it gives up after
+    VECTOR_INDEX_SWAP_LOCK_TIMEOUT_MS and retries with backoff. Doing it
+    all in one transaction also means searches never see the table without
+    an index.
+    """
+    for attempt in range(VECTOR_INDEX_SWAP_ATTEMPTS):
+        try:
+            with bind.begin() as conn:
+                conn.execute(text(f"SET LOCAL lock_timeout = {int(VECTOR_INDEX_SWAP_LOCK_TIMEOUT_MS)}"))
+                conn.execute(text(f"DROP INDEX IF EXISTS {VECTOR_INDEX_NAME}"))
+                conn.execute(text(f"ALTER INDEX {new_name} RENAME TO {VECTOR_INDEX_NAME}"))
+                for partition in partitions:
+                    conn.execute(text(
+                        f"ALTER INDEX {_partition_index_name(new_name, partition)} RENAME TO {_partition_index_name(VECTOR_INDEX_NAME, partition)}"
+                    ))
+            return
+        except OperationalError as error:
+            # 55P03 lock_not_available; psycopg2 calls it pgcode, psycopg 3 sqlstate
+            code = getattr(error.orig, "pgcode", None) or getattr(error.orig, "sqlstate", None)
+            if code != "55P03" or attempt == VECTOR_INDEX_SWAP_ATTEMPTS - 1:
+                raise
+            time.sleep(min(2 ** attempt, 30))
+
+
+def vector_index_status(bind: Engine = engine) -> Optional[Dict[str, Any]]:
+    """Describe the current vector index, or None if there isn't one"""
+    with bind.connect() as conn:
+        row = conn.execute(text("""
+            SELECT am.amname AS method, i.indisvalid AS valid, c.reloptions AS options,
+                   (SELECT coalesce(sum(pg_relation_size(relid)), 0) FROM pg_partition_tree(c.oid)) AS size_bytes,
+                   (SELECT count(*) FROM pg_partition_tree(c.oid) WHERE isleaf) AS partitions
+            FROM pg_class c
+            JOIN pg_index i ON i.indexrelid = c.oid
+            JOIN pg_am am ON am.oid = c.relam
+            WHERE c.relname = :name
+        """), {"name": VECTOR_INDEX_NAME}).first()
+    if row is None:
+        return None
+    return {
+        "name": VECTOR_INDEX_NAME,
+        "method": row.method,
+        "valid": row.valid,
+        "options": row.options or [],
+        "size_bytes": int(row.size_bytes),
+        "partitions": row.partitions
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Manage the document_chunks vector index")
+    parser.add_argument("command", choices=["status", "create", "rebuild"])
+    parser.add_argument("--type", default=VECTOR_INDEX_TYPE, choices=["hnsw", "ivfflat"])
+    parser.add_argument("--m", type=int, default=HNSW_M)
+    parser.add_argument("--ef-construction", type=int, default=HNSW_EF_CONSTRUCTION)
+    parser.add_argument("--lists", type=int, default=IVFFLAT_LISTS)
+    args = parser.parse_args()
+
+    params = {"m": args.m, "ef_construction": args.ef_construction, "lists": args.lists}
+    if args.command == "create":
+        ensure_vector_index(index_type=args.type, **params)
+    elif args.command == "rebuild":
+        rebuild_vector_index(index_type=args.type, **params)
+    print(vector_index_status() or "No vector index")
+
+
+if __name__ == "__main__":
+    main()
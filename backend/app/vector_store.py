@@ -1,30 +1,229 @@
 # backend/app/vector_store.py
+import os
 import uuid
 import json
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
+import numpy as np
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from .database import DocumentChunk, Document
+from sqlalchemy import text, insert
+from .database import DocumentChunk, Document, TEXT_SEARCH_CONFIG
+from .vector_cache import chunk_matrix_cache, CHUNK_SET_SQL
+from .embedding_cache import text_hash
+from .pdf_parser import CHUNKER_VERSION, chunker_params
 
-def insert_document(db: Session, user_id: str, filename: str, original_filename: str, file_size: int = None) -> str:
-    """Insert a new document and return its ID"""
+HNSW_EF_SEARCH = int(os.getenv("HNSW_EF_SEARCH", "0")) or None  # pgvector default (40) when unset
+IVFFLAT_PROBES = int(os.getenv("IVFFLAT_PROBES", "0")) or None  # pgvector default (1) when unset
+EXACT_SEARCH_MAX_CHUNKS = int(os.getenv("EXACT_SEARCH_MAX_CHUNKS", "50000"))  # Larger scopes use the ANN index, on pgvector 0.8+
+RETRIEVAL_MODE = os.getenv("RETRIEVAL_MODE", "hybrid")  # "vector" ranks by embedding distance alone
+HYBRID_CANDIDATES = int(os.getenv("HYBRID_CANDIDATES", "40"))  # Chunks each pass contributes to the fusion
+HYBRID_PRUNE_ABOVE = int(os.getenv("HYBRID_PRUNE_ABOVE", "50000"))  # Larger documents only score lexical matches by distance
+LEXICAL_POOL_SIZE = 1000  # Lexical matches the vector pass may be pruned to
+RRF_K = 60  # Reciprocal rank fusion damping: a chunk at rank r contributes 1 / (RRF_K + r)
+
+_iterative_scans: Optional[bool] = None  # Checked once per process
+
+# The nearest {limit} chunks in {scope}, by exact distance: every chunk in scope is found
+# through the chunk_set_id index and ranked. Materializing keeps the planner off the ANN
+# index, which applies the scope only to the ef_search candidates it returns from the
+# whole partition and so can come back with fewer than k rows, or none.
+EXACT_NEAREST_TEMPLATE = """
+    scored AS MATERIALIZED (
+        SELECT id, chunk_set_id, embedding <=> CAST(:embedding AS vector) AS distance
+        FROM document_chunks
+        WHERE {scope}
+    ),
+    nearest AS (
+        SELECT id, chunk_set_id, distance FROM scored ORDER BY distance LIMIT {limit}
+    )
+"""
+
+# The same from the ANN index; only used with iterative scans, which keep reading the
+# index until enough rows pass the scope (see set_search_params)
+ANN_NEAREST_TEMPLATE = """
+    nearest AS (
+        SELECT id, chunk_set_id, embedding <=> CAST(:embedding AS vector) AS distance
+        FROM document_chunks
+        WHERE {scope}
+        ORDER BY distance
+        LIMIT {limit}
+    )
+"""
+
+# Constant statement text keeps SQLAlchemy's compiled cache warm and lets psycopg 3
+# prepare it server-side. Scopes are resolved to chunk sets up front, so every scan
+# (the final one repeats the scope) only touches the partitions of those sets.
+SEARCH_TEMPLATE = """
+    WITH {nearest}
+    SELECT c.id, c.chunk_set_id, c.chunk_index, c.chunk_text, c.chunk_metadata, n.distance
+    FROM nearest n JOIN (SELECT * FROM document_chunks WHERE {scope}) c ON c.chunk_set_id = n.chunk_set_id AND c.id = n.id
+    ORDER BY n.distance
+"""
+
+DOCUMENT_SCOPE = "chunk_set_id = CAST(:chunk_set_id AS uuid)"
+USER_SCOPE = "chunk_set_id = ANY(CAST(:chunk_set_ids AS uuid[]))"
+
+
+def _search_sql(scope: str, nearest_template: str):
+    return text(SEARCH_TEMPLATE.format(scope=scope, nearest=nearest_template.format(scope=scope, limit=":k")))
+
+
+DOCUMENT_SEARCH_SQL = _search_sql(DOCUMENT_SCOPE, EXACT_NEAREST_TEMPLATE)
+DOCUMENT_ANN_SEARCH_SQL = _search_sql(DOCUMENT_SCOPE, ANN_NEAREST_TEMPLATE)
+USER_SEARCH_SQL = _search_sql(USER_SCOPE, EXACT_NEAREST_TEMPLATE)
+USER_ANN_SEARCH_SQL = _search_sql(USER_SCOPE, ANN_NEAREST_TEMPLATE)
+
+# The user's live documents, one per chunk set (the newest, if a file was uploaded twice)
+USER_CHUNK_SETS_SQL = text("""
+    SELECT DISTINCT ON (d.chunk_set_id) d.chunk_set_id, d.id AS document_id, d.original_filename, s.chunk_count
+    FROM documents d
+    JOIN chunk_sets s ON s.id = d.chunk_set_id
+    WHERE d.user_id = CAST(:user_id AS uuid) AND d.deleted_at IS NULL
+    ORDER BY d.chunk_set_id, d.upload_date DESC
+""")
+
+# Hybrid retrieval in one round trip: the best lexical (full-text) and vector matches are
+# fused by reciprocal rank. On scopes above HYBRID_PRUNE_ABOVE chunks (:prune) the vector
+# pass only computes distances for lexical matches, unless there are none; the two
+# branches of vector_hits are gated by that one-time condition so only one of them runs.
+# Both rank exactly, as the vector-only search does, unless the statement is built on
+# ANN_NEAREST_TEMPLATE. Rows are carried with their chunk_set_id, and every scan repeats
+# the scope, so partitions outside it are pruned.
+HYBRID_SEARCH_TEMPLATE = """
+    WITH lexical_pool AS (
+        SELECT id, chunk_set_id, ts_rank_cd(chunk_tsv, query) AS lexical_rank
+        FROM document_chunks, websearch_to_tsquery('{config}', :query_text) AS query
+        WHERE {scope} AND chunk_tsv @@ query
+        ORDER BY lexical_rank DESC
+        LIMIT {pool_size}
+    ),
+    lexical_hits AS (
+        SELECT id, chunk_set_id, rank FROM (
+            SELECT id, chunk_set_id, row_number() OVER (ORDER BY lexical_rank DESC) AS rank FROM lexical_pool
+        ) ranked
+        WHERE rank <= :candidates
+    ),
+    {nearest},
+    lexical_scored AS MATERIALIZED (
+        SELECT id, chunk_set_id, embedding <=> CAST(:embedding AS vector) AS distance
+        FROM document_chunks
+        WHERE {scope} AND (chunk_set_id, id) IN (SELECT chunk_set_id, id FROM lexical_pool) AND {pruned}
+    ),
+    vector_hits AS (
+        SELECT id, chunk_set_id, row_number() OVER (ORDER BY distance) AS rank
+        FROM (
+            SELECT id, chunk_set_id, distance FROM nearest
+            UNION ALL
+            (SELECT id, chunk_set_id, distance FROM lexical_scored ORDER BY distance LIMIT :candidates)
+        ) candidates
+    ),
+    fused AS (
+        SELECT COALESCE(v.id, l.id) AS id, COALESCE(v.chunk_set_id, l.chunk_set_id) AS chunk_set_id,
+               COALESCE(1.0 / ({rrf_k} + v.rank), 0) + COALESCE(1.0 / ({rrf_k} + l.rank), 0) AS score
+        FROM vector_hits v FULL OUTER JOIN lexical_hits l ON l.id = v.id
+        ORDER BY score DESC
+        LIMIT :k
+    )
+    SELECT c.id, c.chunk_set_id, c.chunk_index, c.chunk_text, c.chunk_metadata,
+           c.embedding <=> CAST(:embedding AS vector) AS distance, f.score
+    FROM fused f JOIN (SELECT * FROM document_chunks WHERE {scope}) c ON c.chunk_set_id = f.chunk_set_id AND c.id = f.id
+    ORDER BY f.score DESC, distance
+"""
+
+HYBRID_PRUNED = "(:prune AND EXISTS (SELECT 1 FROM lexical_pool))"
+
+
+def _hybrid_search_sql(scope: str, nearest_template: str):
+    return text(HYBRID_SEARCH_TEMPLATE.format(
+        config=TEXT_SEARCH_CONFIG,
+        pool_size=LEXICAL_POOL_SIZE,
+        rrf_k=RRF_K,
+        scope=scope,
+        pruned=HYBRID_PRUNED,
+        nearest=nearest_template.format(scope=f"{scope} AND NOT {HYBRID_PRUNED}", limit=":candidates").strip()
+    ))
+
+
+DOCUMENT_HYBRID_SEARCH_SQL = _hybrid_search_sql(DOCUMENT_SCOPE, EXACT_NEAREST_TEMPLATE)
+DOCUMENT_ANN_HYBRID_SEARCH_SQL = _hybrid_search_sql(DOCUMENT_SCOPE, ANN_NEAREST_TEMPLATE)
+USER_HYBRID_SEARCH_SQL = _hybrid_search_sql(USER_SCOPE, EXACT_NEAREST_TEMPLATE)
+USER_ANN_HYBRID_SEARCH_SQL = _hybrid_search_sql(USER_SCOPE, ANN_NEAREST_TEMPLATE)
+
+def insert_document(db: Session, user_id: str, filename: str, original_filename: str, file_size: int = None, chunk_set_id: str = None, commit: bool = True) -> str:
+    """Insert a new document and return its ID (flush only when commit=False)"""
     doc = Document(
         user_id=user_id,
         filename=filename,
         original_filename=original_filename,
-        file_size=file_size
+        file_size=file_size,
+        chunk_set_id=chunk_set_id
     )
     db.add(doc)
-    db.commit()
-    db.refresh(doc)
+    if commit:
+        db.commit()
+        db.refresh(doc)
+    else:
+        db.flush()
     return str(doc.id)
 
-def insert_chunk(db: Session, document_id: str, chunk_text: str, metadata: Dict[str, Any], embedding: List[float], chunk_index: int) -> str:
+def acquire_chunk_set(db: Session, content_hash: str) -> Optional[str]:
+    """Take a reference on the chunk set for this content, if one exists, and return its ID"""
+    # The row lock serializes against release_chunk_set, and released sets (awaiting purge) are never reused
+    result = db.execute(
+        text("UPDATE chunk_sets SET ref_count = ref_count + 1 WHERE content_hash = :content_hash AND ref_count > 0 RETURNING id"),
+        {"content_hash": content_hash}
+    ).first()
+    return str(result.id) if result else None
+
+def create_chunk_set(db: Session, content_hash: str = None, params: Dict[str, Any] = None) -> Optional[str]:
+    """Create a chunk set with one reference; returns None if another upload committed this content first
+
+    Concurrent creators of the same content wait on the unique index until the first commits.
+    params are the chunker parameters its chunks are cut with (the current ones by default).
+    """
+    result = db.execute(
+        text("""
+            INSERT INTO chunk_sets (id, content_hash, ref_count, chunk_count, chunker_version, chunker_params, revision, created_at)
+            VALUES (:id, :content_hash, 1, 0, :chunker_version, :chunker_params, 0, now())
+            ON CONFLICT (content_hash) DO NOTHING
+            RETURNING id
+        """),
+        {
+            "id": uuid.uuid4(),
+            "content_hash": content_hash,
+            "chunker_version": CHUNKER_VERSION,
+            "chunker_params": json.dumps(params or chunker_params(), sort_keys=True)
+        }
+    ).first()
+    return str(result.id) if result else None
+
+def release_chunk_set(db: Session, chunk_set_id: str, commit: bool = True):
+    """Drop one reference to a chunk set
+
+    The last release detaches the set from its content hash, so new uploads
+    of that content ingest afresh, and leaves its chunks to the purge job.
+    """
+    result = db.execute(
+        text("""
+            UPDATE chunk_sets
+            SET ref_count = ref_count - 1,
+                content_hash = CASE WHEN ref_count <= 1 THEN NULL ELSE content_hash END
+            WHERE id = :id
+            RETURNING ref_count
+        """),
+        {"id": chunk_set_id}
+    ).first()
+    if result and result.ref_count <= 0:
+        chunk_matrix_cache.invalidate(chunk_set_id)
+    if commit:
+        db.commit()
+
+def insert_chunk(db: Session, chunk_set_id: str, chunk_text: str, metadata: Dict[str, Any], embedding: List[float], chunk_index: int) -> str:
     """Insert a new document chunk with embedding"""
     chunk = DocumentChunk(
-        document_id=document_id,
+        chunk_set_id=chunk_set_id,
         chunk_text=chunk_text,
         chunk_index=chunk_index,
+        content_hash=text_hash(chunk_text),
         chunk_metadata=json.dumps(metadata),
         embedding=embedding
     )
@@ -33,54 +232,153 @@ def insert_chunk(db: Session, document_id: str, chunk_text: str, metadata: Dict[
     db.refresh(chunk)
     return str(chunk.id)
 
-def similarity_search(db: Session, query_embedding: List[float], document_id: str = None, k: int = 5) -> List[Dict[str, Any]]:
-    """Search for similar chunks using pgvector"""
-    # Convert embedding to string format for PostgreSQL
-    embedding_str = "[" + ",".join(map(str, query_embedding)) + "]"
+def insert_chunks(db: Session, chunk_set_id: str, chunk_texts: List[str], embeddings: List[List[float]], metadatas: List[Dict[str, Any]], start_index: int = 0, commit: bool = True, chunk_indexes: List[int] = None) -> List[str]:
+    """Insert many chunks of one chunk set with a single multi-row INSERT and return their IDs
+
+    Chunks are numbered from start_index unless chunk_indexes gives each one's position.
+    """
+    set_uuid = uuid.UUID(str(chunk_set_id))
+    if chunk_indexes is None:
+        chunk_indexes = range(start_index, start_index + len(chunk_texts))
+    rows = [
+        {
+            "id": uuid.uuid4(),
+            "chunk_set_id": set_uuid,
+            "chunk_text": chunk,
+            "chunk_index": chunk_index,
+            "content_hash": text_hash(chunk),
+            "chunk_metadata": json.dumps(metadata),
+            "embedding": embedding
+        }
+        for chunk, chunk_index, embedding, metadata in zip(chunk_texts, chunk_indexes, embeddings, metadatas)
+    ]
+    if rows:
+        # executemany on a Core insert is batched into multi-row VALUES statements
+        db.execute(insert(DocumentChunk), rows)
+    if commit:
+        db.commit()
+    return [str(row["id"]) for row in rows]
+
+def similarity_search(db: Session, query_embedding: List[float], document_id: str = None, k: int = 5, ef_search: int = None, probes: int = None, query_text: str = None, user_id: str = None) -> List[Dict[str, Any]]:
+    """Search for similar chunks using pgvector
+
+    Searches one document, or with user_id instead all of that user's live
+    documents; one of the two is required. Scopes of up to
+    EXACT_SEARCH_MAX_CHUNKS chunks are ranked exactly; larger ones use the
+    ANN index when pgvector supports iterative scans. ef_search (HNSW) and
+    probes (IVFFlat) trade recall for latency for such a query only; they
+    default to HNSW_EF_SEARCH / IVFFLAT_PROBES. With query_text and RETRIEVAL_MODE
+    "hybrid", full-text matches are fused with the nearest chunks in Postgres
+    and rows carry the fused "score". Other searches within one document
+    (RETRIEVAL_MODE "vector", or no query_text) are answered exactly from the
+    in-process chunk matrix cache when it is enabled and the document is
+    small enough.
+    """
+    if not document_id and not user_id:
+        raise ValueError("similarity_search needs a document_id or a user_id")
+    hybrid = bool(query_text) and RETRIEVAL_MODE == "hybrid"
     
+    # Bound as a numpy array so the registered pgvector adapter encodes it (binary under psycopg 3)
+    params = {"embedding": np.asarray(query_embedding, dtype=np.float32), "k": k}
+    documents = {}
+    # Scopes are resolved up front so the search itself only touches the partitions of their sets
     if document_id:
-        # Search within specific document using f-string (simpler approach)
-        query_str = f"""
-            SELECT id, document_id, chunk_text, chunk_metadata, 
-                   1 - (embedding <=> '{embedding_str}'::vector) as similarity
-            FROM document_chunks 
-            WHERE document_id = '{document_id}'
-            ORDER BY embedding <=> '{embedding_str}'::vector
-            LIMIT {k}
-        """
-        result = db.execute(text(query_str))
+        row = db.execute(CHUNK_SET_SQL, {"document_id": str(document_id)}).first()
+        if row is None:
+            return []  # Deleted, or a document without chunks
+        if chunk_matrix_cache.enabled and not hybrid:
+            chunks = chunk_matrix_cache.search(db, document_id, query_embedding, k, chunk_set=row)
+            if chunks is not None:
+                return chunks
+        params.update(document_id=str(document_id), chunk_set_id=str(row.chunk_set_id))
+        scope_chunks = row.chunk_count or 0
+    else:
+        for row in db.execute(USER_CHUNK_SETS_SQL, {"user_id": str(user_id)}):
+            documents[row.chunk_set_id] = row
+        if not documents:
+            return []
+        params["chunk_set_ids"] = [str(chunk_set_id) for chunk_set_id in documents]
+        scope_chunks = sum(row.chunk_count or 0 for row in documents.values())
+    
+    ann = use_ann_index(db, scope_chunks)
+    if hybrid:
+        candidates = max(HYBRID_CANDIDATES, k)
+        params.update(query_text=query_text, candidates=candidates, prune=scope_chunks > HYBRID_PRUNE_ABOVE)
+        if ann:
+            set_search_params(db, candidates, ef_search, probes)
+            statement = DOCUMENT_ANN_HYBRID_SEARCH_SQL if document_id else USER_ANN_HYBRID_SEARCH_SQL
+        else:
+            statement = DOCUMENT_HYBRID_SEARCH_SQL if document_id else USER_HYBRID_SEARCH_SQL
+    elif ann:
+        set_search_params(db, k, ef_search, probes)
+        statement = DOCUMENT_ANN_SEARCH_SQL if document_id else USER_ANN_SEARCH_SQL
     else:
-        # Search across all documents
-        query_str = f"""
-            SELECT id, document_id, chunk_text, chunk_metadata,
-                   1 - (embedding <=> '{embedding_str}'::vector) as similarity
-            FROM document_chunks
-            ORDER BY embedding <=> '{embedding_str}'::vector
-            LIMIT {k}
-        """
-        result = db.execute(text(query_str))
+        statement = DOCUMENT_SEARCH_SQL if document_id else USER_SEARCH_SQL
+    result = db.execute(statement, params)
     
     chunks = []
     for row in result:
         chunk_data = {
             "id": str(row.id),
-            "document_id": str(row.document_id),
+            "document_id": document_id,
+            "chunk_set_id": str(row.chunk_set_id),
+            "chunk_index": row.chunk_index,
             "chunk_text": row.chunk_text,
             "metadata": json.loads(row.chunk_metadata) if row.chunk_metadata else {},
-            "distance": 1 - row.similarity,
-            "similarity": row.similarity
+            "distance": row.distance,
+            "similarity": 1 - row.distance
         }
+        if not document_id:
+            document = documents[row.chunk_set_id]
+            chunk_data["document_id"] = str(document.document_id)
+            chunk_data["filename"] = document.original_filename
+        if hybrid:
+            chunk_data["score"] = float(row.score)
         chunks.append(chunk_data)
     
     return chunks
 
+def iterative_scans_supported(db: Session) -> bool:
+    """Whether the installed pgvector can keep scanning its index until a filtered query has its rows (0.8+)"""
+    global _iterative_scans
+    if _iterative_scans is None:
+        version = db.execute(text("SELECT extversion FROM pg_extension WHERE extname = 'vector'")).scalar()
+        _iterative_scans = version is not None and tuple(int(part) for part in version.split(".")[:2]) >= (0, 8)
+    return _iterative_scans
+
+def use_ann_index(db: Session, scope_chunks: int) -> bool:
+    """Whether a search over scope_chunks chunks should read the ANN index rather than rank exactly"""
+    return scope_chunks > EXACT_SEARCH_MAX_CHUNKS and iterative_scans_supported(db)
+
+def set_search_params(db: Session, k: int, ef_search: int = None, probes: int = None):
+    """Apply per-query ANN search settings for the rest of the current transaction
+
+    Every search is scoped to chunk sets, which the index can only apply to
+    the candidates it has already returned, so iterative scans are turned on
+    where pgvector has them, to keep it reading until k of them pass.
+    """
+    ef_search = ef_search or HNSW_EF_SEARCH
+    probes = probes or IVFFLAT_PROBES
+    if iterative_scans_supported(db):
+        db.execute(text("""
+            SELECT set_config('hnsw.iterative_scan', 'strict_order', true),
+                   set_config('ivfflat.iterative_scan', 'relaxed_order', true)
+        """))
+    if ef_search or k > 40:
+        # Each HNSW scan pass returns at most ef_search rows, so never go below k
+        db.execute(text("SELECT set_config('hnsw.ef_search', :value, true)"), {"value": str(max(ef_search or 40, k))})
+    if probes:
+        db.execute(text("SELECT set_config('ivfflat.probes', :value, true)"), {"value": str(probes)})
+
 def get_document_chunks(db: Session, document_id: str) -> List[Dict[str, Any]]:
     """Get all chunks for a specific document"""
-    chunks = db.query(DocumentChunk).filter(DocumentChunk.document_id == document_id).all()
+    chunks = db.query(DocumentChunk).join(
+        Document, Document.chunk_set_id == DocumentChunk.chunk_set_id
+    ).filter(Document.id == document_id, Document.deleted_at.is_(None)).all()
     return [
         {
             "id": str(chunk.id),
-            "document_id": str(chunk.document_id),
+            "document_id": document_id,
             "chunk_text": chunk.chunk_text,
             "metadata": json.loads(chunk.chunk_metadata) if chunk.chunk_metadata else {},
             "chunk_index": chunk.chunk_index
@@ -88,7 +386,22 @@ def get_document_chunks(db: Session, document_id: str) -> List[Dict[str, Any]]:
         for chunk in chunks
     ]
 
+def soft_delete_document(db: Session, document_id: str, user_id: str) -> bool:
+    """Hide a user's document at once; the purge job removes it, its chats and chunks later"""
+    result = db.execute(
+        text("""
+            UPDATE documents SET deleted_at = now()
+            WHERE id = CAST(:document_id AS uuid) AND user_id = CAST(:user_id AS uuid) AND deleted_at IS NULL
+        """),
+        {"document_id": str(document_id), "user_id": str(user_id)}
+    )
+    db.commit()
+    return result.rowcount > 0
+
 def delete_document_chunks(db: Session, document_id: str):
-    """Delete all chunks for a document"""
-    db.query(DocumentChunk).filter(DocumentChunk.document_id == document_id).delete()
+    """Release a document's chunk set; its chunks are purged once no document references them"""
+    chunk_set_id = db.query(Document.chunk_set_id).filter(Document.id == document_id).scalar()
+    if chunk_set_id:
+        db.query(Document).filter(Document.id == document_id).update({"chunk_set_id": None}, synchronize_session=False)
+        release_chunk_set(db, str(chunk_set_id), commit=False)
     db.commit()
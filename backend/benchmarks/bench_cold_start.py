@@ -0,0 +1,89 @@
+# backend/benchmarks/bench_cold_start.py
+"""Measure cold start: time from launching uvicorn to the first served request
+
+Needs DATABASE_URL pointing at a migrated Postgres with pgvector. Starts the
+server several times and reports, per start, when /api/healthz first
+answers (process up, startup hook done) and when /api/readyz first reports
+ready. Also times a bare `import app.api`. --app-dir points at another
+checkout's backend/ to compare versions on the same database.
+Run from backend/: python -m benchmarks.bench_cold_start [--starts 5] [--migrate-on-startup]
+"""
+import os
+import sys
+import time
+import socket
+import argparse
+import statistics
+import subprocess
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def wait_for(client: httpx.Client, url: str, started: float, timeout: float = 60) -> float:
+    """Poll url until it answers 200; returns ms since started"""
+    while time.perf_counter() - started < timeout:
+        try:
+            if client.get(url).status_code == 200:
+                return (time.perf_counter() - started) * 1000
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.02)  # Sparse enough not to slow the server down on a small machine
+    raise TimeoutError(f"{url} did not answer 200 within {timeout}s")
+
+
+def cold_start(app_dir: str, env: dict) -> tuple:
+    port = free_port()
+    started = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=app_dir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}", timeout=1) as client:
+            health = wait_for(client, "/api/healthz", started)
+            ready = health
+            if client.get("/api/readyz").status_code != 404:  # Versions without a readiness endpoint
+                ready = wait_for(client, "/api/readyz", started)
+        return health, ready
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def import_time(app_dir: str, env: dict) -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", "import time; s = time.perf_counter(); import app.api; print((time.perf_counter() - s) * 1000)"],
+        cwd=app_dir, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--starts", type=int, default=5)
+    parser.add_argument("--app-dir", default=BACKEND_DIR, help="backend/ directory of the version to start")
+    parser.add_argument("--migrate-on-startup", action="store_true", help="Set MIGRATE_ON_STARTUP=true")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    if args.migrate_on_startup:
+        env["MIGRATE_ON_STARTUP"] = "true"
+    import_time(args.app_dir, env)  # Warm the bytecode and OS file caches
+
+    imports = [import_time(args.app_dir, env) for _ in range(args.starts)]
+    starts = [cold_start(args.app_dir, env) for _ in range(args.starts)]
+    print(f"{args.app_dir}, {args.starts} starts{', MIGRATE_ON_STARTUP' if args.migrate_on_startup else ''}")
+    print(f"  import app.api        median {statistics.median(imports):7.0f} ms   min {min(imports):7.0f} ms")
+    print(f"  first /api/healthz    median {statistics.median(s[0] for s in starts):7.0f} ms   min {min(s[0] for s in starts):7.0f} ms")
+    print(f"  ready                 median {statistics.median(s[1] for s in starts):7.0f} ms   min {min(s[1] for s in starts):7.0f} ms")
+
+
+if __name__ == "__main__":
+    main()
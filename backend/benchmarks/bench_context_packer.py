@@ -0,0 +1,98 @@
+# backend/benchmarks/bench_context_packer.py
+"""Compare prompt excerpts from the context packer with the old top-5 concatenation
+
+Chunks a synthetic document with the ingestion chunker, then for random
+questions picks candidate chunks the way a search would (runs of
+neighbouring chunks plus a duplicate from another upload) and reports the
+excerpt tokens sent before and after packing. Checks that packed excerpts
+fit the budget, that merged neighbours are verbatim document text (no
+repeated overlap) and that nothing is cut mid-sentence.
+Run from backend/: python -m benchmarks.bench_context_packer [--questions 500] [--budget 1200]
+"""
+import time
+import random
+import argparse
+import statistics
+
+from app.pdf_parser import iter_chunks
+from app.context import pack_context, count_tokens, _encoder
+
+WORDS = "invoice payment clause party agreement term notice delivery goods service fee liability period written".split()
+
+
+def synthetic_pages(rng: random.Random, pages: int):
+    for _ in range(pages):
+        sentences = [
+            " ".join(rng.choice(WORDS) for _ in range(rng.randint(6, 18))).capitalize() + "."
+            for _ in range(40)
+        ]
+        yield " ".join(sentences)
+
+
+def candidate_rows(rng: random.Random, chunks, k: int):
+    """k chunks as a search would return them, most similar first
+
+    A few runs of neighbouring chunks, plus a copy of one of them from
+    another chunk set (the same pages uploaded inside another file).
+    """
+    picked = set()
+    while len(picked) < k - 1:
+        start = rng.randrange(len(chunks))
+        picked.update(range(start, min(start + rng.randint(1, 3), len(chunks))))
+    rows = [
+        {"id": str(i), "chunk_set_id": "set", "chunk_index": i, "chunk_text": chunks[i], "similarity": rng.random()}
+        for i in sorted(picked)[:k - 1]
+    ]
+    original = rng.choice(rows)
+    rows.append(dict(original, id="copy", chunk_set_id="copy", similarity=original["similarity"] - 1e-6))
+    return sorted(rows, key=lambda row: row["similarity"], reverse=True)
+
+
+def old_excerpts(rows) -> str:
+    excerpts = "\n\n".join(f"[{i+1}] {r['chunk_text']}" for i, r in enumerate(rows[:5]))
+    if len(excerpts.split()) > 8000:
+        excerpts = excerpts[:6000] + "..."
+    return excerpts
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=500)
+    parser.add_argument("--budget", type=int, default=1200)
+    parser.add_argument("--candidates", type=int, default=8)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    pages = list(synthetic_pages(rng, 30))
+    document = "\n\n".join(pages)
+    chunks = list(iter_chunks(pages))
+    print(f"{len(chunks)} chunks, tokenizer: {'tiktoken' if _encoder() else 'length estimate'}")
+
+    old_tokens, new_tokens, excerpt_counts, rows_used, timings = [], [], [], [], []
+    for _ in range(args.questions):
+        rows = candidate_rows(rng, chunks, args.candidates)
+        old_tokens.append(count_tokens(old_excerpts(rows)))
+
+        start = time.perf_counter()
+        packed = pack_context(rows, args.budget)
+        timings.append((time.perf_counter() - start) * 1000)
+
+        new_tokens.append(count_tokens("\n\n".join(f"[{i+1}] {e['text']}" for i, e in enumerate(packed))))
+        excerpt_counts.append(len(packed))
+        rows_used.append(sum(len(e["rows"]) for e in packed))
+        assert sum(e["tokens"] for e in packed) <= args.budget, "budget exceeded"
+        for excerpt in packed:
+            assert excerpt["text"] in document, "merged excerpt is not verbatim document text"
+            last_chunk = max(excerpt["rows"], key=lambda row: row["chunk_index"])["chunk_text"]
+            assert excerpt["text"].endswith(last_chunk) or excerpt["text"][-1] in ".!?", "excerpt cut mid-sentence"
+        assert not any(row["chunk_set_id"] == "copy" for e in packed for row in e["rows"]), "duplicate chunk kept"
+
+    print(f"{args.questions} questions, {args.candidates} candidates, budget {args.budget} tokens")
+    print(f"  top-5 concatenation  median {statistics.median(old_tokens):6.0f} tokens   max {max(old_tokens):6d}")
+    print(f"  packed context       median {statistics.median(new_tokens):6.0f} tokens   max {max(new_tokens):6d}")
+    print(f"  packed excerpts median {statistics.median(excerpt_counts):.0f}, chunks covered median {statistics.median(rows_used):.0f}")
+    print(f"  packing time median {statistics.median(timings):.3f} ms   p95 {sorted(timings)[int(len(timings) * 0.95) - 1]:.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
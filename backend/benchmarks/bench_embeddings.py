@@ -0,0 +1,77 @@
+# backend/benchmarks/bench_embeddings.py
+"""Compare the throughput of the vectorized embed_texts with the original per-text version
+
+Run from backend/: python -m benchmarks.bench_embeddings
+(tests/test_embeddings.py checks that both produce the same vectors)
+"""
+import hashlib
+import random
+import time
+from typing import List
+
+from app.embeddings import embed_texts
+
+ALPHABET = "abcdefghijklmnopqrstuvwxyzABCDEFXYZ 0123456789.,;:()\n\téßàæİ☃~{|}"
+
+
+def reference_embed_texts(texts: List[str]) -> List[list]:
+    """The original pure-Python embed_texts, kept as the equivalence reference"""
+    embeddings = []
+    for text in texts:
+        text_lower = text.lower()
+        vector = []
+
+        md5_hash = hashlib.md5(text_lower.encode()).hexdigest()
+        for i in range(0, len(md5_hash), 2):
+            vector.append(int(md5_hash[i:i+2], 16) / 255.0)
+
+        sha256_hash = hashlib.sha256(text_lower.encode()).hexdigest()
+        for i in range(0, len(sha256_hash), 2):
+            vector.append(int(sha256_hash[i:i+2], 16) / 255.0)
+
+        char_counts = {}
+        for char in text_lower:
+            char_counts[char] = char_counts.get(char, 0) + 1
+
+        for i in range(128):
+            char = chr((i + ord('a')) % 256)
+            freq = char_counts.get(char, 0)
+            vector.append(min(freq / max(len(text), 1), 1.0))
+
+        while len(vector) < 384:
+            vector.append(0.0)
+        embeddings.append(vector[:384])
+
+    return embeddings
+
+
+def make_texts(count: int, max_length: int = 1000, seed: int = 0) -> List[str]:
+    rng = random.Random(seed)
+    texts = ["", " ", "İ", "Hello World"]
+    while len(texts) < count:
+        texts.append("".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, max_length))))
+    return texts[:count]
+
+
+def best_of(fn, repeat: int = 3) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main():
+    for count in (1, 64, 1024):
+        texts = make_texts(count)
+        reference = best_of(lambda: reference_embed_texts(texts))
+        vectorized = best_of(lambda: embed_texts(texts))
+        print(
+            f"{count:>5} texts: reference {count / reference:>10.0f} texts/s, "
+            f"vectorized {count / vectorized:>10.0f} texts/s ({reference / vectorized:.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    main()
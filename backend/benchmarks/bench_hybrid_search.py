@@ -0,0 +1,85 @@
+# backend/benchmarks/bench_hybrid_search.py
+"""Compare recall and latency of vector-only and hybrid (full-text + vector) retrieval
+
+Needs DATABASE_URL pointing at a Postgres with pgvector. Seeds a throwaway
+document whose chunks each mention one part number, asks for random part
+numbers and counts how often the chunk naming it comes back in the top k.
+Runs the hybrid search once more with pruning forced on, as it would be
+for a document above HYBRID_PRUNE_ABOVE chunks.
+Run from backend/: python -m benchmarks.bench_hybrid_search [--chunks 5000] [--queries 200]
+"""
+import time
+import random
+import argparse
+import statistics
+
+from app import vector_store
+from app.database import SessionLocal, create_tables
+from app.embeddings import embed_texts
+from app.vector_store import similarity_search
+from app.vector_cache import chunk_matrix_cache
+from benchmarks.fixtures import scratch_data
+
+WORDS = "invoice payment clause party agreement term notice delivery goods service fee liability period written".split()
+
+
+def chunk_text(rng: random.Random, part: str) -> str:
+    filler = " ".join(rng.choice(WORDS) for _ in range(rng.randint(60, 120)))
+    return f"{filler.capitalize()}. Part {part} ships within {rng.randint(2, 30)} days. {filler}."
+
+
+def run(db, document_id: str, parts, k: int, hybrid: bool):
+    hits, timings = 0, []
+    for index, part in parts:
+        question = f"When does part {part} ship?"
+        start = time.perf_counter()
+        rows = similarity_search(db, embed_texts([question])[0], document_id, k=k, query_text=question if hybrid else None)
+        timings.append((time.perf_counter() - start) * 1000)
+        db.rollback()
+        hits += any(row["chunk_index"] == index for row in rows)
+    return hits, timings
+
+
+def report(name: str, hits: int, total: int, timings):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{name:<16} hit rate {hits / total:6.1%}   median {statistics.median(timings):7.2f} ms   p95 {p95:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=8)
+    args = parser.parse_args()
+
+    create_tables()
+    rng = random.Random(0)
+    db = SessionLocal()
+    try:
+        with scratch_data(db) as scratch:
+            parts = [f"PN-{rng.randrange(10**6):06d}" for _ in range(args.chunks)]
+            document_id = scratch.document(scratch.user(), [chunk_text(rng, part) for part in parts])
+            scratch.commit()
+
+            chunk_matrix_cache.max_bytes = 0  # Compare Postgres against Postgres
+            asked = rng.sample(list(enumerate(parts)), args.queries)
+            run(db, document_id, asked[:10], args.k, hybrid=True)  # Warm up
+
+            print(f"{args.queries} part-number questions over a {args.chunks}-chunk document, top {args.k}")
+            for name, hybrid in (("vector", False), ("hybrid", True)):
+                hits, timings = run(db, document_id, asked, args.k, hybrid)
+                report(name, hits, args.queries, timings)
+
+            prune_above = vector_store.HYBRID_PRUNE_ABOVE
+            vector_store.HYBRID_PRUNE_ABOVE = 0
+            try:
+                hits, timings = run(db, document_id, asked, args.k, hybrid=True)
+            finally:
+                vector_store.HYBRID_PRUNE_ABOVE = prune_above
+            report("hybrid, pruned", hits, args.queries, timings)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
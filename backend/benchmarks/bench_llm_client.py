@@ -0,0 +1,99 @@
+# backend/benchmarks/bench_llm_client.py
+"""Drive the async LLM clients against the fake OpenAI server and check their guarantees
+
+Fires many concurrent calls while the server fails a share of them with
+429/503, then checks that in-flight upstream calls never exceeded the
+concurrency limit, that failures were retried, and that a slow upstream is
+cut off by the per-call timeout. For the Hugging Face client, checks that
+identical concurrent prompts share one upstream call and that connections
+are reused.
+Run from backend/: python -m benchmarks.bench_llm_client [--calls 200] [--concurrency 8]
+"""
+import time
+import asyncio
+import argparse
+import statistics
+
+from app.llm import LLMUnavailableError
+from app.openai_client import AsyncOpenAIClient
+from app.huggingface_client import HuggingFaceInferenceClient
+from benchmarks.fake_openai import FakeOpenAI, serve_in_thread
+
+
+async def timed(coro):
+    """(ms, result), with the LLMUnavailableError as the result of a call that gave up"""
+    start = time.perf_counter()
+    try:
+        result = await coro
+    except LLMUnavailableError as e:
+        result = e
+    return (time.perf_counter() - start) * 1000, result
+
+
+async def first_token_ms(client: AsyncOpenAIClient) -> float:
+    start = time.perf_counter()
+    generation = client.stream("Question: hello", max_tokens=50)
+    try:
+        async for _ in generation:
+            return (time.perf_counter() - start) * 1000
+    finally:
+        await generation.aclose()
+
+
+async def run(args):
+    fake = FakeOpenAI(delay=args.delay, failure_rate=args.failure_rate)
+    server = serve_in_thread(fake, args.port)
+    base_url = f"http://127.0.0.1:{args.port}/v1"
+    try:
+        client = AsyncOpenAIClient("test-key", "fake-model", base_url=base_url, timeout=5, max_concurrency=args.concurrency)
+        results = await asyncio.gather(*(timed(client(f"Question: {i}", max_tokens=50)) for i in range(args.calls)))
+        latencies = sorted(ms for ms, _ in results)
+        gave_up = sum(isinstance(result, LLMUnavailableError) for _, result in results)
+        print(f"{args.calls} calls, concurrency limit {args.concurrency}, {args.failure_rate:.0%} injected failures")
+        print(f"  median {statistics.median(latencies):7.1f} ms   p95 {latencies[int(len(latencies) * 0.95) - 1]:7.1f} ms")
+        print(f"  upstream requests {fake.requests}, failures {fake.failures}, client retries {client.retries}, gave up {gave_up}")
+        print(f"  max in flight upstream {fake.max_in_flight}")
+        assert fake.max_in_flight <= args.concurrency, "concurrency limit exceeded"
+        # Every injected failure is either retried or, once retries run out, raised
+        assert client.retries + gave_up == fake.failures, "unexpected retry count"
+
+        ttft = [await first_token_ms(client) for _ in range(10)]
+        print(f"  streamed first token median {statistics.median(ttft):.1f} ms")
+        await client.aclose()
+
+        fake.delay, fake.failure_rate = 3.0, 0.0
+        slow = AsyncOpenAIClient("test-key", "fake-model", base_url=base_url, timeout=0.5, max_concurrency=args.concurrency)
+        ms, result = await timed(slow("Question: slow"))
+        print(f"  3 s upstream with 0.5 s timeout: gave up after {ms:.0f} ms")
+        assert ms < 2000 and isinstance(result, LLMUnavailableError)
+        await slow.aclose()
+
+        fake.delay, fake.requests, fake.max_in_flight = 0.2, 0, 0
+        hf = HuggingFaceInferenceClient("test-key", f"http://127.0.0.1:{args.port}", "fake/model", max_concurrency=args.concurrency)
+        results = await asyncio.gather(*(hf("Question: same", max_tokens=50) for _ in range(50)))
+        print(f"Hugging Face: 50 identical concurrent prompts -> {fake.requests} upstream call(s), {hf.coalesced} coalesced")
+        assert fake.requests == 1 and len({r[0]["generated_text"] for r in results}) == 1
+
+        await asyncio.sleep(3)  # Let the timed-out slow request finish upstream
+        fake.requests, fake.connections, fake.max_in_flight = 0, set(), 0
+        for batch in range(5):
+            await asyncio.gather(*(hf(f"Question: {batch}-{i}", max_tokens=50) for i in range(args.concurrency)))
+        print(f"  {fake.requests} distinct prompts over {len(fake.connections)} connection(s), max in flight {fake.max_in_flight}")
+        assert len(fake.connections) <= args.concurrency and fake.max_in_flight <= args.concurrency
+        await hf.aclose()
+    finally:
+        server.should_exit = True
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--delay", type=float, default=0.05)
+    parser.add_argument("--failure-rate", type=float, default=0.2)
+    parser.add_argument("--port", type=int, default=8901)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
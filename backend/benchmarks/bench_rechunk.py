@@ -0,0 +1,87 @@
+# backend/benchmarks/bench_rechunk.py
+"""Compare incremental re-chunking with deleting and re-ingesting a document
+
+Needs DATABASE_URL pointing at a Postgres with pgvector. Seeds a throwaway
+chunk set from a synthetic PDF, then re-chunks it with unchanged parameters
+(as for sets that predate the chunker record, re-extracted from the PDF)
+and with a different overlap and size (reassembled from the stored chunks),
+reporting chunks kept, embedded and the time taken next to a full
+re-embed and insert of the same chunks. Checks that the re-chunked set
+holds exactly the chunks a fresh ingestion would.
+Run from backend/: python -m benchmarks.bench_rechunk [--pages 200]
+"""
+import os
+import time
+import argparse
+import tempfile
+from sqlalchemy import text
+
+from app.database import SessionLocal, create_tables
+from app.embedding_cache import embedding_cache, embed_texts_cached
+from app.pdf_parser import iter_chunks, iter_pdf_pages
+from app.rechunk import rechunk_chunk_set, file_hash
+from app.vector_store import create_chunk_set, insert_chunks, release_chunk_set
+from benchmarks.fixtures import scratch_data
+from benchmarks.synthetic_pdf import write_pdf
+
+def stored_chunks(db, chunk_set_id: str):
+    return db.execute(
+        text("SELECT chunk_text FROM document_chunks WHERE chunk_set_id = :id ORDER BY chunk_index"),
+        {"id": chunk_set_id}
+    ).scalars().all()
+
+
+def full_ingest(db, chunks) -> float:
+    """Embed and insert every chunk into a new set, as re-uploading the document would; returns ms"""
+    start = time.perf_counter()
+    chunk_set_id = create_chunk_set(db)
+    for i in range(0, len(chunks), 128):
+        batch = chunks[i:i + 128]
+        insert_chunks(db, chunk_set_id, batch, embed_texts_cached(batch), [{}] * len(batch), start_index=i, commit=False)
+    db.commit()
+    elapsed = (time.perf_counter() - start) * 1000
+    release_chunk_set(db, chunk_set_id)
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=200)
+    args = parser.parse_args()
+
+    create_tables()
+    embedding_cache.persist = False  # Every run embeds from scratch
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    write_pdf(path, args.pages)
+    pages = list(iter_pdf_pages(path))
+    db = SessionLocal()
+    chunks = list(iter_chunks(pages, 1000, 50))
+    try:
+        with scratch_data(db) as scratch:
+            chunk_set_id = scratch.chunk_set(chunks, params={"chunk_size": 1000, "overlap": 50})
+            db.execute(
+                text("UPDATE chunk_sets SET chunker_version = NULL, chunker_params = NULL, content_hash = :hash WHERE id = :id"),
+                {"id": chunk_set_id, "hash": file_hash(path)}
+            )
+            db.commit()
+
+            print(f"{args.pages} pages, {len(chunks)} chunks")
+            cases = (("unchanged, legacy set", 1000, 50, path), ("overlap 50 -> 80", 1000, 80, None), ("size 1000 -> 800", 800, 80, None))
+            for label, chunk_size, overlap, pdf_path in cases:
+                expected = list(iter_chunks(pages, chunk_size, overlap))
+                embedding_cache.clear()
+                start = time.perf_counter()
+                counts = rechunk_chunk_set(db, chunk_set_id, chunk_size, overlap, pdf_path)
+                elapsed = (time.perf_counter() - start) * 1000
+                assert stored_chunks(db, chunk_set_id) == expected, "re-chunked set differs from a fresh ingestion"
+                embedding_cache.clear()
+                baseline = full_ingest(db, expected)
+                print(f"  {label:<22} kept {counts['kept']:5d} (renumbered {counts['renumbered']:4d})  embedded {counts['embedded']:5d}  deleted {counts['deleted']:5d}"
+                      f"   {elapsed:8.1f} ms   (full re-ingest {baseline:8.1f} ms)")
+    finally:
+        db.close()
+        os.remove(path)
+
+if __name__ == "__main__":
+    main()
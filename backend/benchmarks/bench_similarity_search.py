@@ -0,0 +1,112 @@
+# backend/benchmarks/bench_similarity_search.py
+"""Compare per-query latency of the old f-string query, the parameterized query and the in-process matrix cache
+
+Needs DATABASE_URL pointing at a Postgres with pgvector. Seeds a throwaway
+document, runs both versions and removes the data again.
+Run from backend/: python -m benchmarks.bench_similarity_search [--chunks 2000] [--queries 300]
+"""
+import time
+import argparse
+import statistics
+from typing import List
+import numpy as np
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database import SessionLocal, create_tables
+from app.vector_store import similarity_search
+from app.vector_cache import chunk_matrix_cache
+from benchmarks.fixtures import scratch_data
+
+
+def legacy_similarity_search(db: Session, query_embedding: List[float], document_id: str, k: int = 5):
+    """The previous implementation: vector and ids formatted into a new SQL string per call"""
+    embedding_str = "[" + ",".join(map(str, query_embedding)) + "]"
+    query_str = f"""
+        SELECT id, chunk_set_id, chunk_text, chunk_metadata,
+               1 - (embedding <=> '{embedding_str}'::vector) as similarity
+        FROM document_chunks
+        WHERE chunk_set_id = (SELECT chunk_set_id FROM documents WHERE id = '{document_id}')
+        ORDER BY embedding <=> '{embedding_str}'::vector
+        LIMIT {k}
+    """
+    return db.execute(text(query_str)).all()
+
+
+def exact_search(db: Session, query_embedding, document_id: str, k: int = 5):
+    """Brute-force ranking in Postgres, bypassing any ANN index"""
+    db.execute(text("SET LOCAL enable_indexscan = off"))
+    return db.execute(text("""
+        SELECT id FROM document_chunks
+        WHERE chunk_set_id = (SELECT chunk_set_id FROM documents WHERE id = CAST(:document_id AS uuid))
+        ORDER BY embedding <=> CAST(:embedding AS vector)
+        LIMIT :k
+    """), {"embedding": np.asarray(query_embedding, dtype=np.float32), "document_id": document_id, "k": k}).all()
+
+
+def time_queries(db: Session, search, queries: np.ndarray, document_id: str) -> List[float]:
+    timings = []
+    for query in queries:
+        start = time.perf_counter()
+        search(db, query, document_id, k=8)
+        timings.append((time.perf_counter() - start) * 1000)
+        db.rollback()  # End the transaction like a request would
+    return timings
+
+
+def report(name: str, timings: List[float]):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{name:<15} median {statistics.median(timings):7.3f} ms   p95 {p95:7.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--chunks", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=300)
+    args = parser.parse_args()
+
+    create_tables()
+    rng = np.random.default_rng(0)
+    db = SessionLocal()
+    try:
+        with scratch_data(db) as scratch:
+            embeddings = rng.random((args.chunks, 384), dtype=np.float32)
+            document_id = scratch.document(scratch.user(), [f"chunk {i}" for i in range(args.chunks)], embeddings)
+            scratch.commit()
+            run(db, rng, document_id, args)
+    finally:
+        db.close()
+
+
+def run(db: Session, rng, document_id: str, args):
+    queries = rng.random((args.queries, 384), dtype=np.float32)
+    # Query vectors arrive as lists from older callers; the new path accepts both
+    query_lists = [query.tolist() for query in queries]
+
+    max_bytes = chunk_matrix_cache.max_bytes
+    chunk_matrix_cache.max_bytes = 0  # Postgres only until the matrix cache row
+
+    # Warm up connections and caches for both paths
+    time_queries(db, legacy_similarity_search, query_lists[:20], document_id)
+    time_queries(db, similarity_search, queries[:20], document_id)
+
+    print(f"{args.queries} queries over a {args.chunks}-chunk document")
+    report("f-string", time_queries(db, legacy_similarity_search, query_lists, document_id))
+    report("parameterized", time_queries(db, similarity_search, queries, document_id))
+
+    chunk_matrix_cache.max_bytes = max_bytes or 256 * 1024 * 1024
+    time_queries(db, similarity_search, queries[:1], document_id)  # Loads the matrix
+    report("matrix cache", time_queries(db, similarity_search, queries, document_id))
+
+    # The cache is exact, so it must agree with an index-free scan
+    mismatches = 0
+    for query in queries[:50]:
+        cached = [row["id"] for row in similarity_search(db, query, document_id, k=8)]
+        exact = [str(row.id) for row in exact_search(db, query, document_id, k=8)]
+        mismatches += cached != exact
+        db.rollback()
+    print(f"matrix cache vs exact scan: {mismatches} of 50 rankings differ")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# backend/benchmarks/bench_user_search.py
+"""Measure search across all of one user's documents on the partitioned chunk table
+
+Needs DATABASE_URL pointing at a migrated Postgres with pgvector. Seeds a
+user with several documents whose chunks each mention one part number,
+plus other tenants' chunks the search must never see, then asks for
+random part numbers across the user's documents. Compares one user-scoped
+query with searching the documents one by one and merging, and reports
+how many partitions of document_chunks the user-scoped plans read.
+Run from backend/: python -m benchmarks.bench_user_search [--documents 8] [--chunks 300] [--other-chunks 40000]
+"""
+import re
+import time
+import random
+import argparse
+import statistics
+import numpy as np
+from sqlalchemy import text
+
+from app.database import SessionLocal, create_tables
+from app.embeddings import embed_texts
+from app.vector_store import similarity_search, USER_SEARCH_SQL, USER_HYBRID_SEARCH_SQL, HYBRID_CANDIDATES
+from app.vector_cache import chunk_matrix_cache
+from benchmarks.bench_hybrid_search import chunk_text
+from benchmarks.fixtures import scratch_data
+
+OTHER_SET_SIZE = 500  # Chunks per document of the other tenants
+
+
+def per_document_search(db, document_ids, query_embedding, k: int):
+    """The alternative without a user-scoped query: each document in turn, merged by distance"""
+    rows = [row for document_id in document_ids for row in similarity_search(db, query_embedding, document_id, k=k)]
+    return sorted(rows, key=lambda row: row["distance"])[:k]
+
+
+def run(db, search, asked, k: int):
+    hits, timings = 0, []
+    for (document_id, index), part in asked:
+        question = f"When does part {part} ship?"
+        start = time.perf_counter()
+        rows = search(question, embed_texts([question])[0], k)
+        timings.append((time.perf_counter() - start) * 1000)
+        db.rollback()
+        hits += any(row["document_id"] == document_id and row["chunk_index"] == index for row in rows)
+    return hits, timings
+
+
+def partitions_read(db, statement, params) -> int:
+    plan = [row[0] for row in db.execute(text(f"EXPLAIN (ANALYZE, COSTS OFF) {statement}"), params)]
+    db.rollback()
+    return len({name for line in plan if "never executed" not in line for name in re.findall(r"document_chunks_p\d+", line)})
+
+
+def report(name: str, hits: int, total: int, timings):
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{name:<22} hit rate {hits / total:6.1%}   median {statistics.median(timings):7.2f} ms   p95 {p95:7.2f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=8)
+    parser.add_argument("--chunks", type=int, default=300, help="Chunks per document of the searching user")
+    parser.add_argument("--other-chunks", type=int, default=40000, help="Chunks of other tenants")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=8)
+    args = parser.parse_args()
+
+    create_tables()
+    db = SessionLocal()
+    try:
+        with scratch_data(db) as scratch:
+            run_all(db, scratch, args)
+    finally:
+        db.close()
+
+
+def run_all(db, scratch, args):
+    rng = random.Random(0)
+    user_id, other_id = scratch.user(), scratch.user("Other tenant")
+
+    parts = {}
+    own_documents = []
+    for _ in range(args.documents):
+        numbers = [f"PN-{rng.randrange(10**6):06d}" for _ in range(args.chunks)]
+        document_id = scratch.document(user_id, [chunk_text(rng, part) for part in numbers])
+        own_documents.append(document_id)
+        parts.update(((document_id, index), part) for index, part in enumerate(numbers))
+    # Other tenants' chunks only need to occupy the partitions; random unit vectors will do
+    vectors = np.random.default_rng(0).standard_normal((OTHER_SET_SIZE, len(embed_texts(["x"])[0])), dtype=np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    for start in range(0, args.other_chunks, OTHER_SET_SIZE):
+        texts = [chunk_text(rng, f"PN-{rng.randrange(10**6):06d}") for _ in range(min(OTHER_SET_SIZE, args.other_chunks - start))]
+        scratch.document(other_id, texts, vectors[:len(texts)])
+    scratch.commit()
+
+    chunk_matrix_cache.max_bytes = 0  # Compare Postgres against Postgres
+    asked = rng.sample(sorted(parts.items()), args.queries)
+    searches = (
+        ("vector, per document", lambda question, embedding, k: per_document_search(db, own_documents, embedding, k)),
+        ("vector", lambda question, embedding, k: similarity_search(db, embedding, k=k, user_id=user_id)),
+        ("hybrid", lambda question, embedding, k: similarity_search(db, embedding, k=k, query_text=question, user_id=user_id)),
+    )
+    for _, search in searches:
+        run(db, search, asked[:10], args.k)  # Warm up
+
+    print(f"{args.queries} part-number questions across {args.documents} documents of {args.chunks} chunks, "
+          f"{args.other_chunks} chunks of other tenants, top {args.k}")
+    for name, search in searches:
+        hits, timings = run(db, search, asked, args.k)
+        report(name, hits, args.queries, timings)
+
+    chunk_set_ids = [str(c) for c in db.execute(
+        text("SELECT chunk_set_id FROM documents WHERE user_id = :user_id"), {"user_id": user_id}
+    ).scalars()]
+    question = f"When does part {asked[0][1]} ship?"
+    params = {
+        "embedding": np.asarray(embed_texts([question])[0], dtype=np.float32), "k": args.k, "chunk_set_ids": chunk_set_ids,
+        "query_text": question, "candidates": HYBRID_CANDIDATES, "prune": False
+    }
+    total = db.execute(text("SELECT count(*) FROM pg_inherits WHERE inhparent = 'document_chunks'::regclass")).scalar()
+    print(f"partitions read: vector {partitions_read(db, USER_SEARCH_SQL, params)}, "
+          f"hybrid {partitions_read(db, USER_HYBRID_SEARCH_SQL, params)} of {total}")
+
+if __name__ == "__main__":
+    main()
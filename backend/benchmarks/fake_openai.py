@@ -0,0 +1,125 @@
+# backend/benchmarks/fake_openai.py
+"""Minimal OpenAI-compatible chat completions server for exercising the LLM clients locally
+
+Answers POST /v1/chat/completions (plain and streamed) and the Hugging Face
+Inference API's POST /models/{model} after a configurable delay, and fails
+a configurable share of requests with 429 or 503, or the next few with
+given statuses.
+Run standalone from backend/: python -m benchmarks.fake_openai --port 8901
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+from typing import List, Optional
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+class FakeOpenAI:
+    def __init__(self, delay: float = 0.05, failure_rate: float = 0.0, tokens: int = 20, token_delay: float = 0.01, seed: int = 0):
+        self.delay = delay
+        self.failure_rate = failure_rate
+        self.tokens = tokens
+        self.token_delay = token_delay
+        self.random = random.Random(seed)
+        self.requests = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.fail_next: List[int] = []  # Statuses for the next chat requests, ahead of random failures
+        self.retry_after: Optional[float] = None  # Sent as Retry-After with every injected failure
+        self.app = FastAPI()
+        self.app.post("/v1/chat/completions")(self.completions)
+        self.app.post("/models/{model:path}")(self.inference)
+        self.connections = set()  # Client (host, port) pairs seen, to check connection reuse
+
+    async def inference(self, model: str, request: Request):
+        body = await request.json()
+        self.requests += 1
+        self.connections.add((request.client.host, request.client.port))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        return [{"generated_text": f"answer to {body['inputs'][-20:]}"}]
+
+    async def completions(self, request: Request):
+        body = await request.json()
+        self.requests += 1
+        status = None
+        if self.fail_next:
+            status = self.fail_next.pop(0)
+        elif self.random.random() < self.failure_rate:
+            status = self.random.choice([429, 503])
+        if status:
+            self.failures += 1
+            headers = {"Retry-After": str(self.retry_after)} if self.retry_after is not None else None
+            return JSONResponse({"error": {"message": "injected failure", "type": "fake"}}, status_code=status, headers=headers)
+
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            if not body.get("stream"):
+                self.in_flight -= 1
+
+        words = [f"word{i} " for i in range(self.tokens)]
+        if not body.get("stream"):
+            return {
+                "id": "chatcmpl-fake",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body["model"],
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": "".join(words)}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": self.tokens, "total_tokens": self.tokens}
+            }
+
+        async def chunks():
+            try:
+                for word in words:
+                    await asyncio.sleep(self.token_delay)
+                    chunk = {
+                        "id": "chatcmpl-fake",
+                        "object": "chat.completion.chunk",
+                        "created": int(time.time()),
+                        "model": body["model"],
+                        "choices": [{"index": 0, "delta": {"content": word}, "finish_reason": None}]
+                    }
+                    yield f"data: {json.dumps(chunk)}\n\n"
+                yield "data: [DONE]\n\n"
+            finally:
+                self.in_flight -= 1
+
+        return StreamingResponse(chunks(), media_type="text/event-stream")
+
+
+def serve_in_thread(fake: FakeOpenAI, port: int):
+    """Start the fake server on 127.0.0.1:port and return the uvicorn server (set should_exit to stop)"""
+    import uvicorn
+    server = uvicorn.Server(uvicorn.Config(fake.app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+def main():
+    import uvicorn
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--delay", type=float, default=0.05)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    args = parser.parse_args()
+    fake = FakeOpenAI(delay=args.delay, failure_rate=args.failure_rate)
+    uvicorn.run(fake.app, host="127.0.0.1", port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# backend/benchmarks/fixtures.py
+"""Throwaway users, documents and chunk sets for the benchmarks and the database tests
+
+Everything seeded through a ScratchData is removed again by cleanup(),
+including the chunks, which are purged at once rather than left to the
+background purge job.
+"""
+import uuid
+from contextlib import contextmanager
+from typing import Any, Dict, List
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+from app.database import User, Document
+from app.embeddings import embed_texts
+from app.vector_store import create_chunk_set, insert_chunks, insert_document, release_chunk_set
+from app.purge import purge_released_chunk_sets
+
+
+class ScratchData:
+    """Seeds rows into one session and remembers them for cleanup"""
+    def __init__(self, db: Session):
+        self.db = db
+        self.user_ids: List[uuid.UUID] = []
+        self.document_ids: List[str] = []
+        self.chunk_set_ids: List[str] = []
+
+    def user(self, name: str = "Benchmark") -> str:
+        user = User(email=f"bench-{uuid.uuid4()}@example.com", name=name)
+        self.db.add(user)
+        self.db.commit()
+        self.user_ids.append(user.id)
+        return str(user.id)
+
+    def empty_chunk_set(self, params: Dict[str, Any] = None) -> str:
+        chunk_set_id = create_chunk_set(self.db, params=params)
+        self.chunk_set_ids.append(chunk_set_id)
+        return chunk_set_id
+
+    def chunk_set(self, texts: List[str], embeddings=None, params: Dict[str, Any] = None) -> str:
+        """A chunk set holding texts, embedded with embed_texts unless embeddings are given; not committed"""
+        chunk_set_id = self.empty_chunk_set(params)
+        if embeddings is None:
+            embeddings = embed_texts(texts)
+        insert_chunks(self.db, chunk_set_id, texts, embeddings, [{}] * len(texts), commit=False)
+        self.db.execute(text("UPDATE chunk_sets SET chunk_count = :n WHERE id = :id"), {"n": len(texts), "id": chunk_set_id})
+        return chunk_set_id
+
+    def document(self, user_id: str, texts: List[str], embeddings=None, filename: str = "bench.pdf") -> str:
+        """A user's document on a new chunk set of texts; not committed"""
+        chunk_set_id = self.chunk_set(texts, embeddings)
+        document_id = insert_document(self.db, user_id, filename, filename, 0, chunk_set_id=chunk_set_id, commit=False)
+        self.document_ids.append(document_id)
+        return document_id
+
+    def commit(self):
+        """Commit the seeded rows and refresh planner statistics, as autovacuum would after real uploads"""
+        self.db.execute(text("ANALYZE document_chunks"))
+        self.db.commit()
+
+    def cleanup(self):
+        self.db.rollback()
+        if self.document_ids:
+            self.db.query(Document).filter(Document.id.in_(self.document_ids)).delete(synchronize_session=False)
+        # Documents take no reference of their own here, so each set goes with the one it was created with
+        for chunk_set_id in self.chunk_set_ids:
+            release_chunk_set(self.db, chunk_set_id, commit=False)
+        if self.user_ids:
+            self.db.query(User).filter(User.id.in_(self.user_ids)).delete(synchronize_session=False)
+        self.db.commit()
+        purge_released_chunk_sets(self.db, pause=0)
+        self.document_ids, self.chunk_set_ids, self.user_ids = [], [], []
+
+
+@contextmanager
+def scratch_data(db: Session):
+    """Yield a ScratchData on db and remove what it seeded afterwards"""
+    scratch = ScratchData(db)
+    try:
+        yield scratch
+    finally:
+        scratch.cleanup()
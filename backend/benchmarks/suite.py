@@ -0,0 +1,269 @@
+# backend/benchmarks/suite.py
+"""Benchmark suite for the ingestion and retrieval hot paths
+
+Times extract_text_from_pdf on synthetic PDFs of several sizes and text
+densities, chunk_text, embed_texts, insert_chunk / insert_chunks and
+similarity_search (Postgres, matrix cache and hybrid), writes the results as
+JSON and compares the fastest run of every case with a stored baseline
+(the fastest run is the one least disturbed by other load). Exits
+with status 1 when a case is slower than the baseline by more than the
+threshold. Cases that need the database are skipped when Postgres with
+pgvector can't be reached at DATABASE_URL.
+
+Usage (from backend/):
+    python -m benchmarks.suite
+    python -m benchmarks.suite --save-baseline
+    python -m benchmarks.suite --only extract chunk --threshold 0.25
+    python -m benchmarks.suite --no-db --output /tmp/results.json
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import platform
+import tempfile
+import statistics
+import subprocess
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy import text
+
+from app import vector_store
+from app.embeddings import embed_texts
+from app.pdf_parser import extract_text_from_pdf, chunk_text, PDF_EXTRACT_WORKERS, CHUNK_SIZE, CHUNK_OVERLAP
+from .synthetic_pdf import write_pdf
+
+BENCHMARKS_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_OUTPUT = os.path.join(BENCHMARKS_DIR, "results", "latest.json")
+DEFAULT_BASELINE = os.path.join(BENCHMARKS_DIR, "baseline.json")
+DEFAULT_THRESHOLD = 0.20  # A case regresses when its fastest run is more than 20% above the baseline
+MIN_REGRESSION_MS = 0.05  # Smaller absolute slowdowns are timer noise, whatever the ratio
+
+# (pages, density) of the synthetic PDFs extracted serially
+PDF_CASES = [(8, "sparse"), (8, "normal"), (8, "dense"), (24, "normal")]
+LARGE_PDF_CASE = (24, "normal")  # Also extracted with PDF_EXTRACT_WORKERS, and chunked and embedded
+SEARCH_CHUNKS = 2000
+SEARCH_QUERIES = 100
+
+
+class Suite:
+    """Runs timed cases and collects their statistics"""
+    def __init__(self, only: Optional[List[str]] = None, repeat: int = 5):
+        self.only = only
+        self.repeat = repeat
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    def wanted(self, name: str) -> bool:
+        return not self.only or any(word in name for word in self.only)
+
+    def time(self, name: str, fn: Callable[[], Any], items: int = 1, repeat: int = None, setup: Callable[[], Any] = None):
+        """Time fn() once to warm up and then `repeat` times; setup() runs untimed before each call"""
+        if not self.wanted(name):
+            return
+        samples = []
+        for i in range((repeat or self.repeat) + 1):
+            if setup:
+                setup()
+            start = time.perf_counter()
+            fn()
+            if i:
+                samples.append((time.perf_counter() - start) * 1000)
+        self.record(name, samples, items)
+
+    def record(self, name: str, samples: List[float], items: int = 1):
+        samples = sorted(samples)
+        median = statistics.median(samples)
+        self.results[name] = {
+            "median_ms": round(median, 4),
+            "min_ms": round(samples[0], 4),
+            "p95_ms": round(samples[max(0, int(len(samples) * 0.95) - 1)], 4),
+            "samples": len(samples),
+            "items": items,
+            "items_per_s": round(items / median * 1000, 1) if median else None
+        }
+        print(f"  {name:<44} median {median:10.3f} ms   min {samples[0]:10.3f} ms   ({len(samples)} runs)")
+
+
+def bench_ingestion(suite: Suite, workdir: str) -> List[str]:
+    """PDF extraction, chunking and embedding; returns the chunks of LARGE_PDF_CASE for later cases"""
+    print("Ingestion")
+    paths = {}
+    for pages, density in sorted(set(PDF_CASES) | {LARGE_PDF_CASE}):
+        paths[pages, density] = write_pdf(os.path.join(workdir, f"{pages}-{density}.pdf"), pages, density)
+    for pages, density in PDF_CASES:
+        path = paths[pages, density]
+        suite.time(f"extract_text_from_pdf[{pages}p {density}, serial]", lambda: extract_text_from_pdf(path, workers=1), items=pages, repeat=3)
+
+    pages, density = LARGE_PDF_CASE
+    large_path = paths[LARGE_PDF_CASE]
+    if PDF_EXTRACT_WORKERS > 1:
+        name = f"extract_text_from_pdf[{pages}p {density}, {PDF_EXTRACT_WORKERS} workers]"
+        suite.time(name, lambda: extract_text_from_pdf(large_path, workers=PDF_EXTRACT_WORKERS), items=pages, repeat=3)
+
+    document = extract_text_from_pdf(large_path, workers=1)
+    suite.time(f"chunk_text[{len(document) // 1000}k chars]", lambda: chunk_text(document, CHUNK_SIZE, CHUNK_OVERLAP), items=len(document))
+    chunks = chunk_text(document, CHUNK_SIZE, CHUNK_OVERLAP)
+    many = (chunks * (1024 // len(chunks) + 1))[:1024]
+    for size in (1, 128, 1024):
+        batch = many[:size]
+        suite.time(f"embed_texts[{size} chunks]", lambda: embed_texts(batch), items=size)
+    return chunks
+
+
+def bench_database(suite: Suite, chunks: List[str]):
+    """Chunk inserts and searches against a throwaway user, document and chunk sets"""
+    from app.database import SessionLocal, create_tables
+    from app.vector_store import insert_chunk, insert_chunks, similarity_search
+    from app.vector_cache import chunk_matrix_cache
+    from .fixtures import scratch_data
+
+    create_tables()
+    db = SessionLocal()
+    try:
+        with scratch_data(db) as scratch:
+            print("Inserts")
+            rows = (chunks * (1000 // len(chunks) + 1))[:1000]
+            embeddings = embed_texts(rows)
+            suite.time(
+                "insert_chunk[100 rows]",
+                lambda: [insert_chunk(db, scratch.chunk_set_ids[-1], rows[i], {}, embeddings[i], i) for i in range(100)],
+                items=100, setup=scratch.empty_chunk_set
+            )
+            suite.time(
+                "insert_chunks[1000 rows]",
+                lambda: insert_chunks(db, scratch.chunk_set_ids[-1], rows, embeddings, [{}] * len(rows)),
+                items=len(rows), setup=scratch.empty_chunk_set
+            )
+
+            print("Search")
+            rng = random.Random(0)
+            words = " ".join(chunks).split()
+            texts = [f"{' '.join(rng.sample(words, 12))} {i}" for i in range(SEARCH_CHUNKS)]
+            document_id = scratch.document(scratch.user(), texts)
+            scratch.commit()
+
+            questions = [" ".join(rng.sample(words, 8)) for _ in range(SEARCH_QUERIES)]
+            query_embeddings = embed_texts(questions)
+            cache_bytes, retrieval_mode = chunk_matrix_cache.max_bytes, vector_store.RETRIEVAL_MODE
+            try:
+                for name, max_bytes, mode in (("postgres", 0, "vector"), ("matrix cache", cache_bytes or 256 * 1024 * 1024, "vector"), ("hybrid", 0, "hybrid")):
+                    if not suite.wanted(f"similarity_search[{name}"):
+                        continue
+                    chunk_matrix_cache.max_bytes, vector_store.RETRIEVAL_MODE = max_bytes, mode
+                    chunk_matrix_cache.clear()
+                    samples = []
+                    for i in range(len(questions) + 5):
+                        start = time.perf_counter()
+                        similarity_search(db, query_embeddings[i % len(questions)], document_id, k=8, query_text=questions[i % len(questions)])
+                        elapsed = (time.perf_counter() - start) * 1000
+                        db.rollback()  # End the transaction like a request would
+                        if i >= 5:
+                            samples.append(elapsed)
+                    suite.record(f"similarity_search[{name}, {SEARCH_CHUNKS} chunks]", samples)
+            finally:
+                chunk_matrix_cache.max_bytes, vector_store.RETRIEVAL_MODE = cache_bytes, retrieval_mode
+                chunk_matrix_cache.clear()
+    finally:
+        db.close()
+
+
+def database_available() -> bool:
+    try:
+        from app.database import engine
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+        return True
+    except Exception as e:
+        print(f"⚠️ Skipping database cases: {e.__class__.__name__}: {str(e).splitlines()[0] if str(e) else ''}")
+        return False
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], threshold: float) -> List[str]:
+    """Print each case next to the baseline; returns the names of regressed cases"""
+    regressed = []
+    print(f"\nFastest runs against the baseline (threshold +{threshold:.0%})")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"  {name:<44} {'new case':>30}")
+            continue
+        current, previous = result["min_ms"], base["min_ms"]
+        change = current / previous - 1 if previous else 0.0
+        status = "ok"
+        if change > threshold and current - previous > MIN_REGRESSION_MS:
+            status = "REGRESSED"
+            regressed.append(name)
+        elif change < -threshold:
+            status = "faster"
+        print(f"  {name:<44} {previous:10.3f} -> {current:10.3f} ms  {change:+7.1%}  {status}")
+    for name in baseline:
+        if name not in results:
+            print(f"  {name:<44} {'not run':>30}")
+    return regressed
+
+
+def environment() -> Dict[str, Any]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=BENCHMARKS_DIR).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "pdf_extract_workers": PDF_EXTRACT_WORKERS,
+        "chunk_size": CHUNK_SIZE,
+        "chunk_overlap": CHUNK_OVERLAP
+    }
+
+
+def write_json(path: str, data: Dict[str, Any]):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(data, f, indent=2)
+        f.write("\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the ingestion and retrieval hot paths")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="Where to write this run's results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Also store this run as the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="Allowed slowdown as a fraction, e.g. 0.2")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed runs per case")
+    parser.add_argument("--only", nargs="+", help="Run only cases whose name contains one of these")
+    parser.add_argument("--no-db", action="store_true", help="Skip the cases that need Postgres")
+    args = parser.parse_args()
+
+    suite = Suite(args.only, args.repeat)
+    with tempfile.TemporaryDirectory() as workdir:
+        chunks = bench_ingestion(suite, workdir)
+    if not args.no_db and database_available():
+        bench_database(suite, chunks)
+
+    run = {"environment": environment(), "results": suite.results}
+    write_json(args.output, run)
+    print(f"\nResults written to {args.output}")
+    if args.save_baseline:
+        write_json(args.baseline, run)
+        print(f"Baseline saved to {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print(f"No baseline at {args.baseline}; store one with --save-baseline")
+        return
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    regressed = compare(suite.results, baseline["results"], args.threshold)
+    if regressed:
+        print(f"\n❌ {len(regressed)} case(s) regressed: {', '.join(regressed)}")
+        sys.exit(1)
+    print("\n✅ No regressions")
+
+
+if __name__ == "__main__":
+    main()
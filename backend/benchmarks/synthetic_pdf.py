@@ -0,0 +1,72 @@
+# backend/benchmarks/synthetic_pdf.py
+"""Deterministic text PDFs for benchmarks, written without any PDF library
+
+Density is set by lines per page and words per line; the same arguments
+always give the same bytes.
+"""
+import random
+from typing import List
+
+WORDS = (
+    "invoice payment clause party agreement term notice delivery goods service fee liability period written "
+    "contract supplier customer schedule amendment warranty termination confidential"
+).split()
+
+# Text densities used by the suite: (lines per page, words per line)
+DENSITIES = {
+    "sparse": (12, 6),
+    "normal": (40, 12),
+    "dense": (70, 18),
+}
+
+
+def page_lines(rng: random.Random, lines: int, words: int) -> List[str]:
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+        for _ in range(lines)
+    ]
+
+
+def build_pdf(pages: int, lines: int = 40, words: int = 12, seed: int = 0) -> bytes:
+    """A PDF of `pages` pages, each with `lines` lines of `words` words in Helvetica"""
+    rng = random.Random(seed)
+    font_id = 3 + 2 * pages
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        f"<< /Type /Pages /Kids [{' '.join(f'{3 + 2 * i} 0 R' for i in range(pages))}] /Count {pages} >>".encode(),
+    ]
+    leading = max(6, 760 // max(lines, 1))
+    font_size = min(10, leading - 1)
+    for i in range(pages):
+        content = [f"BT /F1 {font_size} Tf 30 810 Td {leading} TL"]
+        content += [f"({_escape(line)}) '" for line in page_lines(rng, lines, words)]
+        content.append("ET")
+        stream = "\n".join(content).encode("latin-1")
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 595 842] /Contents {4 + 2 * i} 0 R "
+            f"/Resources << /Font << /F1 {font_id} 0 R >> >> >>".encode()
+        )
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(out))
+        out += f"{number} 0 obj\n".encode() + body + b"\nendobj\n"
+    xref = len(out)
+    out += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    out += b"".join(f"{offset:010d} 00000 n \n".encode() for offset in offsets)
+    out += f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n".encode()
+    return bytes(out)
+
+
+def write_pdf(path: str, pages: int, density: str = "normal", seed: int = 0) -> str:
+    lines, words = DENSITIES[density]
+    with open(path, "wb") as f:
+        f.write(build_pdf(pages, lines, words, seed))
+    return path
+
+
+def _escape(line: str) -> str:
+    return line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
@@ -0,0 +1 @@
+# simple package marker
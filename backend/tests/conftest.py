@@ -0,0 +1,27 @@
+# backend/tests/conftest.py
+import pytest
+from sqlalchemy import text
+
+from app.database import SessionLocal, engine, create_tables
+
+
+@pytest.fixture(scope="session")
+def database():
+    """Postgres with pgvector at DATABASE_URL, migrated and indexed; tests using it skip without one"""
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    except Exception as e:
+        pytest.skip(f"Postgres unavailable: {e.__class__.__name__}")
+    create_tables()
+    # Built only when a migration ran, and a test database may have been migrated before
+    from app.vector_index import ensure_vector_index
+    ensure_vector_index()
+    return engine
+
+
+@pytest.fixture(scope="module")
+def db(database):
+    session = SessionLocal()
+    yield session
+    session.close()
@@ -0,0 +1,97 @@
+# backend/tests/test_ask.py
+import uuid
+import json
+import pytest
+from types import SimpleNamespace
+from fastapi.testclient import TestClient
+
+from app import api
+from app.llm import LLMUnavailableError
+
+
+class FakeLLM:
+    """Answers with the given deltas, then raises LLMUnavailableError if fail is set"""
+    def __init__(self, deltas=(), fail=False):
+        self.deltas, self.fail = list(deltas), fail
+
+    async def __call__(self, prompt, **kwargs):
+        if self.fail:
+            raise LLMUnavailableError("upstream down")
+        return [{"generated_text": "".join(self.deltas)}]
+
+    async def stream(self, prompt, **kwargs):
+        for delta in self.deltas:
+            yield delta
+        if self.fail:
+            raise LLMUnavailableError("stream broke off")
+
+
+@pytest.fixture
+def ask(monkeypatch):
+    """A client for the ask endpoints with retrieval stubbed out; returns (client, saved exchanges, set_llm)"""
+    saved = []
+    monkeypatch.setattr(api, "prepare_question", lambda db, chat_id, user_id, query: (uuid.uuid4(), "prompt", []))
+    monkeypatch.setattr(api, "save_exchange", lambda db, chat_id, query, answer: saved.append((query, answer)))
+    monkeypatch.setattr(api, "SessionLocal", lambda: SimpleNamespace(close=lambda: None))
+    api.app.dependency_overrides[api.verify_internal_auth] = lambda: True
+    api.app.dependency_overrides[api.get_user_id_from_headers] = lambda: uuid.uuid4()
+    api.app.dependency_overrides[api.get_db] = lambda: None
+
+    def set_llm(llm):
+        monkeypatch.setattr(api, "llm_client", lambda: llm)
+
+    yield TestClient(api.app), saved, set_llm
+    api.app.dependency_overrides.clear()
+
+
+def events(response):
+    return [
+        (block.split("\n")[0][len("event: "):], json.loads(block.split("\n")[1][len("data: "):]))
+        for block in response.text.strip().split("\n\n")
+    ]
+
+
+def test_ask_answers_and_saves(ask):
+    client, saved, set_llm = ask
+    set_llm(FakeLLM(["Yes."]))
+
+    response = client.post("/api/chats/c/ask", json={"query": "Is it?"})
+
+    assert response.status_code == 200
+    assert response.json()["answer"] == "Yes."
+    assert saved == [("Is it?", "Yes.")]
+
+
+@pytest.mark.parametrize("llm", [FakeLLM(fail=True), FakeLLM([" "])])
+def test_ask_without_an_answer_is_503_and_saves_nothing(ask, llm):
+    client, saved, set_llm = ask
+    set_llm(llm)
+
+    response = client.post("/api/chats/c/ask", json={"query": "Is it?"})
+
+    assert response.status_code == 503
+    assert saved == []
+
+
+def test_stream_ends_with_done(ask):
+    client, saved, set_llm = ask
+    set_llm(FakeLLM(["Part one, ", "part two."]))
+
+    response = client.post("/api/chats/c/ask/stream", json={"query": "Is it?"})
+
+    assert [event for event, _ in events(response)] == ["sources", "token", "token", "done"]
+    assert events(response)[-1][1] == {"answer": "Part one, part two."}
+    assert saved == [("Is it?", "Part one, part two.")]
+
+
+@pytest.mark.parametrize("llm", [FakeLLM(fail=True), FakeLLM(["Half an "], fail=True), FakeLLM([])])
+def test_stream_failure_sends_error_and_saves_nothing(ask, llm):
+    client, saved, set_llm = ask
+    set_llm(llm)
+
+    response = client.post("/api/chats/c/ask/stream", json={"query": "Is it?"})
+
+    event, data = events(response)[-1]
+    assert event == "error"
+    assert data == {"detail": api.LLM_UNAVAILABLE_DETAIL}
+    assert saved == []
@@ -0,0 +1,119 @@
+# backend/tests/test_context.py
+import random
+import uuid
+import pytest
+
+from app import context
+from app.api import source_dicts
+from app.context import count_tokens, pack_context, _join_overlapping, _drop_near_duplicates, _merge_adjacent, _trim_to_tokens
+from app.pdf_parser import chunk_text
+
+WORDS = "retrieval index budget excerpt chunk answer question vector token prompt merge overlap".split()
+
+
+def document(sentences: int, seed: int = 0) -> str:
+    rng = random.Random(seed)
+    return " ".join(
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(4, 14))).capitalize() + "."
+        for _ in range(sentences)
+    )
+
+
+def rows_for(chunks, chunk_set_id=None, seed: int = 0):
+    """Search rows for every chunk of one document, most similar first"""
+    rng = random.Random(seed)
+    chunk_set_id = chunk_set_id or uuid.uuid4()
+    rows = [
+        {"chunk_set_id": chunk_set_id, "chunk_index": i, "chunk_text": text, "similarity": rng.random(), "metadata": {"chunk": i}}
+        for i, text in enumerate(chunks)
+    ]
+    return sorted(rows, key=lambda row: row["similarity"], reverse=True)
+
+
+def test_join_drops_the_chunker_overlap():
+    text = document(40)
+    first, second = chunk_text(text, 300, 50)[:2]
+
+    assert first[-50:] == second[:50]
+    assert _join_overlapping(first, second) == text[:len(first) + len(second) - 50]
+
+
+def test_join_ignores_short_coincidental_matches():
+    left, right = "The index is rebuilt at night.", "night. Nothing else repeats here."
+
+    assert _join_overlapping(left, right) == f"{left} {right}"
+
+
+def test_near_duplicates_respect_the_threshold(monkeypatch):
+    base = "one two three four five six seven eight nine ten"
+    similar = "one two three four five six seven eight nine eleven"  # 7 of 9 shingles shared
+    rows = [{"chunk_text": base}, {"chunk_text": similar}, {"chunk_text": base}]
+    overlap = 7 / 9
+
+    monkeypatch.setattr(context, "CONTEXT_DUPLICATE_THRESHOLD", overlap)
+    assert _drop_near_duplicates(rows) == rows[:1]
+    monkeypatch.setattr(context, "CONTEXT_DUPLICATE_THRESHOLD", overlap + 0.01)
+    assert _drop_near_duplicates(rows) == rows[:2]
+
+
+def test_trim_cuts_at_a_sentence_end():
+    text = "First sentence here. Second one follows! Third is the last?"
+    two = "First sentence here. Second one follows!"
+
+    assert _trim_to_tokens(text, count_tokens(two)) == two
+    assert _trim_to_tokens(text, count_tokens(two) + 1) == two
+    assert _trim_to_tokens(text, count_tokens(text)) == text
+
+
+def test_trim_returns_nothing_when_no_sentence_fits():
+    assert _trim_to_tokens("A single long sentence that will not fit.", 2) == ""
+    assert _trim_to_tokens("no sentence end at all", 100) == ""
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_packing_stays_within_budget_in_best_row_order(seed):
+    rng = random.Random(seed)
+    chunks = chunk_text(document(120, seed), rng.choice([200, 400, 700]), 50)
+    # A random sample from two documents, as the search would return it
+    rows = rows_for(chunks, seed=seed) + rows_for(chunk_text(document(30, seed + 100), 300, 50), seed=seed + 1)
+    rows = sorted(rng.sample(rows, min(len(rows), rng.randint(3, 12))), key=lambda row: row["similarity"], reverse=True)
+    budget = rng.randint(20, 600)
+
+    packed = pack_context(rows, budget)
+
+    assert sum(excerpt["tokens"] for excerpt in packed) <= budget
+    for excerpt in packed:
+        assert excerpt["tokens"] == count_tokens(excerpt["text"])
+    # Excerpts keep the order of their best row; trimmed ones are a prefix of the merged text
+    merged = _merge_adjacent(_drop_near_duplicates(rows))
+    positions = []
+    for excerpt in packed:
+        position = next(i for i, group in enumerate(merged) if any(row is excerpt["rows"][0] for row in group["rows"]))
+        assert merged[position]["text"].startswith(excerpt["text"])
+        positions.append(position)
+    assert positions == sorted(positions)
+    assert len(set(positions)) == len(positions)
+
+
+def test_everything_fits_in_a_large_budget():
+    chunks = chunk_text(document(20), 300, 50)
+    rows = rows_for(chunks)
+
+    packed = pack_context(rows, budget=100_000)
+
+    assert [excerpt["text"] for excerpt in packed] == ["".join(chunks[:1]) + "".join(chunk[50:] for chunk in chunks[1:])]
+    assert packed[0]["rows"] == rows
+
+
+def test_sources_match_the_citation_numbers():
+    one, other = rows_for(chunk_text(document(20), 300, 50)), rows_for(chunk_text(document(20, 1), 300, 50))
+    rows = sorted([one[0], one[1], other[0]], key=lambda row: row["similarity"], reverse=True)
+
+    packed = pack_context(rows, budget=100_000)
+    sources = source_dicts(packed)
+
+    assert len(sources) == len(packed)
+    for source, excerpt in zip(sources, packed):
+        assert source["text"] == excerpt["text"]
+        assert source["score"] == max(row["similarity"] for row in excerpt["rows"])
+        assert [chunk["chunk_index"] for chunk in source["chunks"]] == [row["chunk_index"] for row in excerpt["rows"]]
@@ -0,0 +1,100 @@
+# backend/tests/test_embedding_cache.py
+import numpy as np
+from prometheus_client import REGISTRY
+
+from app.embedding_cache import EmbeddingCache
+from app.embeddings import embed_texts
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, texts):
+        self.calls.append(list(texts))
+        return embed_texts(texts)
+
+
+def make_cache(max_entries=100):
+    embedder = CountingEmbedder()
+    return EmbeddingCache("test-model", embedder, max_entries=max_entries, persist=False), embedder
+
+
+def test_miss_then_hit():
+    cache, embedder = make_cache()
+    first = cache.embed(["alpha", "beta"])
+    second = cache.embed(["beta", "alpha"])
+    assert embedder.calls == [["alpha", "beta"]]
+    np.testing.assert_array_equal(second, first[::-1])
+    assert cache.stats() == {"entries": 2, "memory_hits": 2, "persistent_hits": 0, "misses": 2}
+
+
+def test_hit_equals_fresh_embedding_of_normalized_text():
+    cache, _ = make_cache()
+    cache.embed(["  café  "])
+    hit = cache.embed(["café"])  # NFC normalizes to the same text
+    np.testing.assert_array_equal(hit, embed_texts(["café"]))
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_duplicates_in_one_batch_are_embedded_once():
+    cache, embedder = make_cache()
+    result = cache.embed(["same", "other", "same"])
+    assert embedder.calls == [["same", "other"]]
+    np.testing.assert_array_equal(result[0], result[2])
+    assert cache.stats()["misses"] == 2
+    assert cache.stats()["memory_hits"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache, embedder = make_cache(max_entries=2)
+    cache.embed(["a", "b"])
+    cache.embed(["a"])  # b is now the oldest
+    cache.embed(["c"])
+    cache.embed(["a", "b"])
+    assert embedder.calls == [["a", "b"], ["c"], ["b"]]
+    assert cache.stats()["entries"] == 2
+
+
+def test_clear_forgets_entries():
+    cache, embedder = make_cache()
+    cache.embed(["alpha"])
+    cache.clear()
+    cache.embed(["alpha"])
+    assert embedder.calls == [["alpha"], ["alpha"]]
+
+
+def test_persist_false_skips_the_persistent_tier(monkeypatch):
+    embedder = CountingEmbedder()
+    cache = EmbeddingCache("test-model", embedder, persist=True)
+    def fail(*args):
+        raise AssertionError("persistent tier used")
+    monkeypatch.setattr(cache, "_load", fail)
+    monkeypatch.setattr(cache, "_store", fail)
+
+    cache.embed(["query"], persist=False)
+    cache.embed(["query"], persist=False)
+
+    assert embedder.calls == [["query"]]
+    assert cache.stats()["memory_hits"] == 1
+
+
+def lookups(tier: str, result: str) -> float:
+    return REGISTRY.get_sample_value("pdfchat_embedding_cache_lookups_total", {"tier": tier, "result": result}) or 0.0
+
+
+def test_lookups_are_exported_per_tier(monkeypatch):
+    embedder = CountingEmbedder()
+    cache = EmbeddingCache("test-model", embedder, persist=True)
+    monkeypatch.setattr(cache, "_load", lambda keys: {key: embed_texts(["stored"])[0] for key in keys[:1]})
+    monkeypatch.setattr(cache, "_store", lambda keys, vectors: None)
+    before = {(tier, result): lookups(tier, result) for tier in ("memory", "postgres") for result in ("hit", "miss")}
+
+    cache.embed(["first", "second"])  # One found in Postgres, one embedded
+    cache.embed(["first"])
+
+    assert lookups("memory", "miss") == before["memory", "miss"] + 2
+    assert lookups("memory", "hit") == before["memory", "hit"] + 1
+    assert lookups("postgres", "hit") == before["postgres", "hit"] + 1
+    assert lookups("postgres", "miss") == before["postgres", "miss"] + 1
+    assert cache.stats()["persistent_hits"] == 1
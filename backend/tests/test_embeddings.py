@@ -0,0 +1,24 @@
+# backend/tests/test_embeddings.py
+import numpy as np
+
+from app.embeddings import embed_texts, EMBEDDING_DIM
+from benchmarks.bench_embeddings import make_texts, reference_embed_texts
+
+
+def test_matches_reference_implementation():
+    texts = make_texts(2000, seed=1)
+    expected = np.asarray(reference_embed_texts(texts), dtype=np.float32)
+    actual = embed_texts(texts)
+    mismatched = np.flatnonzero((expected != actual).any(axis=1))
+    assert len(mismatched) == 0, f"{len(mismatched)} embeddings differ, first at index {mismatched[0]}"
+
+
+def test_returns_contiguous_float32_matrix():
+    actual = embed_texts(["Hello World", ""])
+    assert actual.dtype == np.float32
+    assert actual.flags["C_CONTIGUOUS"]
+    assert actual.shape == (2, EMBEDDING_DIM)
+
+
+def test_empty_batch():
+    assert embed_texts([]).shape == (0, EMBEDDING_DIM)
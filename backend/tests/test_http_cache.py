@@ -0,0 +1,84 @@
+# backend/tests/test_http_cache.py
+import json
+import pytest
+
+from app.http_cache import ResponseCache, make_etag, etag_matches
+
+
+def test_etag_is_a_strong_quoted_tag_of_its_parts():
+    etag = make_etag("documents", "user", 3, None)
+
+    assert etag == make_etag("documents", "user", 3, None)
+    assert etag.startswith('"') and etag.endswith('"') and len(etag) == 34
+    assert etag != make_etag("documents", "user", 4, None)
+    assert make_etag("a", "bc") != make_etag("ab", "c")
+
+
+@pytest.mark.parametrize("header, expected", [
+    (None, False),
+    ("", False),
+    ("*", True),
+    (" * ", True),
+    ('"abc"', True),
+    ('W/"abc"', True),  # Weak comparison: a proxy may have weakened the tag
+    ('"other", "abc"', True),
+    ('"other",W/"abc"', True),
+    ('"other"', False),
+    ('"ab"', False),
+    ('abc', False),
+])
+def test_etag_matches(header, expected):
+    assert etag_matches(header, '"abc"') is expected
+
+
+class Builder:
+    def __init__(self, payload):
+        self.payload, self.calls = payload, 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.payload
+
+
+def test_current_tag_gets_304_without_building():
+    cache = ResponseCache()
+    build = Builder({"items": [1]})
+    etag = make_etag("v1")
+
+    response = cache.respond(("key",), etag, f'W/{etag}', build)
+
+    assert response.status_code == 304
+    assert response.body == b""
+    assert response.headers["etag"] == etag
+    assert "last-modified" not in response.headers
+    assert build.calls == 0
+    assert cache.stats()["not_modified"] == 1
+
+
+def test_payload_is_built_once_per_version():
+    cache = ResponseCache()
+    build = Builder(([1, 2], {"X-Next-Before": "cursor"}))
+
+    first = cache.respond(("key",), make_etag("v1"), None, build)
+    second = cache.respond(("key",), make_etag("v1"), '"stale"', build)
+
+    assert build.calls == 1
+    assert json.loads(second.body) == [1, 2]
+    assert second.headers["x-next-before"] == "cursor"
+    assert first.headers["etag"] == second.headers["etag"] == make_etag("v1")
+
+    cache.respond(("key",), make_etag("v2"), make_etag("v1"), build)
+    assert build.calls == 2
+    assert cache.stats() == {"entries": 1, "hits": 1, "misses": 2, "not_modified": 0}
+
+
+def test_invalidate_and_size_limit():
+    cache = ResponseCache(max_entries=2)
+    build = Builder({})
+    for key in ("a", "b", "c"):
+        cache.respond((key,), make_etag(key), None, build)
+    assert cache.stats()["entries"] == 2
+
+    cache.invalidate(("c",))
+    cache.respond(("c",), make_etag("c"), None, build)
+    assert build.calls == 4
@@ -0,0 +1,102 @@
+# backend/tests/test_huggingface_client.py
+import json
+import asyncio
+import httpx
+import pytest
+
+from app.huggingface_client import HuggingFaceInferenceClient
+from app.llm import LLMUnavailableError
+
+
+class FakeInference:
+    """httpx transport answering like the Inference API once released, counting requests per prompt"""
+    def __init__(self, status: int = 200):
+        self.status = status
+        self.requests = []
+        self.release = asyncio.Event()
+
+    async def __call__(self, request: httpx.Request) -> httpx.Response:
+        prompt = json.loads(request.content)["inputs"]
+        self.requests.append(prompt)
+        await self.release.wait()
+        if self.status != 200:
+            return httpx.Response(self.status, json={"error": "overloaded"})
+        return httpx.Response(200, json=[{"generated_text": f"answer to {prompt}"}])
+
+
+def client_for(fake: FakeInference) -> HuggingFaceInferenceClient:
+    return HuggingFaceInferenceClient("test-key", "http://inference.test", "fake/model", transport=httpx.MockTransport(fake))
+
+
+async def gather_released(client, fake, prompts):
+    """Start every call, let them all join in, then let the upstream answer"""
+    calls = [asyncio.ensure_future(client(prompt, max_tokens=50)) for prompt in prompts]
+    await asyncio.sleep(0.05)
+    fake.release.set()
+    try:
+        return await asyncio.gather(*calls, return_exceptions=True)
+    finally:
+        await client.aclose()
+
+
+@pytest.mark.parametrize("callers", [2, 25])
+def test_identical_prompts_share_one_request(callers):
+    async def run():
+        fake = FakeInference()
+        client = client_for(fake)
+        results = await gather_released(client, fake, ["Question: same"] * callers)
+        return fake, client, results
+
+    fake, client, results = asyncio.run(run())
+
+    assert fake.requests == ["Question: same"]
+    assert client.coalesced == callers - 1
+    assert results == [[{"generated_text": "answer to Question: same"}]] * callers
+    assert client._in_flight == {}
+
+
+def test_different_prompts_are_not_shared():
+    async def run():
+        fake = FakeInference()
+        return fake, await gather_released(client_for(fake), fake, ["Question: a", "Question: b", "Question: a"])
+
+    fake, results = asyncio.run(run())
+
+    assert sorted(fake.requests) == ["Question: a", "Question: b"]
+    assert results[0] == results[2] != results[1]
+
+
+@pytest.mark.parametrize("status", [503, 400])
+def test_a_failure_reaches_every_waiter(status):
+    async def run():
+        fake = FakeInference(status)
+        client = client_for(fake)
+        results = await gather_released(client, fake, ["Question: same"] * 10)
+        return fake, client, results
+
+    fake, client, results = asyncio.run(run())
+
+    assert len(fake.requests) == 1
+    assert all(isinstance(result, LLMUnavailableError) for result in results)
+    assert client.api_working is False
+    assert client._in_flight == {}  # The next call tries again
+
+
+def test_a_cancelled_waiter_leaves_the_others_their_answer():
+    async def run():
+        fake = FakeInference()
+        client = client_for(fake)
+        first = asyncio.ensure_future(client("Question: same"))
+        second = asyncio.ensure_future(client("Question: same"))
+        await asyncio.sleep(0.05)
+        first.cancel()
+        fake.release.set()
+        try:
+            return fake, await second
+        finally:
+            await client.aclose()
+
+    fake, result = asyncio.run(run())
+
+    assert fake.requests == ["Question: same"]
+    assert result == [{"generated_text": "answer to Question: same"}]
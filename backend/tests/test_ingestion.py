@@ -0,0 +1,95 @@
+# backend/tests/test_ingestion.py
+import os
+import tempfile
+from datetime import datetime, timedelta
+import pytest
+
+from app import ingestion
+from app.database import IngestionJob, Document
+from benchmarks.fixtures import scratch_data
+from benchmarks.synthetic_pdf import write_pdf
+
+
+@pytest.fixture
+def scratch(db):
+    with scratch_data(db) as scratch:
+        yield scratch
+        db.rollback()
+        db.query(IngestionJob).filter(IngestionJob.user_id.in_(scratch.user_ids)).delete(synchronize_session=False)
+        db.commit()
+
+
+def upload(scratch, pages: int = 3) -> IngestionJob:
+    """A queued job for a synthetic PDF, as POST /api/upload leaves it"""
+    fd, path = tempfile.mkstemp(suffix=".pdf")
+    os.close(fd)
+    write_pdf(path, pages)
+    job_id = ingestion.create_job(scratch.db, scratch.user(), "interrupted.pdf", path, os.path.getsize(path))
+    return scratch.db.get(IngestionJob, job_id)
+
+
+def stall(db, job: IngestionJob, seconds: float = ingestion.INGEST_STALE_SECONDS + 60):
+    """Make the job look as if its last progress write was that long ago"""
+    job.updated_at = datetime.utcnow() - timedelta(seconds=seconds)
+    db.commit()
+
+
+def test_job_interrupted_mid_run_is_requeued_and_completes(db, scratch):
+    job = upload(scratch)
+    # A worker claims the job and reports some progress, then the server dies
+    assert ingestion._claim_job(db, str(job.id)) is not None
+    progress = ingestion._JobProgress(str(job.id))
+    progress.update(force=True, pages_total=3, pages_extracted=1)
+    progress.close()
+    db.expire_all()
+    assert job.status == "running"
+
+    # Still within INGEST_STALE_SECONDS: it may belong to a live worker
+    assert ingestion.requeue_stale_jobs(db) == []
+
+    stall(db, job)
+    assert ingestion.requeue_stale_jobs(db) == [str(job.id)]
+    db.expire_all()
+    assert (job.status, job.stage) == ("queued", "queued")
+
+    assert ingestion.run_job(str(job.id)) is not None
+    db.expire_all()
+    assert job.status == "completed"
+    assert job.attempts == 2
+    document = db.get(Document, job.document_id)
+    scratch.document_ids.append(str(document.id))
+    scratch.chunk_set_ids.append(str(document.chunk_set_id))
+    assert not os.path.exists(job.file_path)
+
+
+def test_job_out_of_attempts_fails(db, scratch):
+    job = upload(scratch)
+    ingestion._claim_job(db, str(job.id))
+    job.attempts = ingestion.INGEST_MAX_ATTEMPTS
+    db.commit()
+    stall(db, job)
+
+    assert ingestion.requeue_stale_jobs(db) == []
+    db.expire_all()
+    assert job.status == "failed"
+    assert job.error
+    assert not os.path.exists(job.file_path)
+
+
+def test_periodic_sweep_resubmits_stalled_jobs(db, scratch, monkeypatch):
+    job = upload(scratch)
+    ingestion._claim_job(db, str(job.id))
+    stall(db, job)
+    submitted = []
+    monkeypatch.setattr(ingestion, "_executor", object())
+    monkeypatch.setattr(ingestion, "submit_job", submitted.append)
+
+    assert ingestion.resubmit_stale_jobs() == 1
+    assert submitted == [str(job.id)]
+    assert ingestion.resubmit_stale_jobs() == 0
+    os.remove(job.file_path)
+
+
+def test_sweep_waits_for_workers(monkeypatch):
+    monkeypatch.setattr(ingestion, "_executor", None)
+    assert ingestion.resubmit_stale_jobs() == 0
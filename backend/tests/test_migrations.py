@@ -0,0 +1,70 @@
+# backend/tests/test_migrations.py
+import uuid
+import pytest
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.engine import make_url
+
+from app import migrations, vector_index
+from app.database import Base, DATABASE_URL
+
+
+@pytest.fixture
+def fresh_engine(database, monkeypatch):
+    """An empty database next to the test database, which the migrations are pointed at"""
+    name = f"migrations_{uuid.uuid4().hex[:12]}"
+    url = make_url(DATABASE_URL)
+    with database.execution_options(isolation_level="AUTOCOMMIT").connect() as conn:
+        conn.execute(text(f'CREATE DATABASE "{name}"'))
+    engine = create_engine(url.set(database=name))
+    monkeypatch.setattr(migrations, "engine", engine)
+    monkeypatch.setattr(vector_index, "VECTOR_INDEX_AUTO_CREATE", False)
+    yield engine
+    engine.dispose()
+    with database.execution_options(isolation_level="AUTOCOMMIT").connect() as conn:
+        conn.execute(text(f'DROP DATABASE "{name}"'))
+
+
+def apply(engine, up_to: int):
+    with engine.connect() as conn:
+        for migration in migrations.MIGRATIONS[:up_to]:
+            migration.apply(conn)
+        conn.commit()
+
+
+def test_fresh_database_matches_the_models(fresh_engine):
+    assert migrations.upgrade() == [migration.version for migration in migrations.MIGRATIONS]
+
+    inspector = inspect(fresh_engine)
+    for table in Base.metadata.sorted_tables:
+        columns = {column["name"]: column for column in inspector.get_columns(table.name)}
+        assert set(columns) == set(table.columns.keys()), table.name
+        for column in table.columns:
+            assert columns[column.name]["nullable"] == column.nullable, f"{table.name}.{column.name}"
+        assert set(inspector.get_pk_constraint(table.name)["constrained_columns"]) == {c.name for c in table.primary_key}
+        indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+        assert {index.name for index in table.indexes} <= indexes, table.name
+
+
+def test_partitioning_keeps_the_chunks_of_the_baseline(fresh_engine):
+    apply(fresh_engine, 1)
+    chunk_set_id = uuid.uuid4()
+    with fresh_engine.connect() as conn:
+        assert conn.execute(text("SELECT relkind FROM pg_class WHERE relname = 'document_chunks'")).scalar() == "r"
+        conn.execute(text("INSERT INTO chunk_sets (id, ref_count, revision) VALUES (:id, 1, 0)"), {"id": chunk_set_id})
+        conn.execute(
+            text("INSERT INTO document_chunks (id, chunk_set_id, chunk_text, chunk_index) VALUES (:id, :set, 'kept', 0)"),
+            {"id": uuid.uuid4(), "set": chunk_set_id}
+        )
+        conn.commit()
+    # Recorded as upgrade() would, so it continues with migration 2
+    with fresh_engine.connect() as conn:
+        conn.execute(text("CREATE TABLE schema_migrations (version INTEGER PRIMARY KEY, description TEXT NOT NULL, applied_at TIMESTAMP NOT NULL DEFAULT now())"))
+        conn.execute(text("INSERT INTO schema_migrations (version, description) VALUES (1, :description)"), {"description": migrations.MIGRATIONS[0].description})
+        conn.commit()
+
+    assert migrations.upgrade() == [migration.version for migration in migrations.MIGRATIONS[1:]]
+
+    with fresh_engine.connect() as conn:
+        assert conn.execute(text("SELECT relkind FROM pg_class WHERE relname = 'document_chunks'")).scalar() == "p"
+        rows = conn.execute(text("SELECT chunk_set_id, chunk_text, chunk_tsv IS NOT NULL FROM document_chunks")).all()
+    assert rows == [(chunk_set_id, "kept", True)]
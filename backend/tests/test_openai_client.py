@@ -0,0 +1,194 @@
+# backend/tests/test_openai_client.py
+import time
+import socket
+import asyncio
+import pytest
+
+from app import openai_client
+from app.llm import LLMUnavailableError
+from app.openai_client import AsyncOpenAIClient
+from benchmarks.fake_openai import FakeOpenAI, serve_in_thread
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    """A fake OpenAI server of its own, answering at once unless a test says otherwise"""
+    monkeypatch.setattr(openai_client, "LLM_RETRY_BASE_DELAY", 0.01)
+    fake = FakeOpenAI(delay=0, token_delay=0)
+    port = free_port()
+    server = serve_in_thread(fake, port)
+    fake.base_url = f"http://127.0.0.1:{port}/v1"
+    yield fake
+    server.should_exit = True
+
+
+def client_for(fake, **kwargs) -> AsyncOpenAIClient:
+    return AsyncOpenAIClient("test-key", "fake-model", base_url=fake.base_url, **kwargs)
+
+
+async def call(client: AsyncOpenAIClient, prompt: str = "Question: hello"):
+    try:
+        return (await client(prompt))[0]["generated_text"]
+    finally:
+        await client.aclose()
+
+
+def test_retries_429_and_5xx_until_success(fake):
+    fake.fail_next = [429, 503, 500]
+    client = client_for(fake, max_retries=3)
+
+    text = asyncio.run(call(client))
+
+    assert text.startswith("word0 ")
+    assert fake.requests == 4
+    assert client.retries == 3
+    assert client.api_working is True
+
+
+def test_gives_up_after_max_retries(fake):
+    fake.fail_next = [503] * 5
+    client = client_for(fake, max_retries=2)
+
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(call(client))
+
+    assert fake.requests == 3
+    assert client.api_working is False
+
+
+def test_client_errors_are_not_retried(fake):
+    fake.fail_next = [400]
+    client = client_for(fake, max_retries=3)
+
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(call(client))
+    assert fake.requests == 1
+    assert client.retries == 0
+
+
+def test_honours_retry_after(fake):
+    fake.fail_next = [429]
+    fake.retry_after = 0.5
+    client = client_for(fake, max_retries=1)
+
+    start = time.perf_counter()
+    asyncio.run(call(client))
+
+    assert time.perf_counter() - start >= 0.5
+    assert fake.requests == 2
+
+
+def test_retry_after_is_capped(fake, monkeypatch):
+    monkeypatch.setattr(openai_client, "LLM_RETRY_MAX_DELAY", 0.2)
+    fake.fail_next = [429]
+    fake.retry_after = 60
+    client = client_for(fake, max_retries=1)
+
+    start = time.perf_counter()
+    asyncio.run(call(client))
+
+    assert time.perf_counter() - start < 5
+
+
+def test_timeout_raises_without_retrying(fake):
+    fake.delay = 3.0
+    client = client_for(fake, timeout=0.3, max_retries=3)
+
+    start = time.perf_counter()
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(call(client))
+
+    assert time.perf_counter() - start < 2
+    assert fake.requests == 1
+    assert client.retries == 0
+
+
+def test_stream_retries_opening(fake):
+    fake.fail_next = [429]
+    client = client_for(fake, max_retries=1)
+
+    async def collect():
+        try:
+            return [delta async for delta in client.stream("Question: hello")]
+        finally:
+            await client.aclose()
+
+    assert "".join(asyncio.run(collect())) == "".join(f"word{i} " for i in range(fake.tokens))
+    assert client.retries == 1
+
+
+def test_stream_raises_once_retries_run_out(fake):
+    fake.fail_next = [503, 503]
+    client = client_for(fake, max_retries=1)
+
+    async def collect():
+        try:
+            return [delta async for delta in client.stream("Question: hello")]
+        finally:
+            await client.aclose()
+
+    with pytest.raises(LLMUnavailableError):
+        asyncio.run(collect())
+    assert fake.requests == 2
+
+
+async def wait_for(condition, timeout: float = 5.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while not condition():
+        if time.monotonic() > deadline:
+            return False
+        await asyncio.sleep(0.02)
+    return True
+
+
+def test_closing_a_stream_mid_way_drops_the_upstream_response(fake):
+    fake.tokens, fake.token_delay = 200, 0.02
+    client = client_for(fake, max_concurrency=1)
+
+    async def read_two_deltas():
+        try:
+            generation = client.stream("Question: hello")
+            deltas = [await generation.__anext__(), await generation.__anext__()]
+            await generation.aclose()
+            # The server stops generating once the connection is gone, and the slot is free again
+            assert await wait_for(lambda: fake.in_flight == 0)
+            assert not client.semaphore.locked()
+            return deltas
+        finally:
+            await client.aclose()
+
+    start = time.perf_counter()
+    assert asyncio.run(read_two_deltas()) == ["word0 ", "word1 "]
+    assert time.perf_counter() - start < 200 * 0.02
+
+
+def test_cancelling_the_reader_mid_stream_releases_its_slot(fake):
+    fake.tokens, fake.token_delay = 200, 0.02
+    client = client_for(fake, max_concurrency=1)
+
+    async def cancel_reader():
+        received = []
+
+        async def reader():
+            async for delta in client.stream("Question: hello"):
+                received.append(delta)
+
+        try:
+            task = asyncio.ensure_future(reader())
+            assert await wait_for(lambda: len(received) >= 2)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert await wait_for(lambda: fake.in_flight == 0)
+            # The next call gets the only slot rather than waiting on the cancelled one
+            return await asyncio.wait_for(client("Question: again"), timeout=5)
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(cancel_reader())[0]["generated_text"].startswith("word0 ")
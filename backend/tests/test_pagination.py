@@ -0,0 +1,83 @@
+# backend/tests/test_pagination.py
+import uuid
+import base64
+from datetime import datetime, timedelta
+import pytest
+from fastapi import HTTPException
+
+from app.database import ChatSession, ChatMessage
+from app.pagination import encode_cursor, decode_cursor, keyset_page
+from benchmarks.fixtures import scratch_data
+
+
+def test_cursor_round_trip():
+    created_at, row_id = datetime(2026, 10, 17, 9, 30, 15, 123456), uuid.uuid4()
+
+    cursor = encode_cursor(created_at, row_id)
+
+    assert "=" not in cursor and "|" not in cursor
+    assert decode_cursor(cursor) == (created_at, row_id)
+    assert decode_cursor(encode_cursor(created_at.replace(microsecond=0), row_id)) == (created_at.replace(microsecond=0), row_id)
+
+
+def b64(raw: str) -> str:
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+@pytest.mark.parametrize("cursor", [
+    "",
+    "not base64!",
+    b64("2026-10-17T09:30:15"),  # No id
+    b64(f"yesterday|{uuid.uuid4()}"),
+    b64("2026-10-17T09:30:15|not-a-uuid"),
+    b64(f"2026-10-17T09:30:15|{uuid.uuid4()}|extra"),
+    base64.urlsafe_b64encode(b"\xff\xfe|").decode(),
+])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(HTTPException) as error:
+        decode_cursor(cursor)
+    assert error.value.status_code == 400
+
+
+@pytest.fixture(scope="module")
+def chat(db):
+    """A chat of 23 messages, most sharing one of three timestamps"""
+    with scratch_data(db) as scratch:
+        user_id = scratch.user()
+        document_id = scratch.document(user_id, ["chunk"])
+        chat = ChatSession(user_id=user_id, document_id=document_id, title="Pages")
+        db.add(chat)
+        db.flush()
+        start = datetime(2026, 10, 17, 12, 0, 0)
+        for i in range(23):
+            db.add(ChatMessage(session_id=chat.id, role="user", content=str(i), timestamp=start + timedelta(seconds=min(i // 8, 2))))
+        db.commit()
+        yield chat.id
+
+
+def messages(db, chat_id):
+    return db.query(ChatMessage).filter(ChatMessage.session_id == chat_id)
+
+
+def test_without_a_limit_every_row_is_returned_in_order(db, chat):
+    rows, next_before = keyset_page(messages(db, chat), ChatMessage.timestamp, ChatMessage.id, None, None)
+
+    assert next_before is None
+    assert [(row.timestamp, row.id) for row in rows] == sorted((row.timestamp, row.id) for row in rows)
+    assert len(rows) == 23
+
+
+@pytest.mark.parametrize("limit", [1, 3, 8, 22, 23, 50])
+def test_pages_split_equal_timestamps_without_gaps_or_repeats(db, chat, limit):
+    expected, _ = keyset_page(messages(db, chat), ChatMessage.timestamp, ChatMessage.id, None, None)
+
+    pages, before = [], None
+    while True:
+        rows, before = keyset_page(messages(db, chat), ChatMessage.timestamp, ChatMessage.id, limit, before)
+        pages.append(rows)
+        if before is None:
+            break
+
+    assert all(len(page) == limit for page in pages[:-1])
+    # Pages walk backwards from the newest; each is in ascending order
+    assert [row.id for page in reversed(pages) for row in page] == [row.id for row in expected]
@@ -0,0 +1,74 @@
+# backend/tests/test_pdf_parser.py
+import random
+import pytest
+
+from app.pdf_parser import chunk_text, iter_chunks
+
+
+def reference_chunks(text: str, chunk_size=1000, overlap=50):
+    """chunk_text as it was before ingestion streamed pages, kept to check iter_chunks against"""
+    chunks = []
+    start = 0
+    text_length = len(text)
+
+    while start < text_length:
+        end = min(start + chunk_size, text_length)
+        chunk = text[start:end]
+
+        # Try to break at word boundary
+        if end < text_length:
+            last_space = chunk.rfind(' ')
+            if last_space > chunk_size * 0.8:  # If we found a space in the last 20%
+                chunk = chunk[:last_space]
+                end = start + last_space
+
+        chunks.append(chunk.strip())
+        start = end - overlap if end < text_length else text_length
+
+    return [chunk for chunk in chunks if chunk.strip()]  # Remove empty chunks
+
+
+def random_pages(rng: random.Random):
+    """Pages of words, long unbroken runs, whitespace and empty pages"""
+    pages = []
+    for _ in range(rng.randint(0, 8)):
+        kind = rng.random()
+        if kind < 0.1:
+            pages.append("")
+        elif kind < 0.2:
+            pages.append(" " * rng.randint(1, 30) + "\n" * rng.randint(0, 3))
+        elif kind < 0.3:
+            pages.append("x" * rng.randint(1, 400))  # No space to break at
+        else:
+            words = [rng.choice(["a", "to", "clause", "agreement", "liability", "\n", "  "]) for _ in range(rng.randint(1, 300))]
+            pages.append(" ".join(words))
+    return pages
+
+
+@pytest.mark.parametrize("seed", range(300))
+def test_streaming_matches_the_old_chunker(seed):
+    rng = random.Random(seed)
+    chunk_size = rng.choice([5, 20, 64, 100, 250, 1000])
+    overlap = rng.choice([0, 1, chunk_size // 10, chunk_size // 2, int(chunk_size * 0.79)])
+    pages = random_pages(rng)
+
+    expected = reference_chunks("\n\n".join(page for page in pages if page), chunk_size, overlap)
+
+    assert list(iter_chunks(pages, chunk_size, overlap)) == expected
+    assert chunk_text("\n\n".join(page for page in pages if page), chunk_size, overlap) == expected
+
+
+@pytest.mark.parametrize("text", ["", "   ", "short", " short with spaces ", "x" * 99, "y" * 100, "word " * 20])
+@pytest.mark.parametrize("overlap", [0, 10, 50])
+def test_text_up_to_one_chunk(text, overlap):
+    assert chunk_text(text, 100, overlap) == reference_chunks(text, 100, overlap)
+    assert list(iter_chunks([text], 100, overlap)) == reference_chunks(text, 100, overlap)
+
+
+@pytest.mark.parametrize("chunk_size, overlap", [(100, 0), (100, 1), (100, 79), (100, 80)])
+def test_overlap_edges(chunk_size, overlap):
+    # A word-boundary cut keeps more than 80% of the chunk, so 80% is the largest overlap
+    # that still moves forward; both chunkers loop on anything larger
+    text = " ".join(f"w{i:03d}" for i in range(200))
+
+    assert list(iter_chunks([text[:300], text[300:]], chunk_size, overlap)) == reference_chunks(text[:300] + "\n\n" + text[300:], chunk_size, overlap)
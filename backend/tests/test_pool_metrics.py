@@ -0,0 +1,35 @@
+# backend/tests/test_pool_metrics.py
+import sqlite3
+import pytest
+from prometheus_client import REGISTRY
+from sqlalchemy import exc as sqlalchemy_exc
+
+from app.database import InstrumentedQueuePool
+
+
+def sample(name: str, labels: dict = None) -> float:
+    return REGISTRY.get_sample_value(name, labels or {}) or 0.0
+
+
+def test_checkouts_and_timeouts_are_exported():
+    pool = InstrumentedQueuePool(lambda: sqlite3.connect(":memory:"), pool_size=1, max_overflow=0, timeout=0.05)
+    waits, timeouts = sample("pdfchat_db_pool_wait_seconds_count"), sample("pdfchat_db_pool_timeouts_total")
+
+    connection = pool.connect()
+    with pytest.raises(sqlalchemy_exc.TimeoutError):
+        pool.connect()
+    connection.close()
+
+    assert sample("pdfchat_db_pool_wait_seconds_count") == waits + 2
+    assert sample("pdfchat_db_pool_timeouts_total") == timeouts + 1
+    # The timed-out checkout waited out the pool timeout
+    assert sample("pdfchat_db_pool_wait_seconds_sum") >= 0.05
+
+
+def test_occupancy_is_read_from_the_engine_pool(database):
+    checked_out = sample("pdfchat_db_pool_connections", {"state": "checked_out"})
+    with database.connect():
+        assert sample("pdfchat_db_pool_connections", {"state": "checked_out"}) == checked_out + 1
+        assert sample("pdfchat_db_pool_saturation") > 0
+    assert sample("pdfchat_db_pool_connections", {"state": "checked_out"}) == checked_out
+    assert sample("pdfchat_db_pool_connections", {"state": "idle"}) >= 1
@@ -0,0 +1,97 @@
+# backend/tests/test_rechunk.py
+import os
+import random
+import pytest
+from sqlalchemy import text
+
+from app.pdf_parser import iter_chunks, iter_pdf_pages, reassemble_text
+from app.rechunk import rechunk_chunk_set, file_hash
+from benchmarks.fixtures import scratch_data
+from benchmarks.synthetic_pdf import write_pdf
+
+WORDS = "party agreement term notice delivery goods service fee liability period".split()
+
+
+def pages(seed: int, count: int = 4):
+    """Page texts with line breaks, as pdfplumber extracts them"""
+    rng = random.Random(seed)
+    return [
+        "\n".join(" ".join(rng.choice(WORDS) for _ in range(rng.randint(3, 12))).capitalize() + "." for _ in range(rng.randint(5, 40)))
+        for _ in range(count)
+    ]
+
+
+@pytest.mark.parametrize("seed", range(30))
+def test_reassembled_text_rechunks_like_the_source(seed):
+    rng = random.Random(seed)
+    source = pages(seed)
+    chunk_size = rng.choice([120, 300, 1000])
+    overlap = rng.choice([0, 10, 50, chunk_size // 3])
+    chunks = list(iter_chunks(source, chunk_size, overlap))
+
+    text = reassemble_text(chunks, chunk_size, overlap)
+
+    assert text == "\n\n".join(source)
+    new_size, new_overlap = rng.choice([(800, 80), (200, 20), (chunk_size, overlap + 5)])
+    assert list(iter_chunks([text], new_size, new_overlap)) == list(iter_chunks(source, new_size, new_overlap))
+
+
+@pytest.mark.parametrize("unit", ["ab ", "the same line\n", "x" * 7 + " "])
+def test_repeated_text_is_never_rebuilt_wrong(unit):
+    # Repeats inside the overlap window can be mistaken for the overlap itself
+    for repeats in (5, 40, 300):
+        source = "Start. " + unit * repeats + "End."
+        for chunk_size, overlap in ((60, 20), (100, 50), (1000, 200)):
+            chunks = list(iter_chunks([source], chunk_size, overlap))
+            text = reassemble_text(chunks, chunk_size, overlap)
+            assert text is None or list(iter_chunks([text], 80, 30)) == list(iter_chunks([source], 80, 30))
+
+
+def test_whitespace_only_overlap_is_refused():
+    source = "word " * 23 + " " * 85 + "tail " * 30  # The first cut and its overlap fall in the gap
+    chunks = list(iter_chunks([source], 150, 30))
+
+    assert reassemble_text(chunks, 150, 30) is None
+
+
+def stored_chunks(db, chunk_set_id: str):
+    return db.execute(
+        text("SELECT chunk_text FROM document_chunks WHERE chunk_set_id = :id ORDER BY chunk_index"),
+        {"id": chunk_set_id}
+    ).scalars().all()
+
+
+def test_recorded_set_is_rechunked_from_its_chunks(db):
+    source = pages(1, count=6)
+    with scratch_data(db) as scratch:
+        chunk_set_id = scratch.chunk_set(list(iter_chunks(source, 300, 50)), params={"chunk_size": 300, "overlap": 50})
+        db.commit()
+
+        counts = rechunk_chunk_set(db, chunk_set_id, 250, 40)
+
+        assert stored_chunks(db, chunk_set_id) == list(iter_chunks(source, 250, 40))
+        assert counts["embedded"] + counts["kept"] == len(stored_chunks(db, chunk_set_id))
+
+
+def test_set_without_recorded_params_needs_its_pdf(db, tmp_path):
+    path = write_pdf(str(tmp_path / "source.pdf"), 3)
+    chunks = list(iter_chunks(iter_pdf_pages(path), 300, 50))
+    with scratch_data(db) as scratch:
+        chunk_set_id = scratch.chunk_set(chunks)
+        db.execute(
+            text("UPDATE chunk_sets SET chunker_version = NULL, chunker_params = NULL, content_hash = :hash WHERE id = :id"),
+            {"id": chunk_set_id, "hash": file_hash(path)}
+        )
+        db.commit()
+
+        with pytest.raises(ValueError, match="needs its PDF"):
+            rechunk_chunk_set(db, chunk_set_id, 250, 40)
+        assert stored_chunks(db, chunk_set_id) == chunks
+
+        other = write_pdf(str(tmp_path / "other.pdf"), 3, seed=1)
+        with pytest.raises(ValueError, match="is not the PDF"):
+            rechunk_chunk_set(db, chunk_set_id, 250, 40, pdf_path=other)
+
+        rechunk_chunk_set(db, chunk_set_id, 250, 40, pdf_path=path)
+        assert stored_chunks(db, chunk_set_id) == list(iter_chunks(iter_pdf_pages(path), 250, 40))
+        assert os.path.exists(path)
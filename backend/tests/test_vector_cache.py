@@ -0,0 +1,170 @@
+# backend/tests/test_vector_cache.py
+import json
+import uuid
+from types import SimpleNamespace
+
+import numpy as np
+from prometheus_client import REGISTRY
+
+from app.embeddings import EMBEDDING_DIM
+from app.vector_cache import ChunkMatrixCache, CHUNK_SET_SQL, CHUNK_SET_ROWS_SQL
+
+
+class FakeResult:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def first(self):
+        return self.rows[0] if self.rows else None
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    """Answers the two queries ChunkMatrixCache makes from in-memory chunk sets"""
+    def __init__(self):
+        self.documents = {}  # document id -> chunk set id
+        self.chunk_sets = {}  # chunk set id -> (revision, rows)
+        self.row_loads = 0
+
+    def add_chunk_set(self, document_id, chunk_set_id, embeddings, revision=0):
+        self.documents[document_id] = chunk_set_id
+        rows = [
+            SimpleNamespace(id=uuid.uuid4(), chunk_index=i, chunk_text=f"chunk {i}", chunk_metadata=json.dumps({"index": i}), embedding=vector)
+            for i, vector in enumerate(embeddings)
+        ]
+        self.chunk_sets[chunk_set_id] = (revision, rows)
+
+    def execute(self, statement, params):
+        if statement is CHUNK_SET_SQL:
+            chunk_set_id = self.documents.get(params["document_id"])
+            if chunk_set_id is None:
+                return FakeResult([])
+            revision, rows = self.chunk_sets[chunk_set_id]
+            return FakeResult([SimpleNamespace(chunk_set_id=chunk_set_id, chunk_count=len(rows), revision=revision)])
+        if statement is CHUNK_SET_ROWS_SQL:
+            self.row_loads += 1
+            return FakeResult(self.chunk_sets[params["chunk_set_id"]][1])
+        raise AssertionError(f"unexpected statement {statement}")
+
+
+def random_embeddings(count, seed=0):
+    return np.random.default_rng(seed).random((count, EMBEDDING_DIM), dtype=np.float32)
+
+
+def test_search_is_exact_top_k():
+    db = FakeSession()
+    embeddings = random_embeddings(50)
+    db.add_chunk_set("doc", "set", embeddings)
+    cache = ChunkMatrixCache(max_bytes=10 ** 8, max_chunks=1000)
+    query = random_embeddings(1, seed=1)[0]
+
+    chunks = cache.search(db, "doc", query, 5)
+
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    expected = np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:5]
+    assert [chunk["chunk_index"] for chunk in chunks] == list(expected)
+    assert chunks[0]["metadata"] == {"index": int(expected[0])}
+
+
+def test_second_search_is_a_hit():
+    db = FakeSession()
+    db.add_chunk_set("doc", "set", random_embeddings(10))
+    cache = ChunkMatrixCache(max_bytes=10 ** 8, max_chunks=1000)
+    query = random_embeddings(1, seed=1)[0]
+
+    cache.search(db, "doc", query, 3)
+    cache.search(db, "doc", query, 3)
+
+    assert db.row_loads == 1
+    assert cache.stats()["loads"] == 1
+    assert cache.stats()["hits"] == 1
+
+
+def test_revision_bump_reloads_chunk_set():
+    db = FakeSession()
+    db.add_chunk_set("doc", "set", random_embeddings(10))
+    cache = ChunkMatrixCache(max_bytes=10 ** 8, max_chunks=1000)
+    query = random_embeddings(1, seed=1)[0]
+    cache.search(db, "doc", query, 3)
+
+    db.add_chunk_set("doc", "set", random_embeddings(4, seed=2), revision=1)  # Re-chunked
+    chunks = cache.search(db, "doc", query, 10)
+
+    assert db.row_loads == 2
+    assert len(chunks) == 4
+    assert cache.stats()["entries"] == 1
+
+
+def test_invalidate_forgets_chunk_set():
+    db = FakeSession()
+    db.add_chunk_set("doc", "set", random_embeddings(10))
+    cache = ChunkMatrixCache(max_bytes=10 ** 8, max_chunks=1000)
+    query = random_embeddings(1, seed=1)[0]
+    cache.search(db, "doc", query, 3)
+
+    cache.invalidate("set")
+    assert cache.stats()["entries"] == 0
+    assert cache.stats()["bytes"] == 0
+    cache.search(db, "doc", query, 3)
+    assert db.row_loads == 2
+
+
+def test_deleted_document_has_no_chunks():
+    cache = ChunkMatrixCache(max_bytes=10 ** 8, max_chunks=1000)
+    assert cache.search(FakeSession(), "missing", random_embeddings(1)[0], 3) == []
+
+
+def test_large_chunk_sets_fall_back_to_postgres():
+    db = FakeSession()
+    db.add_chunk_set("doc", "set", random_embeddings(10))
+    cache = ChunkMatrixCache(max_bytes=10 ** 8, max_chunks=5)
+    assert cache.search(db, "doc", random_embeddings(1)[0], 3) is None
+    assert db.row_loads == 0
+    assert cache.stats()["fallbacks"] == 1
+
+
+def test_byte_budget_evicts_least_recently_used():
+    db = FakeSession()
+    db.add_chunk_set("doc-a", "set-a", random_embeddings(10))
+    db.add_chunk_set("doc-b", "set-b", random_embeddings(10, seed=1))
+    cache = ChunkMatrixCache(max_bytes=10 ** 8, max_chunks=1000)
+    query = random_embeddings(1, seed=2)[0]
+    cache.search(db, "doc-a", query, 3)
+    cache.max_bytes = int(cache.stats()["bytes"] * 1.5)  # Room for one chunk set only
+
+    cache.search(db, "doc-b", query, 3)
+
+    assert cache.stats()["entries"] == 1
+    cache.search(db, "doc-b", query, 3)
+    assert cache.stats()["hits"] == 1
+
+
+def test_searches_are_exported():
+    def searches(result):
+        return REGISTRY.get_sample_value("pdfchat_vector_cache_searches_total", {"result": result}) or 0.0
+
+    db = FakeSession()
+    db.add_chunk_set("doc", "set", random_embeddings(10))
+    db.add_chunk_set("big", "big-set", random_embeddings(10, seed=1))
+    cache = ChunkMatrixCache(max_bytes=10 ** 8, max_chunks=1000)
+    query = random_embeddings(1, seed=2)[0]
+    before = {result: searches(result) for result in ("hit", "load", "fallback")}
+
+    cache.search(db, "doc", query, 3)
+    cache.search(db, "doc", query, 3)
+    cache.max_chunks = 5
+    cache.search(db, "big", query, 3)
+
+    assert {result: searches(result) - before[result] for result in before} == {"hit": 1, "load": 1, "fallback": 1}
+
+
+def test_a_known_chunk_set_skips_the_lookup():
+    db = FakeSession()
+    db.add_chunk_set("doc", "set", random_embeddings(10))
+    cache = ChunkMatrixCache(max_bytes=10 ** 8, max_chunks=1000)
+    row = db.execute(CHUNK_SET_SQL, {"document_id": "doc"}).first()
+    db.documents.clear()  # A second lookup would find nothing
+
+    assert len(cache.search(db, "doc", random_embeddings(1, seed=1)[0], 3, chunk_set=row)) == 3
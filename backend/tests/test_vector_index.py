@@ -0,0 +1,71 @@
+# backend/tests/test_vector_index.py
+import pytest
+from sqlalchemy import text
+from sqlalchemy.exc import OperationalError
+
+from app import vector_index
+
+
+def partition_indexes(database):
+    with database.connect() as conn:
+        return conn.execute(text("""
+            SELECT c.relname, i.indisvalid, c.reloptions FROM pg_inherits
+            JOIN pg_class c ON c.oid = inhrelid
+            JOIN pg_index i ON i.indexrelid = inhrelid
+            WHERE inhparent = CAST(:name AS regclass)
+            ORDER BY 1
+        """), {"name": vector_index.VECTOR_INDEX_NAME}).all()
+
+
+@pytest.fixture
+def restore_index(database):
+    yield
+    vector_index.rebuild_vector_index(database)
+
+
+def test_rebuild_swaps_in_the_new_index_on_every_partition(database, restore_index):
+    vector_index.rebuild_vector_index(database, "hnsw", m=8, ef_construction=32)
+
+    status = vector_index.vector_index_status(database)
+    assert status["valid"] and status["options"] == ["m=8", "ef_construction=32"]
+    indexes = partition_indexes(database)
+    assert len(indexes) == status["partitions"] > 1
+    assert all(valid and options == ["m=8", "ef_construction=32"] for _, valid, options in indexes)
+    assert not any(name.endswith("_new") for name, _, _ in indexes)
+
+
+def test_swap_backs_off_while_a_query_holds_the_table(database, restore_index, monkeypatch):
+    monkeypatch.setattr(vector_index, "VECTOR_INDEX_SWAP_LOCK_TIMEOUT_MS", 50)
+    monkeypatch.setattr(vector_index, "VECTOR_INDEX_SWAP_ATTEMPTS", 3)
+    reader = database.connect()
+    reader.begin()
+    reader.execute(text("SELECT count(*) FROM document_chunks"))  # Holds ACCESS SHARE until rollback
+    waits = []
+
+    def finish_read(seconds):
+        waits.append(seconds)
+        reader.rollback()
+
+    monkeypatch.setattr(vector_index.time, "sleep", finish_read)
+    try:
+        vector_index.rebuild_vector_index(database, "hnsw", m=8, ef_construction=32)
+    finally:
+        reader.close()
+
+    assert waits == [1]
+    assert vector_index.vector_index_status(database)["options"] == ["m=8", "ef_construction=32"]
+
+
+def test_swap_gives_up_and_keeps_the_old_index(database, restore_index, monkeypatch):
+    monkeypatch.setattr(vector_index, "VECTOR_INDEX_SWAP_LOCK_TIMEOUT_MS", 50)
+    monkeypatch.setattr(vector_index, "VECTOR_INDEX_SWAP_ATTEMPTS", 2)
+    monkeypatch.setattr(vector_index.time, "sleep", lambda seconds: None)
+    before = vector_index.vector_index_status(database)
+
+    with database.connect() as reader:
+        reader.execute(text("SELECT count(*) FROM document_chunks"))
+        with pytest.raises(OperationalError):
+            vector_index.rebuild_vector_index(database, "hnsw", m=8, ef_construction=32)
+        reader.rollback()
+
+    assert vector_index.vector_index_status(database) == before
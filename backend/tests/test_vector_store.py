@@ -0,0 +1,110 @@
+# backend/tests/test_vector_store.py
+import numpy as np
+import pytest
+
+from app import vector_store
+from app.embeddings import EMBEDDING_DIM
+from app.vector_cache import chunk_matrix_cache
+from app.vector_store import similarity_search
+from benchmarks.fixtures import scratch_data
+
+DOCUMENTS = 40
+CHUNKS_PER_DOCUMENT = 300  # 12,000 chunks over 16 partitions: several documents share each one
+K = 8
+
+
+@pytest.fixture(scope="module")
+def corpus(db):
+    """Documents of random chunks, and each one's embeddings, shared by one user"""
+    rng = np.random.default_rng(0)
+    with scratch_data(db) as scratch:
+        user_id = scratch.user("Test")
+        documents = {}
+        for d in range(DOCUMENTS):
+            embeddings = rng.random((CHUNKS_PER_DOCUMENT, EMBEDDING_DIM), dtype=np.float32)
+            texts = [f"document {d} chunk {i}" for i in range(CHUNKS_PER_DOCUMENT)]
+            documents[scratch.document(user_id, texts, embeddings)] = embeddings
+        scratch.commit()
+        yield user_id, documents
+
+
+@pytest.fixture(autouse=True)
+def postgres_only(monkeypatch):
+    monkeypatch.setattr(chunk_matrix_cache, "max_bytes", 0)
+    monkeypatch.setattr(vector_store, "RETRIEVAL_MODE", "vector")
+
+
+def nearest(embeddings: np.ndarray, query: np.ndarray, k: int):
+    """Chunk indexes of the k nearest rows by cosine distance"""
+    normalized = embeddings / np.linalg.norm(embeddings, axis=1, keepdims=True)
+    return list(np.argsort(-(normalized @ (query / np.linalg.norm(query))))[:k])
+
+
+def test_document_search_returns_exact_top_k(db, corpus):
+    _, documents = corpus
+    rng = np.random.default_rng(1)
+    for document_id, embeddings in documents.items():
+        query = rng.random(EMBEDDING_DIM, dtype=np.float32)
+        rows = similarity_search(db, query, document_id, k=K)
+        db.rollback()
+        assert len(rows) == K
+        assert [row["chunk_index"] for row in rows] == nearest(embeddings, query, K)
+        assert {row["document_id"] for row in rows} == {document_id}
+
+
+def test_user_search_returns_exact_top_k(db, corpus):
+    user_id, documents = corpus
+    query = np.random.default_rng(2).random(EMBEDDING_DIM, dtype=np.float32)
+    all_embeddings = np.concatenate(list(documents.values()))
+    owners = [(document_id, i) for document_id in documents for i in range(CHUNKS_PER_DOCUMENT)]
+
+    rows = similarity_search(db, query, k=K, user_id=user_id)
+    db.rollback()
+
+    assert [(row["document_id"], row["chunk_index"]) for row in rows] == [owners[i] for i in nearest(all_embeddings, query, K)]
+
+
+def test_ann_search_with_iterative_scans_returns_k_rows(db, corpus, monkeypatch):
+    if not vector_store.iterative_scans_supported(db):
+        pytest.skip("pgvector without iterative scans; scoped searches stay exact")
+    monkeypatch.setattr(vector_store, "EXACT_SEARCH_MAX_CHUNKS", 0)
+    _, documents = corpus
+    rng = np.random.default_rng(4)
+    for document_id in documents:
+        rows = similarity_search(db, rng.random(EMBEDDING_DIM, dtype=np.float32), document_id, k=K)
+        db.rollback()
+        assert len(rows) == K
+
+
+def test_deleted_document_has_no_results(db, corpus):
+    query = np.random.default_rng(3).random(EMBEDDING_DIM, dtype=np.float32)
+    assert similarity_search(db, query, "00000000-0000-0000-0000-000000000000", k=K) == []
+
+
+def test_hybrid_vector_pass_is_exact(db, corpus, monkeypatch):
+    monkeypatch.setattr(vector_store, "RETRIEVAL_MODE", "hybrid")
+    _, documents = corpus
+    rng = np.random.default_rng(5)
+    for document_id, embeddings in documents.items():
+        query = rng.random(EMBEDDING_DIM, dtype=np.float32)
+        # Nothing matches lexically, so the fusion ranks the vector pass alone
+        rows = similarity_search(db, query, document_id, k=K, query_text="zebra")
+        db.rollback()
+        assert [row["chunk_index"] for row in rows] == nearest(embeddings, query, K)
+
+
+def test_hybrid_search_fuses_lexical_match_with_k_rows(db, corpus, monkeypatch):
+    monkeypatch.setattr(vector_store, "RETRIEVAL_MODE", "hybrid")
+    user_id, documents = corpus
+    document_id = next(iter(documents))
+    query = np.random.default_rng(6).random(EMBEDDING_DIM, dtype=np.float32)
+
+    rows = similarity_search(db, query, document_id, k=K, query_text="chunk 17")
+    db.rollback()
+    assert len(rows) == K
+    assert 17 in [row["chunk_index"] for row in rows]
+
+    rows = similarity_search(db, query, k=K, user_id=user_id, query_text="document 3 chunk 17")
+    db.rollback()
+    assert len(rows) == K
+    assert (list(documents)[3], 17) in [(row["document_id"], row["chunk_index"]) for row in rows]
@@ -17,17 +17,34 @@ export default async function handler(req: NextApiRequest, res: NextApiResponse)
     const url = `${backend}/api/${backendPath}`
     
     // Forward the request with proper headers
+    const headers: Record<string, string> = {
+      'Content-Type': 'application/json',
+      'X-User-Email': session.user.email,
+      'X-User-Name': session.user.name || 'Unknown User',
+      'X-Internal-Secret': process.env.INTERNAL_API_SECRET || 'your-internal-secret-change-in-production',
+    }
+    // Let the backend answer 304 when the browser's cached copy is current
+    const ifNoneMatch = req.headers['if-none-match']
+    if (ifNoneMatch) {
+      headers['If-None-Match'] = ifNoneMatch
+    }
+
     const response = await fetch(url, {
       method: req.method,
-      headers: {
-        'Content-Type': 'application/json',
-        'X-User-Email': session.user.email,
-        'X-User-Name': session.user.name || 'Unknown User',
-        'X-Internal-Secret': process.env.INTERNAL_API_SECRET || 'your-internal-secret-change-in-production',
-      },
+      headers,
       body: req.method !== 'GET' ? JSON.stringify(req.body) : undefined
     })
     
+    for (const name of ['etag', 'last-modified', 'cache-control', 'x-next-before']) {
+      const value = response.headers.get(name)
+      if (value) {
+        res.setHeader(name, value)
+      }
+    }
+    if (response.status === 304) {
+      return res.status(304).end()
+    }
+    
     if (!response.ok) {
       const errorText = await response.text()
       console.error('Backend error:', response.status, errorText)
@@ -37,6 +54,24 @@ export default async function handler(req: NextApiRequest, res: NextApiResponse)
       })
     }
     
+    // Relay server-sent events (streamed answers) chunk by chunk instead of buffering them
+    if (response.headers.get('content-type')?.startsWith('text/event-stream') && response.body) {
+      res.writeHead(response.status, {
+        'Content-Type': 'text/event-stream',
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+      })
+      const reader = response.body.getReader()
+      // Stop reading when the browser goes away so the backend sees the disconnect
+      req.on('close', () => reader.cancel().catch(() => {}))
+      while (true) {
+        const { done, value } = await reader.read()
+        if (done) break
+        res.write(value)
+      }
+      return res.end()
+    }
+    
     const data = await response.json()
     res.status(response.status).json(data)
   } catch (error) {
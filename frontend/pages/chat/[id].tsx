@@ -22,10 +22,7 @@ interface Source {
   metadata: any
 }
 
-interface ChatResponse {
-  answer: string
-  sources: Source[]
-}
+const MESSAGES_PAGE_SIZE = 50
 
 interface ChatDetails {
   id: string
@@ -41,6 +38,7 @@ export default function ChatPage() {
   const colors = getThemeColors(theme)
   const { id: chatId } = router.query
   const [messages, setMessages] = useState<Message[]>([])
+  const [olderCursor, setOlderCursor] = useState<string | null>(null)
   const [inputValue, setInputValue] = useState('')
   const [loading, setLoading] = useState(false)
   const [sources, setSources] = useState<Source[]>([])
@@ -84,10 +82,14 @@ export default function ChatPage() {
     }
   }
 
-  async function loadMessages() {
+  // Latest page first; older pages are fetched on demand with the returned cursor
+  async function loadMessages(before?: string) {
     try {
-      const response = await axios.get(`/api/proxy-backend/chats/${chatId}/messages`)
-      setMessages(response.data)
+      const response = await axios.get(`/api/proxy-backend/chats/${chatId}/messages`, {
+        params: { limit: MESSAGES_PAGE_SIZE, before }
+      })
+      setMessages(prev => before ? [...response.data, ...prev] : response.data)
+      setOlderCursor(response.headers['x-next-before'] || null)
     } catch (error) {
       console.error('Failed to load messages:', error)
     }
@@ -100,34 +102,77 @@ export default function ChatPage() {
     setInputValue('')
     setLoading(true)
     
+    const now = Date.now()
+    const newUserMessage: Message = {
+      id: `user-${now}`,
+      role: 'user',
+      content: userMessage,
+      created_at: new Date().toISOString()
+    }
+    const assistantId = `assistant-${now}`
+    setMessages(prev => [...prev, newUserMessage])
+    
+    // Append streamed text to the assistant message, adding it on the first token
+    const showAnswer = (content: string) => {
+      setMessages(prev => {
+        const existing = prev.find(message => message.id === assistantId)
+        if (existing) {
+          return prev.map(message => message.id === assistantId ? { ...message, content } : message)
+        }
+        return [...prev, { id: assistantId, role: 'assistant', content, created_at: new Date().toISOString() }]
+      })
+    }
+    
     try {
-      const response = await axios.post(`/api/proxy-backend/chats/${chatId}/ask`, {
-        query: userMessage
+      const response = await fetch(`/api/proxy-backend/chats/${chatId}/ask/stream`, {
+        method: 'POST',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify({ query: userMessage })
       })
       
-      const chatResponse: ChatResponse = response.data
-      
-      // Add user message
-      const newUserMessage: Message = {
-        id: `user-${Date.now()}`,
-        role: 'user',
-        content: userMessage,
-        created_at: new Date().toISOString()
+      if (!response.ok || !response.body) {
+        const error = await response.json().catch(() => ({}))
+        throw new Error(error.detail || `Request failed with status ${response.status}`)
       }
       
-      // Add assistant message
-      const newAssistantMessage: Message = {
-        id: `assistant-${Date.now()}`,
-        role: 'assistant',
-        content: chatResponse.answer,
-        created_at: new Date().toISOString()
+      // Server-sent events: "event: <name>\ndata: <json>\n\n"
+      const reader = response.body.getReader()
+      const decoder = new TextDecoder()
+      let buffer = ''
+      let answer = ''
+      while (true) {
+        const { done, value } = await reader.read()
+        if (done) break
+        buffer += decoder.decode(value, { stream: true })
+        
+        let boundary
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+          const block = buffer.slice(0, boundary)
+          buffer = buffer.slice(boundary + 2)
+          const event = block.match(/^event: (.*)$/m)?.[1]
+          const data = block.match(/^data: (.*)$/m)?.[1]
+          if (!event || data === undefined) continue
+          
+          const payload = JSON.parse(data)
+          if (event === 'sources') {
+            setSources(payload as Source[])
+          } else if (event === 'token') {
+            answer += payload.text
+            showAnswer(answer)
+          } else if (event === 'done') {
+            answer = payload.answer
+            showAnswer(answer)
+          } else if (event === 'error') {
+            throw new Error(payload.detail)
+          }
+        }
       }
-      
-      setMessages(prev => [...prev, newUserMessage, newAssistantMessage])
-      setSources(chatResponse.sources)
     } catch (error: any) {
       console.error('Failed to send message:', error)
-      showError('Failed to send message', error.response?.data?.detail || error.message)
+      // Nothing was saved; take the exchange back out and return the question to the input
+      setMessages(prev => prev.filter(message => message.id !== newUserMessage.id && message.id !== assistantId))
+      setInputValue(userMessage)
+      showError('Failed to send message', error.message)
     } finally {
       setLoading(false)
     }
@@ -501,6 +546,23 @@ export default function ChatPage() {
           </div>
         ) : (
           <div style={{ maxWidth: '800px', margin: '0 auto' }}>
+            {olderCursor && (
+              <div style={{ textAlign: 'center', marginBottom: '1.5rem' }}>
+                <button
+                  onClick={() => loadMessages(olderCursor)}
+                  style={{
+                    padding: '0.5rem 1rem',
+                    borderRadius: '12px',
+                    border: `1px solid ${theme === 'dark' ? 'rgba(255,255,255,0.2)' : 'rgba(0,0,0,0.1)'}`,
+                    background: 'transparent',
+                    color: colors.textSecondary,
+                    cursor: 'pointer'
+                  }}
+                >
+                  Load earlier messages
+                </button>
+              </div>
+            )}
             {messages.map((message) => (
               <div
                 key={message.id}
@@ -547,7 +609,7 @@ export default function ChatPage() {
                 </div>
               </div>
             ))}
-            {loading && (
+            {loading && messages[messages.length - 1]?.role !== 'assistant' && (
               <div style={{ display: 'flex', justifyContent: 'flex-start' }}>
                 <div style={{
                   padding: '1rem 1.5rem',
@@ -67,13 +67,20 @@ export default function Dashboard() {
       }
       
       // Use the original proxy upload with better error handling
-      await axios.post('/api/proxy-upload', formData, {
+      const response = await axios.post('/api/proxy-upload', formData, {
         headers: { 
           'Content-Type': 'multipart/form-data'
         },
         timeout: 120000 // 2 minute timeout for large files
       })
       
+      // Ingestion runs in the background; wait for the job to finish
+      const job = await waitForUploadJob(response.data.job_id)
+      if (job.status === 'failed') {
+        showError('Processing failed', job.error || 'Could not process the PDF')
+        return
+      }
+      
       setUploadFile(null)
       loadDocuments() // Refresh documents list
       showSuccess(`Uploaded ${uploadFile.name} successfully!`)
@@ -89,6 +96,29 @@ export default function Dashboard() {
     }
   }
 
+  async function waitForUploadJob(jobId: string) {
+    // Give up after 15 minutes, or after a few network errors / 5xx in a row;
+    // any 4xx (e.g. the job is gone) ends the wait at once
+    const deadline = Date.now() + 15 * 60 * 1000
+    let failures = 0
+    while (Date.now() < deadline) {
+      try {
+        const response = await axios.get(`/api/proxy-backend/uploads/${jobId}`, { timeout: 10000 })
+        failures = 0
+        if (response.data.status === 'completed' || response.data.status === 'failed') {
+          return response.data
+        }
+      } catch (error: any) {
+        const status = error.response?.status
+        if ((status && status < 500) || ++failures >= 3) {
+          throw new Error(`Could not check processing status: ${error.response?.data?.detail || error.message}`)
+        }
+      }
+      await new Promise((resolve) => setTimeout(resolve, 1500))
+    }
+    throw new Error('Processing is taking too long; the document will appear in your list once it finishes.')
+  }
+
   function goToDocument(documentId: string) {
     router.push(`/doc/${documentId}`)
   }